@@ -1,24 +1,55 @@
-from fastapi import Request, status
+from fastapi import status
 from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
 from datetime import datetime
 import logging
 
 logger = logging.getLogger(__name__)
 
-async def error_handler_middleware(request: Request, call_next):
-    """Middleware global para tratamento de erros"""
-    try:
-        return await call_next(request)
-    except Exception as e:
-        logger.error(f"Erro não tratado: {e}", exc_info=True)
-        return JSONResponse(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            content={
-                "error": {
-                    "code": "INTERNAL_SERVER_ERROR",
-                    "message": "Erro interno do servidor",
-                    "details": str(e),
-                    "timestamp": datetime.utcnow().isoformat()
-                }
+def error_response(exc: Exception) -> JSONResponse:
+    """Resposta JSON padrão para erros não tratados"""
+    return JSONResponse(
+        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        content={
+            "error": {
+                "code": "INTERNAL_SERVER_ERROR",
+                "message": "Erro interno do servidor",
+                "details": str(exc),
+                "timestamp": datetime.utcnow().isoformat()
             }
-        )
\ No newline at end of file
+        }
+    )
+
+class ErrorHandlerMiddleware:
+    """
+    Middleware ASGI puro para tratamento global de erros
+
+    Diferente do `app.middleware("http")` (BaseHTTPMiddleware), não cria
+    uma task e um stream intermediário por requisição, e não interfere em
+    StreamingResponse. Se o erro ocorrer depois que a resposta começou a ser
+    enviada, não há como trocar o status: o erro é logado e a conexão encerrada.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        response_started = False
+
+        async def send_wrapper(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception as e:
+            logger.error(f"Erro não tratado: {e}", exc_info=True)
+            if response_started:
+                raise
+            await error_response(e)(scope, receive, send)
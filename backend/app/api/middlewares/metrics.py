@@ -0,0 +1,92 @@
+"""
+Middleware ASGI de métricas HTTP
+
+A rota é o template (`/api/v1/insights/{insight_id}/reactions`), não o path,
+para manter a cardinalidade limitada. A resolução path → template é
+memorizada; os filhos de cada rota são pré-alocados no primeiro uso do app.
+Métodos fora de HTTP_METHODS viram "OTHER", pelo mesmo motivo.
+"""
+
+import time
+from typing import Dict, Tuple
+
+from starlette.routing import Match
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.metrics import HTTP_REQUEST_DURATION, HTTP_REQUESTS_IN_FLIGHT
+
+UNMATCHED_ROUTE = "unmatched"
+ROUTE_MEMO_MAX = 4096
+PREALLOCATED_STATUSES = ("200",)
+HTTP_METHODS = frozenset(("GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"))
+OTHER_METHOD = "OTHER"
+
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self._routes = None
+        self._route_memo: Dict[Tuple[str, str], str] = {}
+        # (method, route, status) → filho do histograma
+        self._durations: Dict[Tuple[str, str, str], object] = {}
+
+    def _load_routes(self, scope: Scope):
+        router = scope["app"].router
+        self._routes = [r for r in router.routes if hasattr(r, "path_format")]
+        for route in self._routes:
+            for method in getattr(route, "methods", None) or ("GET",):
+                HTTP_REQUESTS_IN_FLIGHT.labels(method, route.path_format)
+                for status in PREALLOCATED_STATUSES:
+                    key = (method, route.path_format, status)
+                    self._durations[key] = HTTP_REQUEST_DURATION.labels(*key)
+
+    def _resolve_route(self, scope: Scope) -> str:
+        key = (scope["method"], scope["path"])
+        route = self._route_memo.get(key)
+        if route is None:
+            route = UNMATCHED_ROUTE
+            for candidate in self._routes:
+                match, _ = candidate.matches(scope)
+                if match == Match.FULL:
+                    route = candidate.path_format
+                    break
+            if len(self._route_memo) >= ROUTE_MEMO_MAX:
+                self._route_memo.clear()
+            self._route_memo[key] = route
+        return route
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if self._routes is None:
+            self._load_routes(scope)
+
+        method = scope["method"]
+        if method in HTTP_METHODS:
+            route = self._resolve_route(scope)
+        else:
+            # Nenhuma rota aceita o método; também não ocupa a memória de rotas
+            method, route = OTHER_METHOD, UNMATCHED_ROUTE
+        in_flight = HTTP_REQUESTS_IN_FLIGHT.labels(method, route)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            in_flight.dec()
+            key = (method, route, str(status_code))
+            child = self._durations.get(key)
+            if child is None:
+                child = self._durations[key] = HTTP_REQUEST_DURATION.labels(*key)
+            child.observe(elapsed)
@@ -0,0 +1,81 @@
+"""
+Middleware ASGI de request-id e tempo de resposta
+
+- Reaproveita o header X-Request-ID recebido (ex.: gerado pelo Nginx) ou
+  gera um novo; o id fica em `request.state.request_id` e volta na resposta.
+- Adiciona X-Response-Time (ms até o início da resposta) e loga as
+  requisições acima de SLOW_REQUEST_MS com o request-id.
+- Define o deadline da requisição (REQUEST_DEADLINE_SECONDS, ou menos se o
+  cliente mandar X-Request-Timeout em segundos), usado pela camada de
+  resiliência para limitar o timeout das chamadas externas.
+- Copia para a resposta os headers X-RateLimit-* definidos pela dependência
+  de rate limit em `request.state.rate_limit_headers`, inclusive quando a
+  rota devolve o próprio Response (JSONResponse, StreamingResponse).
+"""
+
+import logging
+import re
+import time
+import uuid
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.resilience import reset_deadline, set_deadline
+
+logger = logging.getLogger(__name__)
+
+# Aceita só ids curtos e "seguros" vindos do cliente
+_VALID_REQUEST_ID = re.compile(r"^[A-Za-z0-9._-]{1,128}$")
+
+
+class RequestContextMiddleware:
+    def __init__(self, app: ASGIApp, slow_request_ms: float = 1000.0, deadline_seconds: float = 15.0):
+        self.app = app
+        self.slow_request_ms = slow_request_ms
+        self.deadline_seconds = deadline_seconds
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        deadline = self.deadline_seconds
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                candidate = value.decode("latin-1")
+                if _VALID_REQUEST_ID.match(candidate):
+                    request_id = candidate
+            elif name == b"x-request-timeout":
+                try:
+                    deadline = min(deadline, max(0.0, float(value)))
+                except ValueError:
+                    pass
+        if request_id is None:
+            request_id = uuid.uuid4().hex
+
+        state = scope.setdefault("state", {})
+        state["request_id"] = request_id
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                headers = MutableHeaders(scope=message)
+                headers.append("X-Request-ID", request_id)
+                headers.append("X-Response-Time", f"{elapsed_ms:.1f}ms")
+                for name, value in state.get("rate_limit_headers", {}).items():
+                    headers[name] = value
+                if elapsed_ms >= self.slow_request_ms:
+                    logger.warning(
+                        f"[Request] {scope['method']} {scope['path']} lento: "
+                        f"{elapsed_ms:.0f}ms (status {message['status']}, id {request_id})"
+                    )
+            await send(message)
+
+        token = set_deadline(deadline)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            reset_deadline(token)
@@ -0,0 +1,59 @@
+"""
+Middleware ASGI de tracing
+
+Abre um Trace por requisição (continuando o `traceparent` recebido, se
+houver), adiciona o header Server-Timing com as fases concluídas até o
+início da resposta e entrega os traces amostrados ao exportador.
+"""
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.tracing import Trace, end_trace, span, start_trace
+from app.services.trace_exporter import TraceExporter
+
+
+class TracingMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        exporter: TraceExporter,
+        sample_rate: float = 0.0,
+        server_timing: bool = True,
+        trust_traceparent: bool = False
+    ):
+        self.app = app
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self.trust_traceparent = trust_traceparent
+        self.server_timing = server_timing
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        traceparent = None
+        for name, value in scope["headers"]:
+            if name == b"traceparent":
+                traceparent = value.decode("latin-1")
+                break
+
+        trace = Trace.from_traceparent(traceparent, self.sample_rate, self.trust_traceparent)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                request_span.set_attribute("http.status_code", message["status"])
+                if self.server_timing:
+                    headers = MutableHeaders(scope=message)
+                    headers.append("Server-Timing", trace.server_timing())
+            await send(message)
+
+        token = start_trace(trace)
+        try:
+            with span("request", **{"http.method": scope["method"], "http.target": scope["path"]}) as request_span:
+                await self.app(scope, receive, send_wrapper)
+        finally:
+            end_trace(token)
+            if trace.sampled:
+                self.exporter.submit(trace)
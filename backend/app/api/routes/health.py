@@ -1,28 +1,49 @@
-from fastapi import APIRouter, Depends
-from app.database.mongodb import get_database
-from motor.motor_asyncio import AsyncIOMotorDatabase
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from app.database.mongodb import database_monitor
+from app.core.resilience import upstreams
 from datetime import datetime
 
 router = APIRouter()
 
+@router.get("/livez")
+async def liveness():
+    """
+    Liveness: o processo está de pé e o event loop respondendo
+
+    Não consulta dependências: uma queda do MongoDB não deve reiniciar a réplica.
+    """
+    return {"status": "alive"}
+
+@router.get("/readyz")
+async def readiness():
+    """
+    Readiness: a réplica pode receber tráfego
+
+    Usa o último ping feito em background pelo DatabaseMonitor (nenhuma
+    consulta ao banco por probe). 503 até os índices estarem verificados e
+    enquanto o MongoDB não responder.
+    """
+    ready = database_monitor.ready
+    return JSONResponse(
+        {"status": "ready" if ready else "not_ready", "database": database_monitor.snapshot()},
+        status_code=200 if ready else 503
+    )
+
 @router.get("/health")
-async def health_check(db: AsyncIOMotorDatabase = Depends(get_database)):
-    """Health check endpoint"""
-    try:
-        # Testar conexão com MongoDB
-        await db.command("ping")
-        db_status = "connected"
-    except:
-        db_status = "disconnected"
-    
-    is_healthy = db_status == "connected"
-    
-    return {
+async def health_check():
+    """Health check endpoint (estado do banco vindo do ping em background)"""
+    is_healthy = database_monitor.ready
+
+    return JSONResponse({
         "status": "healthy" if is_healthy else "unhealthy",
         "timestamp": datetime.utcnow().isoformat(),
         "services": {
-            "database": db_status,
+            "database": "connected" if is_healthy else "disconnected",
             "cache": "operational"
         },
+        "database": database_monitor.snapshot(),
+        # Estado dos circuit breakers (closed / open / half_open) por upstream
+        "upstreams": upstreams.snapshot(),
         "version": "1.0.0"
-    }, 200 if is_healthy else 503
+    }, status_code=200 if is_healthy else 503)
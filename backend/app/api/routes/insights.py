@@ -1,13 +1,41 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
-from app.models.insight import InsightCreate, InsightResponse, InsightListResponse
+from fastapi.responses import JSONResponse, StreamingResponse
+from app.config import settings
+from app.models.insight import (
+    InsightCreate,
+    InsightResponse,
+    InsightListResponse,
+    InsightBulkCreate,
+    InsightBulkResponse,
+    ReactionCreate,
+)
 from app.services.insights_service import InsightsService
+from app.services.reactions import reaction_buffer
 from app.database.mongodb import get_database
+from app.dependencies import expensive_rate_limit
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from bson import ObjectId
+from datetime import datetime
+from typing import AsyncIterator, Dict, Optional
+import csv
+import io
+import json
 import logging
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# Colunas do CSV de exportação (documento achatado)
+EXPORT_CSV_COLUMNS = [
+    "id", "created_at", "author_name", "author_role",
+    "location_name", "location_state", "lat", "lon",
+    "temperature", "humidity", "precipitation", "condition",
+    "content", "tags", "reactions_helpful", "reactions_tried",
+]
+
+# Quantidade de linhas agrupadas por chunk enviado ao cliente
+EXPORT_CHUNK_ROWS = 200
+
 def get_insights_service(db: AsyncIOMotorDatabase = Depends(get_database)) -> InsightsService:
     return InsightsService(db)
 
@@ -26,6 +54,35 @@ async def create_insight(
     except Exception as e:
         logger.error(f"Erro ao criar insight: {e}")
         raise HTTPException(status_code=500, detail="Erro ao salvar insight")
+
+@router.post(
+    "/insights/bulk",
+    status_code=201,
+    response_model=InsightBulkResponse,
+    dependencies=[Depends(expensive_rate_limit(cost=5))]
+)
+async def create_insights_bulk(
+    payload: InsightBulkCreate,
+    service: InsightsService = Depends(get_insights_service)
+):
+    """
+    Importar insights em lote (cadernos de campo)
+    
+    Retorna 201 quando todos os itens foram gravados e 207 quando parte
+    do lote falhou; o status de cada item vem em `results`.
+    """
+    try:
+        result = await service.create_insights_bulk(
+            payload.insights,
+            chunk_size=settings.INSIGHTS_BULK_CHUNK_SIZE
+        )
+    except Exception as e:
+        logger.error(f"Erro ao importar insights em lote: {e}")
+        raise HTTPException(status_code=500, detail="Erro ao salvar insights")
+    
+    if result["failed"]:
+        return JSONResponse(status_code=207, content=result)
+    return result
     
 @router.get("/insights")
 async def list_insights(
@@ -41,17 +98,182 @@ async def list_insights(
         logger.error(f"Erro ao listar insights: {e}")
         raise HTTPException(status_code=500, detail="Erro ao buscar insights")
 
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+def _flatten_insight(doc: Dict) -> list:
+    author = doc.get("author") or {}
+    location = doc.get("location") or {}
+    weather = doc.get("weather_snapshot") or {}
+    reactions = doc.get("reactions") or {}
+    created_at = doc.get("created_at")
+    return [
+        doc["id"],
+        created_at.isoformat() if isinstance(created_at, datetime) else created_at,
+        author.get("name"),
+        author.get("role"),
+        location.get("name"),
+        location.get("state"),
+        location.get("lat"),
+        location.get("lon"),
+        weather.get("temperature"),
+        weather.get("humidity"),
+        weather.get("precipitation"),
+        weather.get("condition"),
+        doc.get("content"),
+        ";".join(doc.get("tags") or []),
+        reactions.get("helpful", 0),
+        reactions.get("tried", 0),
+    ]
+
+async def _ndjson_chunks(docs: AsyncIterator[Dict]) -> AsyncIterator[bytes]:
+    lines = []
+    async for doc in docs:
+        lines.append(json.dumps(doc, default=_json_default, ensure_ascii=False))
+        if len(lines) >= EXPORT_CHUNK_ROWS:
+            yield ("\n".join(lines) + "\n").encode("utf-8")
+            lines = []
+    if lines:
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+async def _csv_chunks(docs: AsyncIterator[Dict]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_CSV_COLUMNS)
+    rows = 0
+    async for doc in docs:
+        writer.writerow(_flatten_insight(doc))
+        rows += 1
+        if rows >= EXPORT_CHUNK_ROWS:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+            rows = 0
+    yield buffer.getvalue().encode("utf-8")
+
+@router.get("/insights/export", dependencies=[Depends(expensive_rate_limit(cost=5))])
+async def export_insights(
+    format: str = Query("ndjson", regex="^(ndjson|csv)$"),
+    location: Optional[str] = Query(None),
+    tag: Optional[str] = Query(None),
+    date_from: Optional[datetime] = Query(None),
+    date_to: Optional[datetime] = Query(None),
+    service: InsightsService = Depends(get_insights_service)
+):
+    """
+    Exporta todos os insights filtrados em streaming (NDJSON ou CSV)
+    
+    Os documentos saem do cursor do MongoDB em lotes e são escritos na
+    resposta conforme chegam, com memória constante.
+    """
+    docs = service.stream_insights(
+        location=location,
+        tag=tag,
+        date_from=date_from,
+        date_to=date_to,
+        batch_size=settings.INSIGHTS_EXPORT_BATCH_SIZE
+    )
+    
+    timestamp = datetime.utcnow().strftime("%Y%m%d%H%M%S")
+    if format == "csv":
+        body, media_type = _csv_chunks(docs), "text/csv; charset=utf-8"
+    else:
+        body, media_type = _ndjson_chunks(docs), "application/x-ndjson"
+    
+    logger.info(f"[Insights] Exportação iniciada (formato: {format})")
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="insights-{timestamp}.{format}"'
+        }
+    )
+
+def _parse_bbox(bbox: str) -> tuple:
+    """Converte "min_lon,min_lat,max_lon,max_lat" em tupla validada"""
+    try:
+        min_lon, min_lat, max_lon, max_lat = (float(v) for v in bbox.split(","))
+    except ValueError:
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "code": "INVALID_BBOX",
+                "message": "bbox deve ser min_lon,min_lat,max_lon,max_lat"
+            }
+        )
+    
+    if not (
+        -180 <= min_lon < max_lon <= 180
+        and -90 <= min_lat < max_lat <= 90
+    ):
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "code": "INVALID_BBOX",
+                "message": "Coordenadas da bbox fora dos limites"
+            }
+        )
+    return min_lon, min_lat, max_lon, max_lat
+
+@router.get("/insights/search")
+async def search_insights(
+    q: str = Query(..., min_length=2, max_length=200, description="Termos de busca"),
+    tag: Optional[str] = Query(None),
+    lat: Optional[float] = Query(None, ge=-90, le=90),
+    lon: Optional[float] = Query(None, ge=-180, le=180),
+    radius_km: Optional[int] = Query(None, ge=1, le=500),
+    limit: int = Query(20, ge=1, le=50),
+    cursor: Optional[str] = Query(None, description="next_cursor da página anterior"),
+    service: InsightsService = Depends(get_insights_service)
+):
+    """Busca textual nos insights (conteúdo, tags e localização)"""
+    try:
+        return await service.search_insights(
+            q, tag=tag, lat=lat, lon=lon, radius_km=radius_km,
+            limit=limit, cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400,
+            detail={"code": "INVALID_CURSOR", "message": str(e)}
+        )
+    except Exception as e:
+        logger.error(f"Erro na busca de insights: {e}")
+        raise HTTPException(status_code=500, detail="Erro ao buscar insights")
+
+@router.get("/insights/clusters")
+async def get_insight_clusters(
+    bbox: str = Query(..., description="min_lon,min_lat,max_lon,max_lat"),
+    zoom: int = Query(..., ge=0, le=20),
+    service: InsightsService = Depends(get_insights_service)
+):
+    """Clusters de insights para o mapa (contagem e centróide por célula)"""
+    bounds = _parse_bbox(bbox)
+    try:
+        return await service.get_clusters(bounds, zoom)
+    except Exception as e:
+        logger.error(f"Erro ao agrupar insights: {e}")
+        raise HTTPException(status_code=500, detail="Erro ao buscar insights")
+
 @router.get("/insights/nearby")
 async def get_nearby_insights(
     lat: float = Query(..., ge=-90, le=90),
     lon: float = Query(..., ge=-180, le=180),
     radius_km: int = Query(100, ge=1, le=500),
     limit: int = Query(20, ge=1, le=50),
+    tag: Optional[str] = Query(None),
+    date_from: Optional[datetime] = Query(None),
+    date_to: Optional[datetime] = Query(None),
     service: InsightsService = Depends(get_insights_service)
 ):
-    """Buscar insights próximos"""
+    """Buscar insights próximos (ordenados por distância, com distance_km)"""
     try:
-        insights = await service.get_nearby_insights(lat, lon, radius_km, limit)
+        insights = await service.get_nearby_insights(
+            lat, lon, radius_km, limit,
+            tag=tag, date_from=date_from, date_to=date_to
+        )
         return {
         "insights": insights,
         "search_center": {"lat": lat, "lon": lon, "radius_km": radius_km}
@@ -59,3 +281,27 @@ async def get_nearby_insights(
     except Exception as e:
         logger.error(f"Erro ao buscar insights próximos: {e}")
         raise HTTPException(status_code=500, detail="Erro ao buscar insights")
+
+@router.post("/insights/{insight_id}/reactions", status_code=202)
+async def add_reaction(insight_id: str, payload: ReactionCreate):
+    """
+    Registrar reação a um insight
+    
+    O incremento é acumulado em memória e gravado em lote pelo
+    ReactionBuffer, por isso a resposta é 202 (aceito, ainda não gravado).
+    """
+    if not ObjectId.is_valid(insight_id):
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "code": "INVALID_INSIGHT_ID",
+                "message": "Identificador de insight inválido"
+            }
+        )
+    
+    reaction_buffer.add(insight_id, payload.reaction)
+    return {
+        "id": insight_id,
+        "reaction": payload.reaction,
+        "pending": reaction_buffer.pending_for(insight_id)
+    }
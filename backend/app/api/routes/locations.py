@@ -1,11 +1,24 @@
 from fastapi import APIRouter, Query, HTTPException
 from app.services.geocoding import geocoding_service
+from app.core.resilience import UpstreamUnavailable
 from app.models.location import LocationSearchResponse
 import logging
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+def _geocoding_unavailable(e: UpstreamUnavailable) -> HTTPException:
+    """Nominatim fora do ar ou com circuito aberto: falha rápida"""
+    logger.warning(f"Geocoding indisponível: {e}")
+    return HTTPException(
+        status_code=503,
+        detail={
+            "code": "GEOCODING_UNAVAILABLE",
+            "message": "Serviço de localização temporariamente indisponível",
+            "details": str(e)
+        }
+    )
+
 @router.get("/locations/search", response_model=LocationSearchResponse)
 async def search_locations(
     q: str = Query(..., min_length=3, description="Termo de busca"),
@@ -13,8 +26,10 @@ async def search_locations(
 ):
     """Autocomplete de cidades"""
     try:
-        suggestions = geocoding_service.search_locations(q, limit)
+        suggestions = await geocoding_service.search_locations(q, limit)
         return {"suggestions": suggestions}
+    except UpstreamUnavailable as e:
+        raise _geocoding_unavailable(e)
     except Exception as e:
         logger.error(f"Erro ao buscar localizações: {e}")
         raise HTTPException(
@@ -40,7 +55,7 @@ async def reverse_geocode(
         logger.info(f"[ReverseGeocode] Buscando endereço para {lat}, {lon}")
         
         # Chama serviço de geocoding reverso
-        location = geocoding_service.reverse_geocode(lat, lon)
+        location = await geocoding_service.reverse_geocode(lat, lon)
         
         if not location:
             raise HTTPException(
@@ -60,6 +75,8 @@ async def reverse_geocode(
         
     except HTTPException:
         raise
+    except UpstreamUnavailable as e:
+        raise _geocoding_unavailable(e)
     except Exception as e:
         logger.error(f"Erro ao fazer geocoding reverso: {e}")
         raise HTTPException(
@@ -0,0 +1,11 @@
+from fastapi import APIRouter, Response
+from app.core.metrics import registry
+
+router = APIRouter()
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4"
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Métricas no formato texto do Prometheus"""
+    return Response(content=registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
@@ -1,27 +1,20 @@
 from fastapi import APIRouter, Query, HTTPException
-from app.config import settings
-import httpx
-import logging
-from datetime import datetime, timedelta
+from app.services.news_archive import news_archive
+from app.services.news import (
+    news_service,
+    NewsAPIError,
+    NEWS_CATEGORIES,
+    WARM_COUNTRY,
+    WARM_SORT_BY,
+    everything_params,
+    headlines_params,
+)
 from typing import Optional
+import logging
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-# Cache em memória (1 hora)
-_news_cache = {
-    "data": None,
-    "timestamp": None,
-    "category": None
-}
-
-CACHE_TTL_MINUTES = 60
-NEWS_CATEGORIES = {
-    "AGRIBUSINESS": 'agronegócio OR agricultura OR "cana-de-açúcar"',
-    "SUGARCANE": '"cana-de-açúcar" OR "canavial" OR "usina de açúcar"',
-    "WEATHER": "clima OR meteorologia AND agricultura",
-}
-
 @router.get("/news")
 async def get_news(
     category: str = Query("AGRIBUSINESS", description="Categoria de notícias"),
@@ -32,24 +25,13 @@ async def get_news(
     Proxy para NewsAPI - Evita bloqueio CORS em produção
     
     Rate limit: 100 req/dia da NewsAPI
-    Cache: 1 hora para economizar quota
+    Cache: 1 hora por categoria/ordenação, alongado conforme a quota diminui;
+    sem quota (ou com a NewsAPI fora), serve os últimos dados com stale=true.
+    Categorias ordenadas por publishedAt são mantidas pelo NewsRefresher;
+    nas demais, dados expirados (ou o arquivo da categoria) são servidos com
+    stale=true enquanto a atualização roda em background.
     """
     
-    # Verifica cache
-    now = datetime.utcnow()
-    if (
-        _news_cache["data"] is not None
-        and _news_cache["category"] == category
-        and _news_cache["timestamp"] is not None
-        and (now - _news_cache["timestamp"]).total_seconds() < CACHE_TTL_MINUTES * 60
-    ):
-        logger.info(f"[News] Cache HIT para categoria {category}")
-        return {
-            **_news_cache["data"],
-            "cached": True,
-            "cached_at": _news_cache["timestamp"].isoformat()
-        }
-    
     # Valida categoria
     if category not in NEWS_CATEGORIES:
         raise HTTPException(
@@ -60,87 +42,53 @@ async def get_news(
             }
         )
     
-    # Busca query da categoria
-    search_query = NEWS_CATEGORIES[category]
-    
-    # Requisição à NewsAPI (server-side - SEM CORS)
+    cache_params, request_params = everything_params(category, sort_by)
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                "https://newsapi.org/v2/everything",
-                params={
-                    "q": search_query,
-                    "language": "pt",
-                    "sortBy": sort_by,
-                    "pageSize": page_size,
-                    "apiKey": settings.NEWSAPI_KEY
-                },
-                timeout=15.0
-            )
-            
-            if response.status_code == 401:
-                logger.error("[News] NewsAPI key inválida")
-                raise HTTPException(
-                    status_code=503,
-                    detail={
-                        "code": "NEWS_API_ERROR",
-                        "message": "Serviço de notícias temporariamente indisponível"
-                    }
-                )
-            
-            if response.status_code == 429:
-                logger.error("[News] Quota da NewsAPI excedida")
-                raise HTTPException(
-                    status_code=429,
-                    detail={
-                        "code": "NEWS_API_QUOTA_EXCEEDED",
-                        "message": "Limite diário de notícias excedido",
-                        "retry_after": 3600
-                    }
-                )
-            
-            response.raise_for_status()
-            data = response.json()
-            
-            # Processa artigos (remove [Removed])
-            articles = [
-                article for article in data.get("articles", [])
-                if article.get("title") and "[Removed]" not in article["title"]
-            ]
-            
-            result = {
-                "articles": articles,
-                "total_results": len(articles),
-                "category": category,
-                "cached": False
-            }
-            
-            # Atualiza cache
-            _news_cache["data"] = result
-            _news_cache["timestamp"] = now
-            _news_cache["category"] = category
-            
-            logger.info(f"[News] Busca realizada: {len(articles)} artigos (categoria: {category})")
-            return result
-            
-    except httpx.TimeoutException:
-        logger.error("[News] Timeout ao buscar notícias")
-        raise HTTPException(
-            status_code=504,
-            detail={
-                "code": "NEWS_API_TIMEOUT",
-                "message": "Timeout ao buscar notícias"
-            }
+        result = await news_service.get_articles(
+            "everything",
+            cache_params,
+            request_params,
+            page_size=page_size,
+            warm=sort_by == WARM_SORT_BY
         )
-    except httpx.HTTPError as e:
-        logger.error(f"[News] Erro HTTP: {e}")
+    except NewsAPIError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.to_detail())
+    
+    return {
+        **result,
+        "total_results": len(result["articles"]),
+        "category": category
+    }
+
+
+@router.get("/news/archive")
+async def get_news_archive(
+    category: Optional[str] = Query(None, description="Categoria (ex.: SUGARCANE)"),
+    q: Optional[str] = Query(None, min_length=2, max_length=200, description="Busca textual"),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor da página anterior")
+):
+    """
+    Arquivo de notícias já obtidas da NewsAPI
+    
+    Servido inteiramente do MongoDB: paginar ou buscar não gasta quota.
+    """
+    try:
+        result = await news_archive.search(category=category, text=q, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail={"code": "INVALID_CURSOR", "message": str(e)})
+    except Exception as e:
+        logger.error(f"[News Archive] Erro: {e}")
         raise HTTPException(
-            status_code=503,
-            detail={
-                "code": "NEWS_API_ERROR",
-                "message": "Erro ao buscar notícias"
-            }
+            status_code=500,
+            detail={"code": "DATABASE_ERROR", "message": "Erro ao buscar arquivo de notícias"}
         )
+    
+    return {
+        **result,
+        "total_results": len(result["articles"]),
+        "category": category
+    }
 
 
 @router.get("/news/top-headlines")
@@ -150,34 +98,26 @@ async def get_top_headlines(
 ):
     """
     Top headlines do Brasil (business/tech/science)
+    
+    Cache e quota compartilhados com /news; headlines do Brasil são
+    mantidas pelo NewsRefresher.
     """
+    cache_params, request_params = headlines_params(country, category)
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                "https://newsapi.org/v2/top-headlines",
-                params={
-                    "country": country,
-                    "category": category,
-                    "apiKey": settings.NEWSAPI_KEY
-                },
-                timeout=15.0
-            )
-            
-            response.raise_for_status()
-            data = response.json()
-            
-            articles = [
-                article for article in data.get("articles", [])
-                if article.get("title") and "[Removed]" not in article["title"]
-            ]
-            
-            return {
-                "articles": articles,
-                "total_results": len(articles),
-                "country": country,
-                "category": category
-            }
-            
-    except Exception as e:
-        logger.error(f"[News Headlines] Erro: {e}")
-        raise HTTPException(status_code=503, detail="Erro ao buscar headlines")
\ No newline at end of file
+        result = await news_service.get_articles(
+            "top-headlines",
+            cache_params,
+            request_params,
+            page_size=20,
+            warm=country == WARM_COUNTRY
+        )
+    except NewsAPIError as e:
+        logger.error(f"[News Headlines] Erro: {e.message}")
+        raise HTTPException(status_code=e.status_code, detail=e.to_detail())
+    
+    return {
+        **result,
+        "total_results": len(result["articles"]),
+        "country": country,
+        "category": category
+    }
@@ -3,21 +3,26 @@ Rota para cotação de cana-de-açúcar
 Scraping de https://www.noticiasagricolas.com.br
 """
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Response
 from app.services.quotation import quotation_service
-from typing import List, Dict, Any
+from app.services.commodity_quotes import commodity_quotes
+from datetime import datetime, date, time
+from typing import List, Dict, Any, Optional
 import logging
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
 @router.get("/quotation")
-async def get_quotation():
+async def get_quotation(response: Response):
     """
     Retorna a cotação da cana-de-açúcar (Campo vs Esteira)
     
     Rate limit: Sem limite específico (operação rara, em cache 1 hora)
-    Cache: 1 hora no backend
+    Cache: 1 hora no backend (persistido no MongoDB)
+    
+    Se a fonte falhar, retorna os últimos dados válidos com os headers
+    `X-Quotation-Stale: true` e `Age: <segundos>`.
     
     Resposta:
     [
@@ -32,7 +37,10 @@ async def get_quotation():
     """
     try:
         logger.info("[Quotation] Iniciando busca de cotação")
-        data = await quotation_service.get_sugarcane_quotation()
+        data, meta = await quotation_service.get_quotation_with_meta()
+        if meta["stale"]:
+            response.headers["X-Quotation-Stale"] = "true"
+            response.headers["Age"] = str(meta["age_seconds"])
         logger.info(f"[Quotation] Cotação obtida com sucesso: {len(data)} registros")
         return data
     except Exception as e:
@@ -46,4 +54,94 @@ async def get_quotation():
                     "details": str(e)
                 }
             }
-        )
\ No newline at end of file
+        )
+
+@router.get("/quotation/history")
+async def get_quotation_history(
+    date_from: Optional[date] = Query(None, alias="from", description="Data inicial (AAAA-MM-DD)"),
+    date_to: Optional[date] = Query(None, alias="to", description="Data final (AAAA-MM-DD)")
+):
+    """
+    Histórico de cotações armazenado, sem scraping
+    
+    Cada registro traz as médias móveis pré-calculadas (mm7_*, mm30_*);
+    `resumo` traz mínimo, máximo e média do período.
+    """
+    start = datetime.combine(date_from, time.min) if date_from else None
+    end = datetime.combine(date_to, time.max) if date_to else None
+    if start and end and start > end:
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "error": {
+                    "code": "INVALID_DATE_RANGE",
+                    "message": "A data inicial deve ser anterior à data final."
+                }
+            }
+        )
+    
+    try:
+        result = await quotation_service.get_history(start, end)
+    except Exception as e:
+        logger.error(f"[Quotation] Erro ao buscar histórico: {e}")
+        raise HTTPException(
+            status_code=503,
+            detail={
+                "error": {
+                    "code": "QUOTATION_HISTORY_ERROR",
+                    "message": "Não foi possível obter o histórico de cotações no momento.",
+                    "details": str(e)
+                }
+            }
+        )
+    
+    return {
+        "from": date_from.isoformat() if date_from else None,
+        "to": date_to.isoformat() if date_to else None,
+        **result
+    }
+
+@router.get("/quotations")
+async def get_quotations(
+    sources: Optional[str] = Query(
+        None,
+        description="Fontes separadas por vírgula (ex.: cana,etanol_hidratado,atr). Padrão: todas"
+    )
+):
+    """
+    Cotações de cana, etanol (hidratado e anidro), açúcar (ICE nº 11 e
+    cristal) e ATR em uma única resposta
+    
+    Cada fonte tem seu próprio TTL; fontes vencidas são buscadas em
+    paralelo com requisições condicionais (304 quando a página não mudou).
+    Fontes com erro aparecem em `errors` e, se houver, mantêm os últimos
+    dados com stale=true.
+    """
+    keys = None
+    if sources:
+        keys = [s.strip() for s in sources.split(",") if s.strip()]
+        invalid = [k for k in keys if k not in commodity_quotes.sources]
+        if invalid:
+            raise HTTPException(
+                status_code=400,
+                detail={
+                    "error": {
+                        "code": "INVALID_QUOTATION_SOURCE",
+                        "message": f"Fontes inválidas: {', '.join(invalid)}. Use: {', '.join(commodity_quotes.sources)}"
+                    }
+                }
+            )
+    
+    result = await commodity_quotes.get_quotes(keys)
+    if not result["quotations"]:
+        raise HTTPException(
+            status_code=503,
+            detail={
+                "error": {
+                    "code": "QUOTATION_SCRAPING_ERROR",
+                    "message": "Não foi possível obter as cotações no momento.",
+                    "details": result["errors"]
+                }
+            }
+        )
+    return result
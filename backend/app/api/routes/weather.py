@@ -1,8 +1,15 @@
-from fastapi import APIRouter, Query, HTTPException
+from fastapi import APIRouter, Depends, Query, HTTPException
 from app.services.open_meteo import open_meteo_service
+from app.services.weather_history import WeatherHistoryService, weather_recorder
 from app.core.cache import weather_cache
 from app.core.sugarcane_analyzer import SugarcaneAnalyzer
-from datetime import datetime
+from app.core.resilience import UpstreamUnavailable
+from app.core.tracing import span, traced_json
+from app.database.mongodb import get_database
+from app.dependencies import expensive_rate_limit
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from datetime import datetime, timedelta, timezone
+from typing import Optional
 import logging
 
 router = APIRouter()
@@ -31,121 +38,129 @@ async def get_weather(
     """Retorna dados climáticos enriquecidos"""
     
     # Verificar cache (Mantenha sua lógica de cache aqui)
-    cached_data = weather_cache.get(lat, lon)
+    with span("cache"):
+        cached_data = weather_cache.get(lat, lon)
     if cached_data:
         cached_data["cached"] = True
-        return cached_data
+        return traced_json(cached_data)
     
     try:
         # Buscar dados da API
         raw_data = await open_meteo_service.get_current_weather(lat, lon)
         
-        current = raw_data.get("current", {})
-        daily = raw_data.get("daily", {})
+        # Registra a observação no histórico (gravação em lote, fora da requisição)
+        with span("record"):
+            weather_recorder.record(lat, lon, raw_data)
         
-        # Dados auxiliares
-        is_day = 1 # Simplificação, idealmente calcular baseado na hora
-        wmo_code = current.get("weather_code", 0)
+        with span("transform"):
+            current = raw_data.get("current", {})
+            daily = raw_data.get("daily", {})
         
-        # Mapeamento Estrutural para simular OpenWeatherMap (Necessário para o Frontend)
-        weather_structure = {
-            "coord": {"lat": lat, "lon": lon},
-            "weather": [{
-                "id": 800, # Dummy ID
-                "main": "Clear" if wmo_code == 0 else "Clouds", # Simplificado
-                "description": "Condição atual",
-                "icon": map_wmo_to_icon(wmo_code, is_day)
-            }],
-            "base": "stations",
-            "main": {
-                "temp": current.get("temperature_2m", 0),
-                "feels_like": current.get("temperature_2m", 0), # OpenMeteo free não tem feels_like direto no current
-                "temp_min": daily.get("temperature_2m_min", [0])[0],
-                "temp_max": daily.get("temperature_2m_max", [0])[0],
-                "pressure": current.get("pressure_msl", 1013),
-                "humidity": current.get("relative_humidity_2m", 0),
-            },
-            "visibility": 10000, # OpenMeteo não manda visibility no endpoint simples, hardcoded para não quebrar
-            "wind": {
-                "speed": current.get("wind_speed_10m", 0) / 3.6, # Convertendo km/h para m/s se necessário, ou ajuste no front
-                "deg": current.get("wind_direction_10m", 0)
-            },
-            "clouds": {
-                "all": current.get("cloud_cover", 0)
-            },
-            "rain": {
-                "1h": current.get("precipitation", 0)
-            },
-            "dt": int(datetime.utcnow().timestamp()),
-            "sys": {
-                "country": "BR", # Pode vir do geocoding, aqui fixo ou extraído do location_name
-                "sunrise": int(datetime.fromisoformat(daily.get("sunrise", [datetime.now().isoformat()])[0]).timestamp()),
-                "sunset": int(datetime.fromisoformat(daily.get("sunset", [datetime.now().isoformat()])[0]).timestamp())
-            },
-            "timezone": raw_data.get("utc_offset_seconds", -10800),
-            "id": 0,
-            "name": location_name,
-            "cod": 200
-        }
+            # Dados auxiliares
+            is_day = 1 # Simplificação, idealmente calcular baseado na hora
+            wmo_code = current.get("weather_code", 0)
+        
+            # Mapeamento Estrutural para simular OpenWeatherMap (Necessário para o Frontend)
+            weather_structure = {
+                "coord": {"lat": lat, "lon": lon},
+                "weather": [{
+                    "id": 800, # Dummy ID
+                    "main": "Clear" if wmo_code == 0 else "Clouds", # Simplificado
+                    "description": "Condição atual",
+                    "icon": map_wmo_to_icon(wmo_code, is_day)
+                }],
+                "base": "stations",
+                "main": {
+                    "temp": current.get("temperature_2m", 0),
+                    "feels_like": current.get("temperature_2m", 0), # OpenMeteo free não tem feels_like direto no current
+                    "temp_min": daily.get("temperature_2m_min", [0])[0],
+                    "temp_max": daily.get("temperature_2m_max", [0])[0],
+                    "pressure": current.get("pressure_msl", 1013),
+                    "humidity": current.get("relative_humidity_2m", 0),
+                },
+                "visibility": 10000, # OpenMeteo não manda visibility no endpoint simples, hardcoded para não quebrar
+                "wind": {
+                    "speed": current.get("wind_speed_10m", 0) / 3.6, # Convertendo km/h para m/s se necessário, ou ajuste no front
+                    "deg": current.get("wind_direction_10m", 0)
+                },
+                "clouds": {
+                    "all": current.get("cloud_cover", 0)
+                },
+                "rain": {
+                    "1h": current.get("precipitation", 0)
+                },
+                "dt": int(datetime.utcnow().timestamp()),
+                "sys": {
+                    "country": "BR", # Pode vir do geocoding, aqui fixo ou extraído do location_name
+                    "sunrise": int(datetime.fromisoformat(daily.get("sunrise", [datetime.now().isoformat()])[0]).timestamp()),
+                    "sunset": int(datetime.fromisoformat(daily.get("sunset", [datetime.now().isoformat()])[0]).timestamp())
+                },
+                "timezone": raw_data.get("utc_offset_seconds", -10800),
+                "id": 0,
+                "name": location_name,
+                "cod": 200
+            }
         
-        # Calcular UV (média das próximas 6h)
-        hourly = raw_data.get("hourly", {})
-        uv_val = 0
-        if "uv_index" in hourly and hourly["uv_index"]:
-            uv_val = sum(hourly["uv_index"][:6]) / 6
-            # Injeta UV em algum lugar que o front leia ou apenas no weather_data simplificado para análise
+            # Calcular UV (média das próximas 6h)
+            hourly = raw_data.get("hourly", {})
+            uv_val = 0
+            if "uv_index" in hourly and hourly["uv_index"]:
+                uv_val = sum(hourly["uv_index"][:6]) / 6
+                # Injeta UV em algum lugar que o front leia ou apenas no weather_data simplificado para análise
         
-        # Dados para análise interna (SugarcaneAnalyzer usa chaves simples)
-        analyzer_data = {
-            "temperature": current.get("temperature_2m", 0),
-            "humidity": current.get("relative_humidity_2m", 0),
-            "precipitation": current.get("precipitation", 0),
-            "wind_speed": current.get("wind_speed_10m", 0),
-            "uv_index": uv_val
-        }
+            # Dados para análise interna (SugarcaneAnalyzer usa chaves simples)
+            analyzer_data = {
+                "temperature": current.get("temperature_2m", 0),
+                "humidity": current.get("relative_humidity_2m", 0),
+                "precipitation": current.get("precipitation", 0),
+                "wind_speed": current.get("wind_speed_10m", 0),
+                "uv_index": uv_val
+            }
         
         # Análise para cana-de-açúcar
-        analysis = SugarcaneAnalyzer.analyze(analyzer_data)
+        with span("analyze"):
+            analysis = SugarcaneAnalyzer.analyze(analyzer_data)
         
-        # Previsão (Forecast) - Mantém estrutura para o gráfico
-        forecast_list = []
-        # Precisaríamos converter o daily do OpenMeteo para a lista de 3h do OpenWeather
-        # Para simplificar e não quebrar o gráfico, vamos criar um mock baseado no daily
-        for i in range(len(daily.get("time", []))):
-            forecast_list.append({
-                "dt": int(datetime.fromisoformat(daily["time"][i]).timestamp()),
-                "main": {
-                    "temp": daily["temperature_2m_max"][i],
-                    "temp_min": daily["temperature_2m_min"][i],
-                    "temp_max": daily["temperature_2m_max"][i],
-                    "humidity": 60 # Mock
-                },
-                "weather": [{"main": "Rain" if daily["precipitation_sum"][i] > 0 else "Clear", "icon": "01d"}],
-                "clouds": {"all": 0},
-                "wind": {"speed": 10, "deg": 0},
-                "visibility": 10000,
-                "pop": 0.5 if daily["precipitation_sum"][i] > 0 else 0,
-                "rain": {"3h": daily["precipitation_sum"][i]},
-                "sys": {"pod": "d"},
-                "dt_txt": f"{daily['time'][i]} 12:00:00"
-            })
+        with span("forecast"):
+            # Previsão (Forecast) - Mantém estrutura para o gráfico
+            forecast_list = []
+            # Precisaríamos converter o daily do OpenMeteo para a lista de 3h do OpenWeather
+            # Para simplificar e não quebrar o gráfico, vamos criar um mock baseado no daily
+            for i in range(len(daily.get("time", []))):
+                forecast_list.append({
+                    "dt": int(datetime.fromisoformat(daily["time"][i]).timestamp()),
+                    "main": {
+                        "temp": daily["temperature_2m_max"][i],
+                        "temp_min": daily["temperature_2m_min"][i],
+                        "temp_max": daily["temperature_2m_max"][i],
+                        "humidity": 60 # Mock
+                    },
+                    "weather": [{"main": "Rain" if daily["precipitation_sum"][i] > 0 else "Clear", "icon": "01d"}],
+                    "clouds": {"all": 0},
+                    "wind": {"speed": 10, "deg": 0},
+                    "visibility": 10000,
+                    "pop": 0.5 if daily["precipitation_sum"][i] > 0 else 0,
+                    "rain": {"3h": daily["precipitation_sum"][i]},
+                    "sys": {"pod": "d"},
+                    "dt_txt": f"{daily['time'][i]} 12:00:00"
+                })
 
-        forecast_response = {
-            "cod": "200",
-            "message": 0,
-            "cnt": len(forecast_list),
-            "list": forecast_list,
-            "city": {
-                "id": 0,
-                "name": location_name,
-                "coord": {"lat": lat, "lon": lon},
-                "country": "BR",
-                "population": 0,
-                "timezone": raw_data.get("utc_offset_seconds", 0),
-                "sunrise": weather_structure["sys"]["sunrise"],
-                "sunset": weather_structure["sys"]["sunset"]
+            forecast_response = {
+                "cod": "200",
+                "message": 0,
+                "cnt": len(forecast_list),
+                "list": forecast_list,
+                "city": {
+                    "id": 0,
+                    "name": location_name,
+                    "coord": {"lat": lat, "lon": lon},
+                    "country": "BR",
+                    "population": 0,
+                    "timezone": raw_data.get("utc_offset_seconds", 0),
+                    "sunrise": weather_structure["sys"]["sunrise"],
+                    "sunset": weather_structure["sys"]["sunset"]
+                }
             }
-        }
         
         # Montar resposta final com a chave "current" (não current_weather)
         response = {
@@ -165,15 +180,97 @@ async def get_weather(
         # Salvar no cache
         weather_cache.set(lat, lon, response)
         
-        return response
+        return traced_json(response)
         
     except Exception as e:
         logger.error(f"Erro ao buscar dados climáticos: {e}")
+        
+        # Open-Meteo fora do ar (ou circuito aberto): serve o último dado, se houver
+        stale_data = weather_cache.get_stale(lat, lon)
+        if stale_data is not None:
+            logger.warning(f"[Weather] Servindo dados stale para {lat}, {lon}")
+            return traced_json({**stale_data, "cached": True, "stale": True})
+        
         raise HTTPException(
-            status_code=500,
+            status_code=503 if isinstance(e, UpstreamUnavailable) else 500,
             detail={
                 "code": "WEATHER_API_ERROR",
                 "message": "Não foi possível obter dados climáticos",
                 "details": str(e)
             }
         )
+
+
+def get_weather_history_service(db: AsyncIOMotorDatabase = Depends(get_database)) -> WeatherHistoryService:
+    return WeatherHistoryService(db)
+
+def _naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Datas com fuso viram UTC sem tzinfo, como as gravadas no histórico"""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def _history_range(date_from: Optional[datetime], date_to: Optional[datetime], default_days: int):
+    date_from, date_to = _naive_utc(date_from), _naive_utc(date_to)
+    date_to = date_to or datetime.utcnow()
+    date_from = date_from or date_to - timedelta(days=default_days)
+    if date_from > date_to:
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "code": "INVALID_DATE_RANGE",
+                "message": "date_from deve ser anterior a date_to"
+            }
+        )
+    return date_from, date_to
+
+@router.get("/weather/history", dependencies=[Depends(expensive_rate_limit())])
+async def get_weather_history(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    date_from: Optional[datetime] = Query(None),
+    date_to: Optional[datetime] = Query(None),
+    limit: int = Query(1000, ge=1, le=5000),
+    service: WeatherHistoryService = Depends(get_weather_history_service)
+):
+    """Observações registradas para a célula (~1km), sem consultar a Open-Meteo"""
+    date_from, date_to = _history_range(date_from, date_to, default_days=7)
+    try:
+        observations = await service.get_observations(lat, lon, date_from, date_to, limit)
+    except Exception as e:
+        logger.error(f"Erro ao buscar histórico climático: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail={"code": "DATABASE_ERROR", "message": "Erro ao buscar histórico climático"}
+        )
+    return {
+        "location": {"lat": lat, "lon": lon},
+        "from": date_from.isoformat(),
+        "to": date_to.isoformat(),
+        "observations": observations
+    }
+
+@router.get("/weather/history/daily", dependencies=[Depends(expensive_rate_limit())])
+async def get_weather_history_daily(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    date_from: Optional[datetime] = Query(None),
+    date_to: Optional[datetime] = Query(None),
+    service: WeatherHistoryService = Depends(get_weather_history_service)
+):
+    """Resumo diário (temperatura mín/máx/média e chuva acumulada) da célula"""
+    date_from, date_to = _history_range(date_from, date_to, default_days=30)
+    try:
+        days = await service.get_daily_summary(lat, lon, date_from, date_to)
+    except Exception as e:
+        logger.error(f"Erro ao agregar histórico climático: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail={"code": "DATABASE_ERROR", "message": "Erro ao buscar histórico climático"}
+        )
+    return {
+        "location": {"lat": lat, "lon": lon},
+        "from": date_from.isoformat(),
+        "to": date_to.isoformat(),
+        "days": days
+    }
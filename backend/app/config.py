@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import List, Set
 
 class Settings(BaseSettings):
     # Application
@@ -14,23 +14,139 @@ class Settings(BaseSettings):
     # MongoDB
     MONGODB_URL: str = "mongodb://localhost:27017/sugarcane"
     MONGODB_DB_NAME: str = "sugarcane"
+    MONGODB_MAX_POOL_SIZE: int = 50
+    MONGODB_MIN_POOL_SIZE: int = 5
+    MONGODB_MAX_IDLE_TIME_MS: int = 60000
+    MONGODB_SERVER_SELECTION_TIMEOUT_MS: int = 5000
+    # Lista separada por vírgula, em ordem de preferência (zstd, snappy, zlib).
+    # zstd e snappy exigem os pacotes zstandard / python-snappy
+    MONGODB_COMPRESSORS: str = "zlib"
+    MONGODB_ENSURE_INDEXES: bool = True
+    # False: o app sobe sem esperar o MongoDB; /readyz fica 503 até o banco responder
+    MONGODB_WAIT_ON_STARTUP: bool = False
+    
+    # Probes: /readyz e /health leem o resultado do ping em background
+    READINESS_PING_SECONDS: float = 15.0
+    READINESS_PING_TIMEOUT_SECONDS: float = 2.0
     
     # Cache
-    CACHE_TTL_MINUTES: int = 30
+    CACHE_TTL_MINUTES: float = 30
+    # Dados climáticos expirados servidos quando a Open-Meteo falha
+    WEATHER_STALE_MINUTES: int = 360
+    GEOCODING_CACHE_TTL_SECONDS: int = 86400
+    # "memory" (um cache por processo) ou "shared" (mmap compartilhado entre
+    # os workers do host: clima, cotação e notícias)
+    CACHE_BACKEND: str = "memory"
+    SHARED_CACHE_DIR: str = "/dev/shm"
+    SHARED_CACHE_WEATHER_SLOTS: int = 2048
+    # Snapshots em disco dos caches (warm restart): gravados periodicamente e
+    # no shutdown, carregados no startup
+    CACHE_SNAPSHOT_ENABLED: bool = True
+    CACHE_SNAPSHOT_DIR: str = "cache_snapshots"
+    CACHE_SNAPSHOT_INTERVAL_SECONDS: float = 300.0
+    
+    # Histórico climático (collection time-series)
+    WEATHER_HISTORY_FLUSH_SECONDS: float = 30.0
+    WEATHER_HISTORY_BATCH_SIZE: int = 200
+    WEATHER_HISTORY_RETENTION_DAYS: int = 730
+    
+    # Insights
+    INSIGHTS_EXPORT_BATCH_SIZE: int = 500
+    INSIGHTS_BULK_CHUNK_SIZE: int = 500
+    REACTIONS_FLUSH_INTERVAL_SECONDS: float = 5.0
+    REACTIONS_FLUSH_THRESHOLD: int = 500
+    NEARBY_CACHE_TTL_SECONDS: int = 120
+    CLUSTER_CACHE_TTL_SECONDS: int = 300
+    INSIGHTS_PAGE_CACHE_TTL_SECONDS: int = 60
+    INSIGHTS_CACHE_VERSION_CHECK_SECONDS: float = 1.0
+    
+    # Endereços dos serviços externos (sobrescritos nos benchmarks por stubs locais)
+    OPEN_METEO_BASE_URL: str = "https://api.open-meteo.com/v1"
+    NEWSAPI_BASE_URL: str = "https://newsapi.org/v2"
+    NOMINATIM_DOMAIN: str = "nominatim.openstreetmap.org"
+    NOMINATIM_SCHEME: str = "https"
+    NOTICIAS_AGRICOLAS_BASE_URL: str = "https://www.noticiasagricolas.com.br"
     
     # External APIs
     NEWSAPI_KEY: str = ""
+    NEWSAPI_DAILY_QUOTA: int = 100
+    # "mongo": contador do dia compartilhado entre réplicas (collection
+    # news_quota); "memory": um contador por processo
+    NEWSAPI_QUOTA_BACKEND: str = "mongo"
+    NEWS_CACHE_TTL_MINUTES: int = 60
+    NEWS_REFRESH_ENABLED: bool = True
+    NEWS_REFRESH_CHECK_SECONDS: float = 60.0
+    NEWS_REFRESH_MIN_INTERVAL_MINUTES: int = 60
+    NEWS_REFRESH_QUOTA_SHARE: float = 0.8
     
     # CORS
     CORS_ORIGINS: str = "http://localhost:3000"
     
-    # Rate Limiting
+    # Cotação
+    QUOTATION_RETRY_AFTER_ERROR_SECONDS: int = 60
+    QUOTATION_MAX_CONCURRENCY: int = 3
+    
+    # Rate Limiting (token bucket por cliente; o Nginx continua limitando por IP)
+    RATE_LIMIT_ENABLED: bool = True
     RATE_LIMIT_PER_MINUTE: int = 60
+    # Rotas caras (bulk, export): orçamento separado por cliente e rota
+    RATE_LIMIT_EXPENSIVE_PER_MINUTE: int = 10
+    RATE_LIMIT_BACKEND: str = "memory"  # "memory" ou "mongo" (orçamento global entre réplicas)
+    RATE_LIMIT_CLEANUP_SECONDS: float = 60.0
+    # Usa X-Real-IP (definido pelo Nginx) como IP do cliente. Só ligue atrás
+    # do proxy: quem acessa o uvicorn direto poderia forjar o header
+    RATE_LIMIT_TRUST_PROXY: bool = False
+    # Endereços/redes (separados por vírgula) cujo X-Real-IP é aceito; vazio
+    # aceita de qualquer conexão (quando RATE_LIMIT_TRUST_PROXY=True)
+    RATE_LIMIT_TRUSTED_PROXIES: str = ""
+    # Backend mongo: tempo máximo de espera pelo MongoDB por requisição e
+    # pausa (usando os buckets locais) depois de uma falha
+    RATE_LIMIT_MONGO_TIMEOUT_SECONDS: float = 0.25
+    RATE_LIMIT_MONGO_RETRY_SECONDS: float = 10.0
+    # API keys reconhecidas (separadas por vírgula), cada uma com seu próprio bucket
+    RATE_LIMIT_API_KEYS: str = ""
+    
+    # Resiliência dos serviços externos
+    CIRCUIT_FAILURE_THRESHOLD: int = 5
+    CIRCUIT_RECOVERY_SECONDS: float = 30.0
+    UPSTREAM_MAX_RETRIES: int = 2
+    # Fração máxima de chamadas extras geradas por retries
+    RETRY_BUDGET_RATIO: float = 0.2
+    # Tempo total por requisição (o cliente pode reduzir com X-Request-Timeout)
+    REQUEST_DEADLINE_SECONDS: float = 15.0
+    
+    # Observabilidade
+    METRICS_ENABLED: bool = True
+    SLOW_REQUEST_MS: float = 1000.0
+    TRACING_ENABLED: bool = True
+    TRACING_SERVER_TIMING: bool = True
+    # Fração das requisições exportadas (0 desativa a exportação)
+    TRACING_SAMPLE_RATE: float = 0.0
+    # Honra o flag sampled do traceparent recebido (só atrás de um gateway
+    # que define o header; senão o cliente forçaria a exportação)
+    TRACING_TRUST_TRACEPARENT: bool = False
+    TRACING_EXPORTER: str = ""  # "file" ou "otlp"
+    TRACING_FILE_PATH: str = "traces.jsonl"
+    TRACING_OTLP_ENDPOINT: str = "http://localhost:4318/v1/traces"
+    TRACING_EXPORT_INTERVAL_SECONDS: float = 5.0
+    TRACING_SERVICE_NAME: str = "cana-data-api"
     
     @property
     def cors_origins_list(self) -> List[str]:
         return [origin.strip() for origin in self.CORS_ORIGINS.split(",")]
     
+    @property
+    def mongodb_compressors_list(self) -> List[str]:
+        return [c.strip() for c in self.MONGODB_COMPRESSORS.split(",") if c.strip()]
+    
+    @property
+    def rate_limit_api_keys_set(self) -> Set[str]:
+        return {k.strip() for k in self.RATE_LIMIT_API_KEYS.split(",") if k.strip()}
+    
+    @property
+    def rate_limit_trusted_proxies_list(self) -> List[str]:
+        return [p.strip() for p in self.RATE_LIMIT_TRUSTED_PROXIES.split(",") if p.strip()]
+    
     class Config:
         env_file = ".env"
         case_sensitive = True
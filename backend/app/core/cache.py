@@ -1,13 +1,23 @@
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Callable, Iterable, List
 import logging
+import time
+
+from app.config import settings
+from app.core.metrics import CacheStats
+from app.core.shm import SharedMemoryTable, decode_value, encode_value, shared_cache_path
+from app.core.snapshot import SnapshotEntry
 
 logger = logging.getLogger(__name__)
 
 class WeatherCache:
-    def __init__(self, ttl_minutes: int = 30):
+    def __init__(self, ttl_minutes: float = 30, name: str = "weather", stale_minutes: int = 0):
         self._cache: Dict[str, Dict[str, Any]] = {}
         self.ttl = timedelta(minutes=ttl_minutes)
+        # Entradas expiradas ficam disponíveis para get_stale por esse tempo
+        self.stale_window = timedelta(minutes=stale_minutes)
+        self.stats = CacheStats(name)
     
     def _generate_key(self, lat: float, lon: float) -> str:
         """Gera chave única arredondando coordenadas para 2 decimais (~1km)"""
@@ -19,12 +29,23 @@ class WeatherCache:
         key = self._generate_key(lat, lon)
         if key in self._cache:
             entry = self._cache[key]
-            if datetime.now() < entry['expires_at']:
+            now = datetime.now()
+            if now < entry['expires_at']:
                 logger.info(f"Cache HIT: {key}")
+                self.stats.hits.inc()
                 return entry['data']
-            else:
+            elif now >= entry['expires_at'] + self.stale_window:
                 del self._cache[key]
+                self.stats.evictions.inc()
                 logger.info(f"Cache EXPIRED: {key}")
+        self.stats.misses.inc()
+        return None
+    
+    def get_stale(self, lat: float, lon: float) -> Optional[Dict[str, Any]]:
+        """Dados expirados há menos de stale_window (fallback quando o upstream falha)"""
+        entry = self._cache.get(self._generate_key(lat, lon))
+        if entry is not None and datetime.now() < entry['expires_at'] + self.stale_window:
+            return entry['data']
         return None
     
     def set(self, lat: float, lon: float, data: Dict[str, Any]):
@@ -41,12 +62,164 @@ class WeatherCache:
         now = datetime.now()
         expired_keys = [
             k for k, v in self._cache.items() 
-            if now >= v['expires_at']
+            if now >= v['expires_at'] + self.stale_window
         ]
         for key in expired_keys:
             del self._cache[key]
         if expired_keys:
+            self.stats.evictions.inc(len(expired_keys))
             logger.info(f"Cleared {len(expired_keys)} expired cache entries")
+    
+    def snapshot_entries(self) -> List[SnapshotEntry]:
+        """Entradas para app.core.snapshot (expiração em time.time())"""
+        stale = self.stale_window.total_seconds()
+        entries = []
+        for key, entry in list(self._cache.items()):
+            expires_at = entry['expires_at'].timestamp()
+            entries.append((key, expires_at, expires_at + stale, entry['data']))
+        return entries
+    
+    def restore_entries(self, entries: Iterable[SnapshotEntry]) -> int:
+        """Carrega entradas de um snapshot, sem sobrescrever as já cacheadas"""
+        restored = 0
+        for key, expires_at, _, value in entries:
+            if key in self._cache:
+                continue
+            expires = datetime.fromtimestamp(expires_at)
+            self._cache[key] = {
+                'data': decode_value(value),
+                'expires_at': expires,
+                'created_at': expires - self.ttl
+            }
+            restored += 1
+        return restored
+
+class SharedWeatherCache(WeatherCache):
+    """
+    WeatherCache em memória compartilhada (app.core.shm)
+    
+    Mesma interface; a resposta é guardada serializada em um slot da tabela
+    mmap, compartilhada por todos os workers do host. Cada `get` devolve
+    uma cópia nova do dict.
+    """
+    
+    def __init__(self, table: SharedMemoryTable, ttl_minutes: float = 30, name: str = "weather", stale_minutes: int = 0):
+        super().__init__(ttl_minutes=ttl_minutes, name=name, stale_minutes=stale_minutes)
+        self.table = table
+    
+    def get(self, lat: float, lon: float) -> Optional[Dict[str, Any]]:
+        key = self._generate_key(lat, lon)
+        data = self.table.get(key)
+        if data is None:
+            self.stats.misses.inc()
+            return None
+        logger.info(f"Cache HIT: {key}")
+        self.stats.hits.inc()
+        return decode_value(data)
+    
+    def get_stale(self, lat: float, lon: float) -> Optional[Dict[str, Any]]:
+        data = self.table.get(self._generate_key(lat, lon), allow_stale=True)
+        return None if data is None else decode_value(data)
+    
+    def set(self, lat: float, lon: float, data: Dict[str, Any]):
+        key = self._generate_key(lat, lon)
+        if self.table.set(key, encode_value(data), self.ttl.total_seconds(), self.stale_window.total_seconds()):
+            logger.info(f"Cache SET: {key}")
+        else:
+            logger.warning(f"[SharedCache] {key} não foi cacheado (slot pequeno ou ocupado)")
+    
+    def clear_expired(self):
+        cleared = self.table.clear_expired()
+        if cleared:
+            self.stats.evictions.inc(cleared)
+            logger.info(f"Cleared {cleared} expired cache entries")
+    
+    def snapshot_entries(self) -> List[SnapshotEntry]:
+        return list(self.table.items())
+    
+    def restore_entries(self, entries: Iterable[SnapshotEntry]) -> int:
+        return self.table.load_entries(entries)
+
+class TTLCache:
+    """
+    Cache genérico por chave com TTL e limite de entradas (LRU)
+    
+    Cada entrada pode carregar metadados (`meta`) usados para invalidação
+    seletiva, por exemplo o centro e o raio de uma busca geográfica.
+    """
+    
+    def __init__(self, ttl_seconds: float, max_entries: int = 1024, name: str = "cache"):
+        self._cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.name = name
+        self.stats = CacheStats(name)
+    
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._cache.get(key)
+        if entry is None:
+            self.stats.misses.inc()
+            return None
+        if time.monotonic() >= entry['expires_at']:
+            del self._cache[key]
+            self.stats.evictions.inc()
+            self.stats.misses.inc()
+            return None
+        self._cache.move_to_end(key)
+        self.stats.hits.inc()
+        logger.debug(f"[{self.name}] Cache HIT: {key}")
+        return entry['data']
+    
+    def set(self, key: str, data: Any, meta: Any = None, ttl_seconds: Optional[float] = None):
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        self._cache[key] = {
+            'data': data,
+            'meta': meta,
+            'expires_at': time.monotonic() + ttl
+        }
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+            self.stats.evictions.inc()
+    
+    def delete(self, key: str):
+        self._cache.pop(key, None)
+    
+    def invalidate(self, predicate: Callable[[str, Any], bool]) -> int:
+        """Remove as entradas para as quais predicate(key, meta) é verdadeiro"""
+        keys = [k for k, v in self._cache.items() if predicate(k, v['meta'])]
+        for key in keys:
+            del self._cache[key]
+        if keys:
+            logger.info(f"[{self.name}] {len(keys)} entradas invalidadas")
+        return len(keys)
+    
+    def clear(self):
+        self._cache.clear()
+    
+    def clear_expired(self):
+        """Remove entradas expiradas"""
+        now = time.monotonic()
+        expired_keys = [k for k, v in self._cache.items() if now >= v['expires_at']]
+        for key in expired_keys:
+            del self._cache[key]
+        if expired_keys:
+            self.stats.evictions.inc(len(expired_keys))
+            logger.info(f"[{self.name}] Cleared {len(expired_keys)} expired cache entries")
 
-# Instância global
-weather_cache = WeatherCache()
+# Instância global ("shared": uma tabela por host para todos os workers)
+if settings.CACHE_BACKEND == "shared":
+    weather_cache = SharedWeatherCache(
+        SharedMemoryTable(
+            shared_cache_path("weather", settings.SHARED_CACHE_DIR),
+            slots=settings.SHARED_CACHE_WEATHER_SLOTS,
+            slot_size=8192
+        ),
+        ttl_minutes=settings.CACHE_TTL_MINUTES,
+        stale_minutes=settings.WEATHER_STALE_MINUTES
+    )
+else:
+    weather_cache = WeatherCache(
+        ttl_minutes=settings.CACHE_TTL_MINUTES,
+        stale_minutes=settings.WEATHER_STALE_MINUTES
+    )
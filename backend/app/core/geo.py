@@ -0,0 +1,21 @@
+"""
+Utilitários geográficos (distâncias e quantização de coordenadas)
+"""
+
+from math import asin, cos, radians, sin, sqrt
+from typing import Tuple
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Distância em km entre dois pontos (fórmula de haversine)"""
+    dlat = radians(lat2 - lat1)
+    dlon = radians(lon2 - lon1)
+    a = sin(dlat / 2) ** 2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * asin(sqrt(a))
+
+
+def snap_to_cell(lat: float, lon: float, decimals: int = 2) -> Tuple[float, float]:
+    """Arredonda coordenadas para o centro da célula (2 decimais ≈ 1km)"""
+    return round(lat, decimals), round(lon, decimals)
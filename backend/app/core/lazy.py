@@ -0,0 +1,56 @@
+"""
+Imports adiados de dependências pesadas
+
+bs4/lxml (parse das cotações) e geopy (geocoding) só são usados por algumas
+rotas; importá-los no carregamento do app atrasa o startup de toda réplica.
+
+    bs4 = LazyModule("bs4")
+    soup = bs4.BeautifulSoup(html, "lxml")   # importa aqui, uma única vez
+
+Depois que o app sobe, `preload_lazy_modules` importa os módulos registrados
+em uma thread, para que a primeira requisição não pague o import.
+"""
+
+import importlib
+import logging
+import time
+from types import ModuleType
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+_registry: List["LazyModule"] = []
+
+
+class LazyModule:
+    def __init__(self, name: str):
+        self._name = name
+        self._module: Optional[ModuleType] = None
+        _registry.append(self)
+
+    def load(self) -> ModuleType:
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return self._module
+
+    @property
+    def loaded(self) -> bool:
+        return self._module is not None
+
+    def __getattr__(self, attr: str):
+        return getattr(self.load(), attr)
+
+    def __repr__(self):
+        state = "carregado" if self._module is not None else "não carregado"
+        return f"<LazyModule {self._name} ({state})>"
+
+
+def preload_lazy_modules():
+    """Importa os módulos adiados (chamado via asyncio.to_thread após o startup)"""
+    started = time.perf_counter()
+    for module in _registry:
+        try:
+            module.load()
+        except ImportError as e:
+            logger.warning(f"[Lazy] Não foi possível importar {module._name}: {e}")
+    logger.info(f"[Lazy] {len(_registry)} módulos pré-carregados em {(time.perf_counter() - started) * 1000:.0f}ms")
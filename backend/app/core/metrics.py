@@ -0,0 +1,236 @@
+"""
+Métricas no formato texto do Prometheus (sem dependências externas)
+
+Cada família guarda seus filhos por tupla de labels. `labels()` devolve
+sempre o mesmo objeto para a mesma tupla, então os pontos quentes (cache,
+middleware) guardam a referência ao filho já alocado e cada observação
+custa só um incremento ou um bisect.
+"""
+
+import time
+from bisect import bisect_left
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from app.core.tracing import span
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+UPSTREAM_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+
+class _GaugeChild(_CounterChild):
+    __slots__ = ()
+
+    def dec(self, amount: float = 1.0):
+        self.value -= amount
+
+    def set(self, value: float):
+        self.value = value
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        # Contagens não cumulativas; a última posição é o +Inf
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values) -> object:
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name}: esperados labels {self.labelnames}")
+            child = self._children[key] = self._new_child()
+        return child
+
+    def _samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.value)}"
+            for key, child in self._children.items()
+        ]
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def _samples(self) -> List[str]:
+        lines = []
+        for key, child in self._children.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), child.counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(child.sum)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(m.render() for m in self._metrics) + "\n"
+
+
+registry = MetricsRegistry()
+
+HTTP_REQUEST_DURATION = registry.register(Histogram(
+    "http_request_duration_seconds",
+    "Duração das requisições HTTP por rota",
+    ("method", "route", "status")
+))
+HTTP_REQUESTS_IN_FLIGHT = registry.register(Gauge(
+    "http_requests_in_flight",
+    "Requisições HTTP em andamento por rota",
+    ("method", "route")
+))
+UPSTREAM_REQUEST_DURATION = registry.register(Histogram(
+    "upstream_request_duration_seconds",
+    "Duração das chamadas a serviços externos",
+    ("service", "status"),
+    buckets=UPSTREAM_BUCKETS
+))
+CACHE_HITS = registry.register(Counter("cache_hits_total", "Acertos de cache", ("cache",)))
+CACHE_MISSES = registry.register(Counter("cache_misses_total", "Faltas de cache", ("cache",)))
+CACHE_EVICTIONS = registry.register(Counter(
+    "cache_evictions_total",
+    "Entradas removidas do cache (expiração ou limite de tamanho)",
+    ("cache",)
+))
+
+
+class CacheStats:
+    """Contadores pré-alocados de um cache"""
+
+    __slots__ = ("hits", "misses", "evictions")
+
+    def __init__(self, name: str):
+        self.hits = CACHE_HITS.labels(name)
+        self.misses = CACHE_MISSES.labels(name)
+        self.evictions = CACHE_EVICTIONS.labels(name)
+
+
+class upstream_timer:
+    """
+    Mede uma chamada externa e registra no histograma por serviço e status
+
+        with upstream_timer("open_meteo") as call:
+            response = await client.get(...)
+            call.status = response.status_code
+
+    Se nenhum status for definido, exceções viram "timeout" ou "error".
+    A chamada também vira um span de tracing com o nome do serviço.
+    """
+
+    __slots__ = ("service", "status", "_start", "_span")
+
+    def __init__(self, service: str):
+        self.service = service
+        self.status: Optional[object] = None
+
+    def __enter__(self):
+        self._span = span(self.service)
+        self._span.__enter__()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        status = self.status
+        if exc_type is not None and status is None:
+            status = "timeout" if "Timeout" in exc_type.__name__ or "TimedOut" in exc_type.__name__ else "error"
+        elif status is None:
+            status = "ok"
+        UPSTREAM_REQUEST_DURATION.labels(self.service, status).observe(time.perf_counter() - self._start)
+        self._span.set_attribute("status", str(status))
+        self._span.__exit__(exc_type, exc, tb)
+        return False
@@ -0,0 +1,24 @@
+"""
+Cursores opacos para paginação por keyset
+"""
+
+import base64
+import json
+from typing import Any, Dict
+
+
+def encode_cursor(values: Dict[str, Any]) -> str:
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """Decodifica o cursor; levanta ValueError se inválido"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded))
+    except Exception as e:
+        raise ValueError("Cursor de paginação inválido") from e
+    if not isinstance(values, dict):
+        raise ValueError("Cursor de paginação inválido")
+    return values
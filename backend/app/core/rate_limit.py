@@ -0,0 +1,137 @@
+"""
+Token buckets para rate limiting
+
+Cada bucket tem capacidade `capacity` (rajada máxima) e é reabastecido a
+`rate` tokens por segundo. Dois backends com a mesma interface:
+
+- MemoryTokenBuckets: estado O(1) por chave em um dict; buckets que já
+  teriam voltado a ficar cheios são removidos periodicamente (equivalem a
+  um bucket inexistente);
+- MongoTokenBuckets: um documento por chave na collection `rate_limits`,
+  atualizado atomicamente por um pipeline de update, para que as réplicas
+  compartilhem um único orçamento. Se o MongoDB falhar ou não responder em
+  `timeout`, cai para o backend em memória (fail-open local em vez de
+  derrubar a API) e continua nele por `retry_after_failure` segundos, para
+  que as requisições não esperem a seleção de servidor uma a uma.
+"""
+
+import asyncio
+import logging
+import math
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Tuple
+
+from pymongo import ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+# (permitido, tokens restantes, segundos até haver tokens suficientes)
+TakeResult = Tuple[bool, float, float]
+
+
+def _retry_after(tokens: float, cost: float, rate: float) -> float:
+    return 0.0 if tokens >= cost else (cost - tokens) / rate
+
+
+class MemoryTokenBuckets:
+    def __init__(self, cleanup_interval: float = 60.0, clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        self._buckets: Dict[str, List[float]] = {}  # chave -> [tokens, atualizado_em, segundos_até_encher]
+        self.cleanup_interval = cleanup_interval
+        self._last_cleanup = clock()
+
+    def _cleanup(self, now: float):
+        full = [k for k, (_, updated, refill) in self._buckets.items() if now - updated >= refill]
+        for key in full:
+            del self._buckets[key]
+        self._last_cleanup = now
+        if full:
+            logger.debug(f"[RateLimit] {len(full)} buckets ociosos removidos")
+
+    def take_sync(self, key: str, capacity: float, rate: float, cost: float = 1.0) -> TakeResult:
+        now = self.clock()
+        if now - self._last_cleanup >= self.cleanup_interval:
+            self._cleanup(now)
+
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            tokens = capacity
+        else:
+            tokens = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+
+        allowed = tokens >= cost
+        if allowed:
+            tokens -= cost
+        self._buckets[key] = [tokens, now, (capacity - tokens) / rate]
+        return allowed, tokens, _retry_after(tokens, cost, rate)
+
+    async def take(self, key: str, capacity: float, rate: float, cost: float = 1.0) -> TakeResult:
+        return self.take_sync(key, capacity, rate, cost)
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class MongoTokenBuckets:
+    COLLECTION = "rate_limits"
+
+    def __init__(
+        self,
+        get_db,
+        fallback: MemoryTokenBuckets,
+        timeout: float = 0.25,
+        retry_after_failure: float = 10.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self._get_db = get_db
+        self.fallback = fallback
+        self.timeout = timeout
+        self.retry_after_failure = retry_after_failure
+        self.clock = clock
+        self._down_until = 0.0
+
+    @staticmethod
+    def _pipeline(now: datetime, capacity: float, rate: float, cost: float) -> list:
+        elapsed = {"$divide": [{"$subtract": [now, {"$ifNull": ["$updated_at", now]}]}, 1000]}
+        refill_seconds = math.ceil(capacity / rate)
+        return [
+            {"$set": {
+                "tokens": {"$min": [capacity, {"$add": [
+                    {"$ifNull": ["$tokens", capacity]},
+                    {"$multiply": [elapsed, rate]}
+                ]}]},
+                "updated_at": now,
+            }},
+            {"$set": {"allowed": {"$gte": ["$tokens", cost]}}},
+            {"$set": {
+                "tokens": {"$cond": ["$allowed", {"$subtract": ["$tokens", cost]}, "$tokens"]},
+                # Sem uso por esse tempo, o bucket estaria cheio: o índice TTL o remove
+                "expires_at": now + timedelta(seconds=refill_seconds),
+            }},
+        ]
+
+    async def take(self, key: str, capacity: float, rate: float, cost: float = 1.0) -> TakeResult:
+        db = self._get_db()
+        if db is None or self.clock() < self._down_until:
+            return self.fallback.take_sync(key, capacity, rate, cost)
+        try:
+            doc = await asyncio.wait_for(
+                db[self.COLLECTION].find_one_and_update(
+                    {"_id": key},
+                    self._pipeline(datetime.utcnow(), capacity, rate, cost),
+                    upsert=True,
+                    return_document=ReturnDocument.AFTER,
+                ),
+                timeout=self.timeout,
+            )
+        except Exception as e:
+            self._down_until = self.clock() + self.retry_after_failure
+            logger.warning(
+                f"[RateLimit] MongoDB indisponível ({type(e).__name__}), usando buckets locais "
+                f"por {self.retry_after_failure:.0f}s: {e}"
+            )
+            return self.fallback.take_sync(key, capacity, rate, cost)
+
+        tokens = doc["tokens"]
+        return doc["allowed"], tokens, _retry_after(tokens, cost, rate)
@@ -0,0 +1,303 @@
+"""
+Camada de resiliência para serviços externos
+
+Cada upstream (Open-Meteo, NewsAPI, Nominatim, noticiasagricolas) tem:
+
+- CircuitBreaker: após `failure_threshold` chamadas seguidas que falharam
+  (uma falha por chamada, depois de esgotados os retries) o circuito abre
+  e as chamadas falham na hora (CircuitOpenError) por `recovery_timeout`
+  segundos; depois disso uma chamada de teste (half-open) decide se fecha;
+- RetryBudget: retries com backoff exponencial e jitter, limitados a uma
+  fração (`ratio`) das chamadas, para não multiplicar a carga de um
+  upstream já degradado;
+- deadline: o timeout de cada tentativa é o menor entre o do upstream e o
+  tempo que ainda resta da requisição de entrada (definido pelo
+  RequestContextMiddleware a partir de REQUEST_DEADLINE_SECONDS ou do
+  header X-Request-Timeout). Uma tentativa que estourou um timeout encurtado
+  pelo deadline levanta DeadlineExceeded e não conta como falha do upstream.
+
+Toda falha do upstream (timeout, exceções de `retry_exceptions`, circuito
+aberto, deadline) chega a quem chama como UpstreamUnavailable, que trata
+servindo dados em cache/stale ou respondendo 503.
+"""
+
+import asyncio
+import logging
+import random
+import time
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, Type
+
+import httpx
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Menor timeout aceitável para uma tentativa; abaixo disso nem tenta
+MIN_ATTEMPT_TIMEOUT = 0.2
+
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+def set_deadline(seconds: float):
+    """Define o deadline da requisição atual; retorna o token para reset_deadline"""
+    return _deadline.set(time.monotonic() + seconds)
+
+
+def reset_deadline(token):
+    _deadline.reset(token)
+
+
+def remaining_time() -> Optional[float]:
+    """Segundos até o deadline da requisição atual (None fora de requisições)"""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+class UpstreamUnavailable(Exception):
+    """O upstream não respondeu a tempo, falhou ou está com o circuito aberto"""
+
+    def __init__(self, upstream: str, reason: str):
+        super().__init__(f"{upstream}: {reason}")
+        self.upstream = upstream
+        self.reason = reason
+
+
+class CircuitOpenError(UpstreamUnavailable):
+    def __init__(self, upstream: str, retry_in: float):
+        super().__init__(upstream, f"circuito aberto (nova tentativa em {retry_in:.0f}s)")
+        self.retry_in = retry_in
+
+
+class DeadlineExceeded(UpstreamUnavailable):
+    def __init__(self, upstream: str):
+        super().__init__(upstream, "sem tempo restante para a requisição")
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.name = name
+        self.clock = clock
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+
+    def before_call(self):
+        """Levanta CircuitOpenError se a chamada não deve ser feita agora"""
+        if self.state == CLOSED:
+            return
+        elapsed = self.clock() - self.opened_at
+        if self.state == OPEN and elapsed >= self.recovery_timeout:
+            self.state = HALF_OPEN
+            logger.info(f"[Circuit:{self.name}] half-open, testando upstream")
+        if self.state == HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return
+        raise CircuitOpenError(self.name, max(0.0, self.recovery_timeout - elapsed))
+
+    def release_probe(self):
+        """Libera o probe half-open quando a chamada terminou sem veredito"""
+        self._probe_in_flight = False
+
+    def record_success(self):
+        if self.state != CLOSED:
+            logger.info(f"[Circuit:{self.name}] fechado")
+        self.state = CLOSED
+        self.failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._probe_in_flight = False
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != OPEN:
+                logger.warning(f"[Circuit:{self.name}] aberto após {self.failures} falhas")
+            self.state = OPEN
+            self.opened_at = self.clock()
+
+    def snapshot(self) -> Dict[str, Any]:
+        snapshot = {"state": self.state, "consecutive_failures": self.failures}
+        if self.state == OPEN:
+            snapshot["retry_in_seconds"] = round(
+                max(0.0, self.recovery_timeout - (self.clock() - self.opened_at)), 1
+            )
+        return snapshot
+
+
+class RetryBudget:
+    """
+    Cada chamada deposita `ratio` tokens; cada retry consome um. Com
+    ratio=0.2, no máximo ~20% de chamadas extras chegam ao upstream.
+    """
+
+    def __init__(self, ratio: float = 0.2, max_tokens: float = 10.0):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+
+    def deposit(self):
+        self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        return False
+
+
+# Timeouts do wait_for e dos clientes HTTP (httpx, geopy via retry_exceptions)
+TIMEOUT_EXCEPTIONS: Tuple[Type[BaseException], ...] = (asyncio.TimeoutError, httpx.TimeoutException)
+
+# Status HTTP que indicam upstream degradado (contam como falha e são repetidos)
+DEFAULT_RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class Upstream:
+    """
+    Executa chamadas a um upstream com breaker, retries e deadline
+
+        response = await upstream.call(lambda timeout: client.get(url, timeout=timeout))
+
+    `fn` recebe o timeout da tentativa. Respostas httpx com status em
+    `retry_statuses` e as exceções em `retry_exceptions` contam como falha e podem ser repetidas;
+    se todas as tentativas falharem, a última resposta é devolvida para quem
+    chama decidir, ou a última exceção vira UpstreamUnavailable.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        timeout: float,
+        max_retries: int = 2,
+        backoff_base: float = 0.2,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30.0,
+        retry_budget_ratio: float = 0.2,
+        retry_exceptions: Tuple[Type[BaseException], ...] = (httpx.TimeoutException, httpx.TransportError),
+        retry_statuses: Tuple[int, ...] = DEFAULT_RETRY_STATUSES,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.retry_exceptions = retry_exceptions
+        self.retry_statuses = frozenset(retry_statuses)
+        self.breaker = CircuitBreaker(name, failure_threshold, recovery_timeout, clock)
+        self.budget = RetryBudget(retry_budget_ratio)
+
+    def _attempt_timeout(self) -> float:
+        remaining = remaining_time()
+        timeout = self.timeout if remaining is None else min(self.timeout, remaining)
+        if timeout < MIN_ATTEMPT_TIMEOUT:
+            raise DeadlineExceeded(self.name)
+        return timeout
+
+    async def call(self, fn: Callable[[float], Awaitable[Any]]) -> Any:
+        self.breaker.before_call()
+        self.budget.deposit()
+        try:
+            return await self._call_with_retries(fn)
+        except BaseException:
+            # Prazo esgotado, cancelamento ou erro que não é do upstream
+            self.breaker.release_probe()
+            raise
+
+    async def _call_with_retries(self, fn: Callable[[float], Awaitable[Any]]) -> Any:
+        attempt = 0
+        # Alguma tentativa falhou por culpa do upstream (e não do deadline)
+        upstream_failed = False
+        while True:
+            try:
+                timeout = self._attempt_timeout()
+            except DeadlineExceeded:
+                if upstream_failed:
+                    self.breaker.record_failure()
+                raise
+
+            error: Optional[BaseException] = None
+            result = None
+            try:
+                result = await asyncio.wait_for(fn(timeout), timeout=timeout)
+            except asyncio.TimeoutError as e:
+                error = e
+            except self.retry_exceptions as e:
+                error = e
+
+            if error is None and not (
+                isinstance(result, httpx.Response) and result.status_code in self.retry_statuses
+            ):
+                self.breaker.record_success()
+                return result
+
+            if isinstance(error, TIMEOUT_EXCEPTIONS) and timeout < self.timeout:
+                # O deadline da requisição encurtou a tentativa: o upstream
+                # não teve o timeout configurado, então ela não conta como falha
+                if upstream_failed:
+                    self.breaker.record_failure()
+                raise DeadlineExceeded(self.name) from error
+            upstream_failed = True
+
+            reason = "timeout" if isinstance(error, TIMEOUT_EXCEPTIONS) else (
+                type(error).__name__ if error else f"HTTP {result.status_code}"
+            )
+
+            if attempt >= self.max_retries or not self.budget.withdraw():
+                # Uma falha por chamada, depois da última tentativa
+                self.breaker.record_failure()
+                logger.warning(f"[Upstream:{self.name}] falhou ({reason}) após {attempt + 1} tentativa(s)")
+                if error is not None:
+                    raise UpstreamUnavailable(self.name, reason) from error
+                return result
+
+            # Backoff exponencial com full jitter, sem passar do deadline
+            delay = random.uniform(0, self.backoff_base * (2 ** attempt))
+            remaining = remaining_time()
+            if remaining is not None and remaining - delay < MIN_ATTEMPT_TIMEOUT:
+                # A tentativa anterior teve o timeout completo e falhou
+                self.breaker.record_failure()
+                raise DeadlineExceeded(self.name) from error
+            attempt += 1
+            logger.info(f"[Upstream:{self.name}] {reason}; retry {attempt} em {delay * 1000:.0f}ms")
+            await asyncio.sleep(delay)
+
+
+class UpstreamRegistry:
+    def __init__(self):
+        self._upstreams: Dict[str, Upstream] = {}
+
+    def register(self, upstream: Upstream) -> Upstream:
+        self._upstreams[upstream.name] = upstream
+        return upstream
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        return {name: u.breaker.snapshot() for name, u in self._upstreams.items()}
+
+
+upstreams = UpstreamRegistry()
+
+
+def register_upstream(name: str, timeout: float, **overrides) -> Upstream:
+    """Cria e registra um upstream com os padrões de settings"""
+    options = {
+        "max_retries": settings.UPSTREAM_MAX_RETRIES,
+        "failure_threshold": settings.CIRCUIT_FAILURE_THRESHOLD,
+        "recovery_timeout": settings.CIRCUIT_RECOVERY_SECONDS,
+        "retry_budget_ratio": settings.RETRY_BUDGET_RATIO,
+    }
+    options.update(overrides)
+    return upstreams.register(Upstream(name, timeout, **options))
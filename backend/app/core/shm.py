@@ -0,0 +1,339 @@
+"""
+Tabela hash em memória compartilhada entre processos
+
+Com `uvicorn --workers N`, cada worker teria o próprio cache em memória (N
+cópias, hit rate dividido por N). Esta tabela vive em um arquivo mapeado
+com mmap (por padrão em /dev/shm) aberto por todos os workers do host:
+
+- slots de tamanho fixo, endereçamento aberto com sondagem linear
+  (PROBES slots a partir de hash(chave) % slots);
+- cada slot guarda chave, valor serializado (bytes), expires_at e
+  stale_until (time.time(), comparável entre processos) e um CRC32;
+- leitura sem lock com seqlock: o writer deixa o contador do slot ímpar
+  enquanto escreve; o leitor copia o slot e só aceita a cópia se o
+  contador era par e não mudou (e o CRC confere);
+- escrita com locks fcntl por faixa de bytes: um lock por bucket (serializa
+  writers da mesma chave) e um por slot (tentado sem bloquear, para dois
+  buckets nunca escreverem no mesmo slot ao mesmo tempo). Locks fcntl são
+  liberados pelo kernel se o processo morrer.
+
+Quando a sondagem não acha slot livre, a entrada que expira primeiro é
+substituída. Valores maiores que o slot não são cacheados.
+
+Um arquivo com outra geometria (slots/slot_size) nunca é truncado no lugar,
+porque outros workers podem tê-lo mapeado (acessar um mapeamento truncado
+gera SIGBUS): a tabela nova é formatada em um arquivo temporário e
+substitui a antiga com os.replace.
+"""
+
+import fcntl
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"CANASHM1"
+# magic, slots, slot_size
+HEADER = struct.Struct("<8sII")
+HEADER_SIZE = 64
+# seq, key_hash, expires_at, stale_until, key_len, value_len, crc32
+SLOT_HEADER = struct.Struct("<QQddIII")
+SLOT_HEADER_SIZE = 48
+SEQ = struct.Struct("<Q")
+
+PROBES = 8
+READ_RETRIES = 16
+
+
+def _hash(key: bytes) -> int:
+    # hash() do Python muda por processo; o blake2b é estável entre workers
+    h = int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "little")
+    return h or 1  # 0 marca slot vazio
+
+
+def _crc(key: bytes, value: bytes) -> int:
+    return zlib.crc32(value, zlib.crc32(key))
+
+
+class SharedMemoryTable:
+    def __init__(self, path: str, slots: int = 1024, slot_size: int = 8192):
+        if slot_size <= SLOT_HEADER_SIZE:
+            raise ValueError("slot_size pequeno demais")
+        self.path = path
+        self.slots = slots
+        self.slot_size = slot_size
+        self.capacity = slot_size - SLOT_HEADER_SIZE
+        self.size = HEADER_SIZE + slots * slot_size
+        # Locks de bucket ficam em bytes além do fim do arquivo (fcntl permite)
+        self._bucket_lock_base = self.size
+        # fcntl não exclui threads do mesmo processo
+        self._thread_lock = threading.Lock()
+
+        self._fd = self._open()
+        self._mm = mmap.mmap(self._fd, self.size)
+
+    def _open(self) -> int:
+        """Abre o arquivo da tabela, formatando-o se preciso; devolve o fd"""
+        while True:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            table_fd = None
+            try:
+                # Outro processo pode ter substituído o arquivo enquanto
+                # esperávamos o flock: nesse caso reabre o atual
+                if os.fstat(fd).st_ino == os.stat(self.path).st_ino:
+                    table_fd = self._init_file(fd)
+                    if table_fd == fd:
+                        return fd
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+            if table_fd is not None:
+                return table_fd
+
+    def _format(self, fd: int):
+        os.ftruncate(fd, self.size)
+        os.pwrite(fd, HEADER.pack(MAGIC, self.slots, self.slot_size), 0)
+
+    def _init_file(self, fd: int) -> int:
+        """fd da tabela: o próprio `fd` se a geometria confere ou o arquivo é novo"""
+        size = os.fstat(fd).st_size
+        header = os.pread(fd, HEADER.size, 0)
+        if len(header) == HEADER.size and HEADER.unpack(header) == (MAGIC, self.slots, self.slot_size) \
+                and size == self.size:
+            logger.info(f"[SharedCache] {self.path} reaproveitado ({self.slots} slots de {self.slot_size} bytes)")
+            return fd
+        if size == 0:
+            self._format(fd)
+            logger.info(f"[SharedCache] {self.path} criado ({self.size // 1024} KiB)")
+            return fd
+
+        # Outra geometria: workers antigos continuam com o arquivo que já
+        # mapearam; os novos abrem o substituto
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        new_fd = os.open(tmp_path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o600)
+        try:
+            self._format(new_fd)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.close(new_fd)
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+        logger.warning(f"[SharedCache] {self.path} tinha outra geometria; substituído ({self.size // 1024} KiB)")
+        return new_fd
+
+    def _offset(self, index: int) -> int:
+        return HEADER_SIZE + index * self.slot_size
+
+    def _probe(self, key_hash: int) -> Iterator[int]:
+        home = key_hash % self.slots
+        for i in range(min(PROBES, self.slots)):
+            yield (home + i) % self.slots
+
+    def _read_slot(self, index: int) -> Optional[Tuple[int, float, float, bytes, bytes]]:
+        """Cópia consistente de um slot (seqlock); None se vazio ou em escrita"""
+        offset = self._offset(index)
+        mm = self._mm
+        for _ in range(READ_RETRIES):
+            seq, key_hash, expires_at, stale_until, key_len, value_len, crc = SLOT_HEADER.unpack_from(mm, offset)
+            if seq & 1:
+                continue  # writer no meio da escrita
+            if key_hash == 0:
+                return None
+            if key_len + value_len > self.capacity:
+                continue  # cabeçalho lido pela metade
+            start = offset + SLOT_HEADER_SIZE
+            payload = mm[start:start + key_len + value_len]
+            if SEQ.unpack_from(mm, offset)[0] != seq:
+                continue
+            key, value = payload[:key_len], payload[key_len:]
+            if _crc(key, value) != crc:
+                continue
+            return key_hash, expires_at, stale_until, key, value
+        return None
+
+    def get(self, key: str, allow_stale: bool = False) -> Optional[bytes]:
+        """Valor dentro do TTL (ou da janela stale, com allow_stale)"""
+        raw_key = key.encode()
+        key_hash = _hash(raw_key)
+        now = time.time()
+        for index in self._probe(key_hash):
+            # Filtro barato antes de copiar o slot
+            if struct.unpack_from("<Q", self._mm, self._offset(index) + 8)[0] != key_hash:
+                continue
+            slot = self._read_slot(index)
+            if slot is None or slot[0] != key_hash or slot[3] != raw_key:
+                continue
+            _, expires_at, stale_until, _, value = slot
+            if now < expires_at or (allow_stale and now < stale_until):
+                return value
+            return None
+        return None
+
+    def _lock(self, start: int, length: int, blocking: bool = True) -> bool:
+        flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+        try:
+            fcntl.lockf(self._fd, flags, length, start)
+            return True
+        except OSError:
+            return False
+
+    def _unlock(self, start: int, length: int):
+        fcntl.lockf(self._fd, fcntl.LOCK_UN, length, start)
+
+    def _write_slot(self, index: int, key_hash: int, expires_at: float, stale_until: float, key: bytes, value: bytes):
+        """Escreve o slot com o contador ímpar durante a escrita (chamar com o lock do slot)"""
+        offset = self._offset(index)
+        mm = self._mm
+        seq = SEQ.unpack_from(mm, offset)[0]
+        # Contador ímpar de um writer que morreu no meio: continua dele
+        writing = seq + 1 if seq % 2 == 0 else seq
+        SEQ.pack_into(mm, offset, writing)
+        start = offset + SLOT_HEADER_SIZE
+        mm[start:start + len(key) + len(value)] = key + value
+        SLOT_HEADER.pack_into(
+            mm, offset, writing, key_hash, expires_at, stale_until, len(key), len(value), _crc(key, value)
+        )
+        SEQ.pack_into(mm, offset, writing + 1)
+
+    def set(self, key: str, value: bytes, ttl_seconds: float, stale_seconds: float = 0.0) -> bool:
+        """Grava o valor; False se não couber no slot ou se todos os candidatos estiverem ocupados"""
+        raw_key = key.encode()
+        if len(raw_key) + len(value) > self.capacity:
+            logger.debug(f"[SharedCache] {key}: {len(value)} bytes não cabem no slot")
+            return False
+        key_hash = _hash(raw_key)
+        now = time.time()
+        expires_at = now + ttl_seconds
+        stale_until = expires_at + stale_seconds
+        bucket = self._bucket_lock_base + key_hash % self.slots
+
+        with self._thread_lock:
+            if not self._lock(bucket, 1):
+                return False
+            try:
+                candidates = []
+                for index in self._probe(key_hash):
+                    header = SLOT_HEADER.unpack_from(self._mm, self._offset(index))
+                    slot_hash, slot_stale_until = header[1], header[3]
+                    if slot_hash == key_hash:
+                        # Mesma chave (ou colisão de hash): só esse slot, senão a
+                        # chave ficaria duplicada em outro candidato
+                        candidates = [(-1.0, index)]
+                        break
+                    # Vazio ou totalmente expirado conta como livre
+                    candidates.append((0.0 if slot_hash == 0 or slot_stale_until <= now else slot_stale_until, index))
+                candidates.sort()
+
+                for _, index in candidates:
+                    slot_start = self._offset(index)
+                    if not self._lock(slot_start, self.slot_size, blocking=False):
+                        continue
+                    try:
+                        self._write_slot(index, key_hash, expires_at, stale_until, raw_key, value)
+                        return True
+                    finally:
+                        self._unlock(slot_start, self.slot_size)
+                return False
+            finally:
+                self._unlock(bucket, 1)
+
+    def delete(self, key: str):
+        raw_key = key.encode()
+        key_hash = _hash(raw_key)
+        with self._thread_lock:
+            for index in self._probe(key_hash):
+                slot = self._read_slot(index)
+                if slot is not None and slot[0] == key_hash and slot[3] == raw_key:
+                    self._clear_slot(index)
+
+    def _clear_slot(self, index: int):
+        offset = self._offset(index)
+        self._lock(offset, self.slot_size)
+        try:
+            self._write_slot(index, 0, 0.0, 0.0, b"", b"")
+        finally:
+            self._unlock(offset, self.slot_size)
+
+    def clear_expired(self) -> int:
+        """Libera os slots cuja janela stale já passou"""
+        now = time.time()
+        cleared = 0
+        with self._thread_lock:
+            for index in range(self.slots):
+                key_hash, _, stale_until = SLOT_HEADER.unpack_from(self._mm, self._offset(index))[1:4]
+                if key_hash != 0 and stale_until <= now:
+                    self._clear_slot(index)
+                    cleared += 1
+        return cleared
+
+    def items(self) -> Iterator[Tuple[str, float, float, bytes]]:
+        """(chave, expires_at, stale_until, valor) de cada slot ocupado"""
+        for index in range(self.slots):
+            slot = self._read_slot(index)
+            if slot is not None:
+                _, expires_at, stale_until, key, value = slot
+                yield key.decode(), expires_at, stale_until, value
+
+    def load_entries(self, entries: Iterable[Tuple[str, float, float, bytes]]) -> int:
+        """Regrava entradas de items() (ex.: de um snapshot) sem sobrescrever chaves já presentes"""
+        loaded = 0
+        for key, expires_at, stale_until, value in entries:
+            if self.get(key, allow_stale=True) is not None:
+                continue
+            now = time.time()
+            if self.set(key, value, expires_at - now, stale_until - expires_at):
+                loaded += 1
+        return loaded
+
+    def __len__(self) -> int:
+        return sum(
+            1 for index in range(self.slots)
+            if struct.unpack_from("<Q", self._mm, self._offset(index) + 8)[0] != 0
+        )
+
+    def close(self):
+        self._mm.close()
+        os.close(self._fd)
+
+
+def shared_cache_path(name: str, directory: str) -> str:
+    """Arquivo da tabela `name`; cai para o diretório temporário sem /dev/shm"""
+    if not os.path.isdir(directory):
+        import tempfile
+        directory = tempfile.gettempdir()
+    return os.path.join(directory, f"cana-data-{name}.cache")
+
+
+# Valores são JSON; datetimes viram {"$dt": iso} para voltar como datetime
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, datetime):
+        return {"$dt": obj.isoformat()}
+    raise TypeError(f"{type(obj).__name__} não é serializável")
+
+
+def _object_hook(obj: Dict[str, Any]) -> Any:
+    if len(obj) == 1 and "$dt" in obj:
+        return datetime.fromisoformat(obj["$dt"])
+    return obj
+
+
+def encode_value(value: Any) -> bytes:
+    return json.dumps(value, default=_default, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def decode_value(data: bytes) -> Any:
+    return json.loads(data, object_hook=_object_hook)
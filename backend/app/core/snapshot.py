@@ -0,0 +1,118 @@
+"""
+Snapshots binários dos caches em disco (warm restart)
+
+Formato de um arquivo de snapshot:
+
+- cabeçalho de 32 bytes: magic, versão, número de entradas e CRC32 do corpo;
+- uma entrada por registro: cabeçalho fixo (expires_at, stale_until,
+  tamanho da chave, tamanho do valor) seguido da chave (utf-8) e do valor
+  (JSON de app.core.shm.encode_value, comprimido com zlib).
+
+expires_at e stale_until são time.time() (relógio de parede), então valem
+entre processos e restarts. Na leitura o arquivo é mapeado com mmap e as
+entradas cuja janela stale já passou são puladas pelo cabeçalho, sem
+copiar nem descomprimir o valor.
+
+A gravação vai para um arquivo temporário no mesmo diretório e substitui
+o anterior com os.replace: um crash no meio nunca deixa um snapshot
+truncado no lugar do último válido.
+"""
+
+import logging
+import mmap
+import os
+import struct
+import time
+import zlib
+from typing import Any, Iterable, List, Optional, Tuple
+
+from app.core.shm import encode_value
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"CANASNP1"
+VERSION = 1
+# magic, versão, entradas, crc32 do corpo
+HEADER = struct.Struct("<8sIII")
+HEADER_SIZE = 32
+# expires_at, stale_until, key_len, value_len
+RECORD = struct.Struct("<ddHI")
+
+# (chave, expires_at, stale_until, valor). Na gravação o valor pode ser bytes
+# já serializados (tabelas compartilhadas) ou um objeto a serializar; na
+# leitura é sempre bytes (JSON, para app.core.shm.decode_value)
+SnapshotEntry = Tuple[str, float, float, Any]
+
+
+def write_snapshot(path: str, entries: Iterable[SnapshotEntry]) -> int:
+    """Grava as entradas ainda válidas em `path`; devolve quantas foram gravadas"""
+    now = time.time()
+    body = bytearray()
+    count = 0
+    for key, expires_at, stale_until, value in entries:
+        if stale_until <= now:
+            continue
+        raw_key = key.encode()
+        raw_value = zlib.compress(value if isinstance(value, bytes) else encode_value(value), 1)
+        body += RECORD.pack(expires_at, stale_until, len(raw_key), len(raw_value))
+        body += raw_key
+        body += raw_value
+        count += 1
+
+    header = HEADER.pack(MAGIC, VERSION, count, zlib.crc32(body)).ljust(HEADER_SIZE, b"\0")
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(header)
+            f.write(body)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+    return count
+
+
+def read_snapshot(path: str, now: Optional[float] = None) -> List[Tuple[str, float, float, bytes]]:
+    """
+    Entradas de `path` cuja janela stale ainda não passou
+
+    Arquivo inexistente devolve lista vazia; arquivo inválido (outro formato,
+    truncado, CRC diferente) é ignorado com um aviso.
+    """
+    now = time.time() if now is None else now
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return []
+    with f:
+        size = os.fstat(f.fileno()).st_size
+        if size < HEADER_SIZE:
+            logger.warning(f"[Snapshot] {path} truncado, ignorado")
+            return []
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            magic, version, count, crc = HEADER.unpack_from(mm, 0)
+            if magic != MAGIC or version != VERSION:
+                logger.warning(f"[Snapshot] {path} não é um snapshot v{VERSION}, ignorado")
+                return []
+            with memoryview(mm) as view:
+                valid = zlib.crc32(view[HEADER_SIZE:]) == crc
+            if not valid:
+                logger.warning(f"[Snapshot] {path} com CRC inválido, ignorado")
+                return []
+
+            entries = []
+            offset = HEADER_SIZE
+            for _ in range(count):
+                expires_at, stale_until, key_len, value_len = RECORD.unpack_from(mm, offset)
+                offset += RECORD.size
+                if stale_until > now:
+                    key = mm[offset:offset + key_len].decode()
+                    value = zlib.decompress(mm[offset + key_len:offset + key_len + value_len])
+                    entries.append((key, expires_at, stale_until, value))
+                offset += key_len + value_len
+            return entries
@@ -0,0 +1,140 @@
+"""
+Tracing leve por requisição
+
+Cada requisição abre um Trace (contextvar) e as fases instrumentadas abrem
+spans com `with span("fase"):`. Fora de uma requisição, `span` não faz nada.
+As durações viram o header Server-Timing; traces amostrados são entregues
+ao exportador (arquivo ou coletor OTLP), fora do caminho da requisição.
+"""
+
+import os
+import random
+import re
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+
+def _new_id(n_bytes: int) -> str:
+    return os.urandom(n_bytes).hex()
+
+
+class Trace:
+    __slots__ = ("trace_id", "parent_span_id", "sampled", "spans", "_wall_start_ns", "_perf_start_ns")
+
+    def __init__(self, trace_id: Optional[str] = None, parent_span_id: Optional[str] = None, sampled: bool = False):
+        self.trace_id = trace_id or _new_id(16)
+        self.parent_span_id = parent_span_id
+        self.sampled = sampled
+        self.spans: List[Dict[str, Any]] = []
+        self._wall_start_ns = time.time_ns()
+        self._perf_start_ns = time.perf_counter_ns()
+
+    @classmethod
+    def from_traceparent(cls, header: Optional[str], sample_rate: float, trust_sampled: bool = False) -> "Trace":
+        """
+        Continua o trace do header W3C `traceparent` quando presente
+
+        O flag sampled do header só força a exportação com `trust_sampled`
+        (header definido por um proxy/gateway confiável); caso contrário,
+        qualquer cliente poderia forçar a exportação de todas as suas
+        requisições, e vale apenas `sample_rate`.
+        """
+        sampled = sample_rate > 0 and random.random() < sample_rate
+        if header:
+            match = _TRACEPARENT.match(header.strip().lower())
+            if match:
+                trace_id, parent_id, flags = match.groups()
+                if trust_sampled and int(flags, 16) & 1:
+                    sampled = True
+                return cls(trace_id, parent_id, sampled)
+        return cls(sampled=sampled)
+
+    def to_wall_ns(self, perf_ns: int) -> int:
+        return self._wall_start_ns + (perf_ns - self._perf_start_ns)
+
+    def server_timing(self) -> str:
+        """Header Server-Timing com as fases registradas até agora"""
+        parts = [f"{s['name']};dur={s['duration_ms']:.1f}" for s in self.spans]
+        total_ms = (time.perf_counter_ns() - self._perf_start_ns) / 1e6
+        parts.append(f"total;dur={total_ms:.1f}")
+        return ", ".join(parts)
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+_current_span: ContextVar[Optional[str]] = ContextVar("current_span", default=None)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+def start_trace(trace: Trace):
+    """Ativa o trace no contexto atual; retorna o token para `end_trace`"""
+    return _current_trace.set(trace)
+
+
+def end_trace(token):
+    _current_trace.reset(token)
+
+
+class span:
+    """
+    Span de uma fase da requisição
+
+        with span("open_meteo", lat=lat, lon=lon):
+            ...
+    """
+
+    __slots__ = ("name", "attributes", "span_id", "_trace", "_start_ns", "_token")
+
+    def __init__(self, name: str, **attributes):
+        self.name = name
+        self.attributes = attributes
+        self._trace = None
+
+    def __enter__(self):
+        trace = _current_trace.get()
+        if trace is not None:
+            self._trace = trace
+            self.span_id = _new_id(8)
+            self._token = _current_span.set(self.span_id)
+            self._start_ns = time.perf_counter_ns()
+        return self
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def __exit__(self, exc_type, exc, tb):
+        trace = self._trace
+        if trace is None:
+            return False
+        end_ns = time.perf_counter_ns()
+        _current_span.reset(self._token)
+        trace.spans.append({
+            "name": self.name,
+            "span_id": self.span_id,
+            "parent_span_id": _current_span.get() or trace.parent_span_id,
+            "start_ns": trace.to_wall_ns(self._start_ns),
+            "end_ns": trace.to_wall_ns(end_ns),
+            "duration_ms": (end_ns - self._start_ns) / 1e6,
+            "attributes": self.attributes,
+            "error": exc_type.__name__ if exc_type is not None else None,
+        })
+        return False
+
+
+def traced_json(content: Any, status_code: int = 200) -> JSONResponse:
+    """
+    Serializa a resposta dentro de um span "serialize"
+    
+    Equivale ao que o FastAPI faz com o retorno da rota (jsonable_encoder +
+    JSONResponse), mas dentro da rota, onde o tempo pode ser medido.
+    """
+    with span("serialize"):
+        return JSONResponse(content=jsonable_encoder(content), status_code=status_code)
@@ -0,0 +1,64 @@
+"""
+Lease (trava com expiração) no MongoDB para eleger uma réplica líder
+
+Usado por tarefas em background que devem rodar em apenas uma réplica.
+O dono renova o lease periodicamente; se a réplica cair, o lease expira e
+outra réplica assume na próxima tentativa.
+"""
+
+import logging
+import os
+import socket
+from datetime import datetime, timedelta
+
+from pymongo.errors import DuplicateKeyError
+
+from app.database.mongodb import get_database
+
+logger = logging.getLogger(__name__)
+
+INSTANCE_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+
+class MongoLease:
+    def __init__(self, name: str, ttl_seconds: float, owner: str = INSTANCE_ID):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.owner = owner
+        self.held = False
+
+    async def acquire(self) -> bool:
+        """Obtém ou renova o lease; retorna True se esta réplica é a dona"""
+        now = datetime.utcnow()
+        try:
+            await get_database().leases.find_one_and_update(
+                {
+                    "_id": self.name,
+                    "$or": [{"expires_at": {"$lt": now}}, {"owner": self.owner}],
+                },
+                {
+                    "$set": {
+                        "owner": self.owner,
+                        "expires_at": now + timedelta(seconds=self.ttl_seconds),
+                    }
+                },
+                upsert=True,
+            )
+            acquired = True
+        except DuplicateKeyError:
+            # Documento existe e pertence a outra réplica (lease válido)
+            acquired = False
+
+        if acquired != self.held:
+            logger.info(
+                f"[Lease] {self.name}: {'adquirido' if acquired else 'perdido'} por {self.owner}"
+            )
+        self.held = acquired
+        return acquired
+
+    async def release(self):
+        if not self.held:
+            return
+        await get_database().leases.delete_one({"_id": self.name, "owner": self.owner})
+        self.held = False
+        logger.info(f"[Lease] {self.name}: liberado por {self.owner}")
@@ -1,6 +1,11 @@
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo import IndexModel
+from pymongo.errors import CollectionInvalid
 from app.config import settings
+from typing import Any, Dict, List, Optional
+import asyncio
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
@@ -10,25 +15,226 @@ class MongoDB:
 
 mongodb = MongoDB()
 
+# Índices por collection (criados no startup apenas se ainda não existirem)
+INDEXES: Dict[str, List[IndexModel]] = {
+    "insights": [
+        IndexModel([("location.coordinates", "2dsphere")]),
+        IndexModel([("created_at", -1)]),
+        IndexModel([("tags", 1)]),
+        IndexModel([("location.name", 1), ("created_at", -1)]),
+        IndexModel(
+            [("content", "text"), ("tags", "text"), ("location.name", "text")],
+            weights={"content": 10, "tags": 5, "location.name": 3},
+            default_language="portuguese",
+            name="insights_text_pt"
+        ),
+    ],
+    "news_archive": [
+        IndexModel([("published_at", -1), ("_id", -1)]),
+        IndexModel([("categories", 1), ("published_at", -1), ("_id", -1)]),
+        IndexModel(
+            [("title", "text"), ("description", "text")],
+            weights={"title": 5, "description": 1},
+            default_language="portuguese",
+            name="news_archive_text_pt"
+        ),
+    ],
+    # Índice composto metaField + timeField para as consultas por célula
+    "weather_observations": [
+        IndexModel([("cell.key", 1), ("timestamp", 1)]),
+    ],
+    # Buckets do rate limit compartilhado; removidos quando estariam cheios
+    "rate_limits": [
+        IndexModel([("expires_at", 1)], expireAfterSeconds=0),
+    ],
+    # Contador diário da quota da NewsAPI (um documento por dia)
+    "news_quota": [
+        IndexModel([("expires_at", 1)], expireAfterSeconds=0),
+    ],
+}
+
+# Collections time-series (criadas no startup se ainda não existirem)
+TIMESERIES_COLLECTIONS: Dict[str, Dict] = {
+    "weather_observations": {
+        "timeseries": {
+            "timeField": "timestamp",
+            "metaField": "cell",
+            "granularity": "hours"
+        },
+        "expireAfterSeconds": settings.WEATHER_HISTORY_RETENTION_DAYS * 86400
+    },
+}
+
+async def ensure_timeseries_collections():
+    """
+    Cria as collections time-series que ainda não existem
+
+    Roda em todo startup, independente de MONGODB_ENSURE_INDEXES: sem ela, o
+    primeiro insert criaria uma collection comum, sem a retenção.
+    """
+    existing = set(await mongodb.db.list_collection_names())
+    for name, options in TIMESERIES_COLLECTIONS.items():
+        if name not in existing:
+            try:
+                await mongodb.db.create_collection(name, **options)
+            except CollectionInvalid:
+                continue  # criada pela outra réplica ao mesmo tempo
+            logger.info(f"[MongoDB] Collection time-series '{name}' criada")
+
+async def _ensure_collection_indexes(name: str, indexes: List[IndexModel]) -> int:
+    """Cria, em um único comando, os índices que ainda não existem"""
+    collection = mongodb.db[name]
+    existing = set()
+    async for index in collection.list_indexes():
+        existing.add(index["name"])
+    
+    missing = [index for index in indexes if index.document["name"] not in existing]
+    if missing:
+        await collection.create_indexes(missing)
+        logger.info(f"[MongoDB] {len(missing)} índices criados em '{name}'")
+    return len(missing)
+
+async def ensure_indexes():
+    """Garante os índices de todas as collections em paralelo"""
+    await asyncio.gather(*(
+        _ensure_collection_indexes(name, indexes)
+        for name, indexes in INDEXES.items()
+    ))
+
+async def prepare_database():
+    """Cria as collections time-series e garante os índices (se ligado) antes de marcar o banco como pronto"""
+    await ensure_timeseries_collections()
+    if settings.MONGODB_ENSURE_INDEXES:
+        await ensure_indexes()
+
+class DatabaseMonitor:
+    """
+    Estado do MongoDB mantido em background
+    
+    Na primeira conexão bem-sucedida verifica os índices (prepare_database);
+    depois pinga a cada `interval` segundos. /readyz e /health leem o último
+    resultado em vez de pingar o banco a cada probe.
+    """
+    
+    def __init__(self, interval: float = 15.0, timeout: float = 2.0):
+        self.interval = interval
+        self.timeout = timeout
+        self.prepared = False
+        self.connected = False
+        self.last_check: Optional[float] = None
+        self.latency_ms: Optional[float] = None
+        self.error: Optional[str] = None
+        self._started_at = time.monotonic()
+        self._task: Optional[asyncio.Task] = None
+    
+    @property
+    def ready(self) -> bool:
+        # Um resultado velho (loop parado) não conta como pronto
+        fresh = self.last_check is not None and time.monotonic() - self.last_check <= 3 * self.interval + self.timeout
+        return self.prepared and self.connected and fresh
+    
+    async def check(self):
+        """Prepara o banco (na primeira vez) ou pinga; atualiza o estado"""
+        started = time.perf_counter()
+        try:
+            if not self.prepared:
+                await prepare_database()
+                self.prepared = True
+                logger.info(
+                    f"Conectado ao MongoDB com sucesso (pronto em "
+                    f"{(time.monotonic() - self._started_at) * 1000:.0f}ms após o startup)"
+                )
+            else:
+                await asyncio.wait_for(mongodb.db.command("ping"), timeout=self.timeout)
+            if not self.connected and self.last_check is not None:
+                logger.info("[MongoDB] Conexão restabelecida")
+            self.connected = True
+            self.error = None
+        except Exception as e:
+            if self.connected or self.last_check is None:
+                logger.error(f"Erro ao conectar ao MongoDB: {e}")
+            self.connected = False
+            self.error = type(e).__name__
+            raise
+        finally:
+            self.latency_ms = round((time.perf_counter() - started) * 1000, 1)
+            self.last_check = time.monotonic()
+    
+    async def _run(self):
+        while True:
+            try:
+                await self.check()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                pass
+            await asyncio.sleep(self.interval)
+    
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "status": "connected" if self.connected else "disconnected",
+            "indexes_ready": self.prepared,
+            "checked_seconds_ago": None if self.last_check is None else round(time.monotonic() - self.last_check, 1),
+            "ping_ms": self.latency_ms,
+            "error": self.error,
+        }
+
+database_monitor = DatabaseMonitor(
+    interval=settings.READINESS_PING_SECONDS,
+    timeout=settings.READINESS_PING_TIMEOUT_SECONDS
+)
+
 async def connect_to_mongo():
-    """Conecta ao MongoDB"""
+    """
+    Conecta ao MongoDB
+    
+    O client do Motor não faz I/O ao ser criado: por padrão o app começa a
+    servir na hora e o DatabaseMonitor verifica índices e conexão em
+    background. Com MONGODB_WAIT_ON_STARTUP, o startup espera o banco (e
+    falha se ele não responder), como antes.
+    """
     try:
-        mongodb.client = AsyncIOMotorClient(settings.MONGODB_URL)
+        mongodb.client = AsyncIOMotorClient(
+            settings.MONGODB_URL,
+            maxPoolSize=settings.MONGODB_MAX_POOL_SIZE,
+            minPoolSize=settings.MONGODB_MIN_POOL_SIZE,
+            maxIdleTimeMS=settings.MONGODB_MAX_IDLE_TIME_MS,
+            serverSelectionTimeoutMS=settings.MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+            compressors=settings.mongodb_compressors_list or None
+        )
         mongodb.db = mongodb.client[settings.MONGODB_DB_NAME]
         
-        # Criar índices
-        await mongodb.db.insights.create_index([("location.coordinates", "2dsphere")])
-        await mongodb.db.insights.create_index([("created_at", -1)])
-        await mongodb.db.insights.create_index([("tags", 1)])
-        await mongodb.db.insights.create_index([("location.name", 1), ("created_at", -1)])
+        logger.info(
+            f"[MongoDB] Pool: max={settings.MONGODB_MAX_POOL_SIZE} "
+            f"min={settings.MONGODB_MIN_POOL_SIZE} "
+            f"max_idle={settings.MONGODB_MAX_IDLE_TIME_MS}ms "
+            f"server_selection_timeout={settings.MONGODB_SERVER_SELECTION_TIMEOUT_MS}ms "
+            f"compressors={settings.mongodb_compressors_list}"
+        )
         
-        logger.info("Conectado ao MongoDB com sucesso")
+        if settings.MONGODB_WAIT_ON_STARTUP:
+            await database_monitor.check()
     except Exception as e:
         logger.error(f"Erro ao conectar ao MongoDB: {e}")
         raise
+    database_monitor.start()
 
 async def close_mongo_connection():
     """Fecha conexão com MongoDB"""
+    await database_monitor.stop()
     if mongodb.client:
         mongodb.client.close()
         logger.info("Conexão com MongoDB fechada")
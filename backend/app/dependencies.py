@@ -4,10 +4,135 @@ Dependências compartilhadas da aplicação.
 Este módulo centraliza dependências comuns que podem ser injetadas
 nas rotas usando FastAPI Depends().
 
-Exemplos futuros:
-- Autenticação de usuários
-- Rate limiting
-- Validações customizadas
+Rate limiting (token bucket):
+
+- `default_rate_limit`: orçamento geral por cliente (RATE_LIMIT_PER_MINUTE),
+  aplicado a todos os routers da API em main.py;
+- `expensive_rate_limit(cost)`: orçamento separado por cliente e por rota
+  para rotas caras (bulk, export), em que cada chamada consome `cost` tokens.
+
+O cliente é identificado pela API key (header X-API-Key, se for uma das
+chaves em RATE_LIMIT_API_KEYS) ou pelo IP. O X-Real-IP (definido pelo Nginx)
+só é usado com RATE_LIMIT_TRUST_PROXY e, se RATE_LIMIT_TRUSTED_PROXIES estiver
+definido, apenas em conexões vindas desses endereços.
 """
 
-# Por enquanto vazio - poderá ser usado em features futuras
\ No newline at end of file
+import hashlib
+import ipaddress
+from typing import Optional
+
+from fastapi import HTTPException, Request
+
+from app.config import settings
+from app.core.rate_limit import MemoryTokenBuckets, MongoTokenBuckets
+from app.database.mongodb import get_database
+
+_memory_buckets = MemoryTokenBuckets(cleanup_interval=settings.RATE_LIMIT_CLEANUP_SECONDS)
+
+if settings.RATE_LIMIT_BACKEND == "mongo":
+    rate_limit_buckets = MongoTokenBuckets(
+        get_database,
+        fallback=_memory_buckets,
+        timeout=settings.RATE_LIMIT_MONGO_TIMEOUT_SECONDS,
+        retry_after_failure=settings.RATE_LIMIT_MONGO_RETRY_SECONDS,
+    )
+else:
+    rate_limit_buckets = _memory_buckets
+
+_trusted_proxies = [ipaddress.ip_network(p, strict=False) for p in settings.rate_limit_trusted_proxies_list]
+
+
+def _from_trusted_proxy(request: Request) -> bool:
+    if not settings.RATE_LIMIT_TRUST_PROXY:
+        return False
+    if not _trusted_proxies:
+        return True
+    if not request.client:
+        return False
+    try:
+        peer = ipaddress.ip_address(request.client.host)
+    except ValueError:
+        return False
+    return any(peer in network for network in _trusted_proxies)
+
+
+def client_identity(request: Request) -> str:
+    """Chave do cliente para o rate limit: API key conhecida ou IP"""
+    api_key = request.headers.get("x-api-key")
+    if api_key and api_key in settings.rate_limit_api_keys_set:
+        # Não guarda a chave em claro no estado (nem no MongoDB)
+        return "key:" + hashlib.sha256(api_key.encode()).hexdigest()[:16]
+
+    ip = None
+    if _from_trusted_proxy(request):
+        ip = request.headers.get("x-real-ip")
+    if not ip and request.client:
+        ip = request.client.host
+    return f"ip:{ip or 'unknown'}"
+
+
+class RateLimit:
+    """
+    Dependência de rate limit com token bucket
+
+        @router.post("/insights/bulk", dependencies=[Depends(expensive_rate_limit(cost=5))])
+    """
+
+    def __init__(self, name: str, per_minute: int, cost: float = 1.0, per_route: bool = False):
+        self.name = name
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.cost = cost
+        self.per_route = per_route
+
+    def _key(self, request: Request) -> str:
+        key = f"{self.name}:{client_identity(request)}"
+        if self.per_route:
+            # A função da rota identifica a rota mesmo com path params
+            endpoint = request.scope.get("endpoint")
+            key += f":{endpoint.__name__ if endpoint else request.url.path}"
+        return key
+
+    async def __call__(self, request: Request):
+        if not settings.RATE_LIMIT_ENABLED:
+            return
+
+        allowed, remaining, retry_after = await rate_limit_buckets.take(
+            self._key(request), self.capacity, self.rate, self.cost
+        )
+        headers = {
+            "X-RateLimit-Limit": str(int(self.capacity)),
+            "X-RateLimit-Remaining": str(int(remaining)),
+        }
+
+        if not allowed:
+            retry_after = max(1, int(retry_after + 0.999))
+            headers["Retry-After"] = str(retry_after)
+            raise HTTPException(
+                status_code=429,
+                detail={
+                    "error": {
+                        "code": "RATE_LIMIT_EXCEEDED",
+                        "message": "Muitas requisições. Tente novamente em alguns instantes.",
+                        "retry_after": retry_after
+                    }
+                },
+                headers=headers
+            )
+
+        # Copiados na resposta pelo RequestContextMiddleware: headers do
+        # Response injetado se perdem quando a rota devolve o próprio Response
+        request.state.rate_limit_headers = headers
+
+
+default_rate_limit = RateLimit("default", settings.RATE_LIMIT_PER_MINUTE)
+
+
+def expensive_rate_limit(cost: float = 1.0, per_minute: Optional[int] = None) -> RateLimit:
+    """Orçamento por cliente e por rota para rotas caras"""
+    return RateLimit(
+        "expensive",
+        per_minute or settings.RATE_LIMIT_EXPENSIVE_PER_MINUTE,
+        cost=cost,
+        per_route=True,
+    )
@@ -1,12 +1,25 @@
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+import asyncio
 import logging
 
 from app.config import settings
 from app.database.mongodb import connect_to_mongo, close_mongo_connection
-from app.api.routes import health, locations, weather, insights, news, quotation
-from app.api.middlewares.error_handler import error_handler_middleware
+from app.api.routes import health, locations, weather, insights, news, quotation, metrics
+from app.dependencies import default_rate_limit
+from app.core.lazy import preload_lazy_modules
+from app.api.middlewares.error_handler import ErrorHandlerMiddleware
+from app.api.middlewares.metrics import MetricsMiddleware
+from app.api.middlewares.tracing import TracingMiddleware
+from app.api.middlewares.request_context import RequestContextMiddleware
+from app.services.reactions import reaction_buffer
+from app.services.weather_history import weather_recorder
+from app.services.news_refresher import news_refresher
+from app.services.news import news_service
+from app.services.commodity_quotes import commodity_quotes
+from app.services.trace_exporter import trace_exporter
+from app.services.cache_snapshots import cache_snapshotter
 
 # Configurar logging
 logging.basicConfig(
@@ -22,10 +35,31 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("Iniciando aplicação...")
     await connect_to_mongo()
+    if settings.CACHE_SNAPSHOT_ENABLED:
+        # Caches aquecidos com o snapshot da execução anterior
+        cache_snapshotter.restore()
+        cache_snapshotter.start()
+    reaction_buffer.start()
+    weather_recorder.start()
+    if settings.NEWS_REFRESH_ENABLED:
+        news_refresher.start()
+    if settings.TRACING_ENABLED:
+        trace_exporter.start()
+    # bs4/geopy são importados em uma thread depois que o app já está servindo
+    preload = asyncio.create_task(asyncio.to_thread(preload_lazy_modules))
     yield
     # Shutdown
     logger.info("Encerrando aplicação...")
+    await reaction_buffer.stop()
+    await weather_recorder.stop()
+    await news_refresher.stop()
+    await news_service.close()
+    await commodity_quotes.close()
+    await trace_exporter.stop()
+    if settings.CACHE_SNAPSHOT_ENABLED:
+        await cache_snapshotter.stop()
     await close_mongo_connection()
+    await preload
 
 # Criar aplicação
 app = FastAPI(
@@ -44,43 +78,72 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Middleware de erro
-app.middleware("http")(error_handler_middleware)
+# Middleware de erro (ASGI puro)
+app.add_middleware(ErrorHandlerMiddleware)
+
+# Tracing por fase (Server-Timing e exportação amostrada)
+if settings.TRACING_ENABLED:
+    app.add_middleware(
+        TracingMiddleware,
+        exporter=trace_exporter,
+        sample_rate=settings.TRACING_SAMPLE_RATE,
+        server_timing=settings.TRACING_SERVER_TIMING,
+        trust_traceparent=settings.TRACING_TRUST_TRACEPARENT,
+    )
+
+# Métricas (por fora do tratamento de erro, para medir também as respostas 500)
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+# Request-id e tempo de resposta (mais externo)
+app.add_middleware(
+    RequestContextMiddleware,
+    slow_request_ms=settings.SLOW_REQUEST_MS,
+    deadline_seconds=settings.REQUEST_DEADLINE_SECONDS,
+)
 
 # Rotas
 # Health check (sem prefixo)
 app.include_router(health.router, tags=["Health"])
+if settings.METRICS_ENABLED:
+    app.include_router(metrics.router, tags=["Metrics"])
 
 # Rotas com prefixo /api/v1
 app.include_router(
     locations.router,
     prefix=f"/api/{settings.API_VERSION}",
+    dependencies=[Depends(default_rate_limit)],
     tags=["Locations"]
 )
 app.include_router(
     weather.router,
     prefix=f"/api/{settings.API_VERSION}",
+    dependencies=[Depends(default_rate_limit)],
     tags=["Weather"]
 )
 app.include_router(
     insights.router,
     prefix=f"/api/{settings.API_VERSION}",
+    dependencies=[Depends(default_rate_limit)],
     tags=["Insights"]
 )
 app.include_router(
     news.router,
     prefix=f"/api/{settings.API_VERSION}",
+    dependencies=[Depends(default_rate_limit)],
     tags=["News"]
 )
 
 app.include_router(
     quotation.router,
     prefix=f"/api/{settings.API_VERSION}",
+    dependencies=[Depends(default_rate_limit)],
     tags=["Quotation"]
 )
 
 app.include_router(
     quotation.router,
+    dependencies=[Depends(default_rate_limit)],
     tags=["Quotation (Root)"]
 )
 
@@ -92,6 +155,9 @@ async def root():
         "docs": "/docs",
         "endpoints": {
             "health": "/health",
+            "liveness": "/livez",
+            "readiness": "/readyz",
+            "metrics": "/metrics",
             "weather": "/api/v1/weather",
             "locations": "/api/v1/locations/search",
             "insights": "/api/v1/insights",
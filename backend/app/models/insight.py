@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List 
+from typing import Optional, List, Dict, Any, Literal
 from datetime import datetime
 
 class WeatherSnapshot(BaseModel):
@@ -40,4 +40,23 @@ class InsightResponse(BaseModel):
 
 class InsightListResponse(BaseModel):
     insights: list[InsightResponse]
-    pagination: dict
\ No newline at end of file
+    pagination: dict
+
+class InsightBulkCreate(BaseModel):
+    # Itens validados individualmente no serviço, para que um item inválido
+    # não derrube o lote inteiro
+    insights: List[Dict[str, Any]] = Field(..., min_length=1, max_length=5000)
+
+class InsightBulkItemResult(BaseModel):
+    index: int
+    status: str  # "created" | "error"
+    id: Optional[str] = None
+    error: Optional[Any] = None
+
+class InsightBulkResponse(BaseModel):
+    inserted: int
+    failed: int
+    results: list[InsightBulkItemResult]
+
+class ReactionCreate(BaseModel):
+    reaction: Literal["helpful", "tried"]
@@ -0,0 +1,131 @@
+"""
+Warm restart dos caches (clima, cotação e notícias)
+
+Sem isso, todo deploy ou crash de uma réplica começa com os caches vazios e
+os primeiros minutos vão inteiros para os upstreams. O CacheSnapshotter grava
+um snapshot de cada cache (app.core.snapshot) a cada
+CACHE_SNAPSHOT_INTERVAL_SECONDS e no shutdown, e no startup carrega os
+snapshots antes de o app começar a servir, pulando o que já expirou.
+
+Cada gravação substitui o snapshot anterior com o conteúdo atual do cache,
+sem mesclar: uma entrada removida ou invalidada não volta no próximo
+restart. Com vários workers, use CACHE_BACKEND=shared, em que todos veem
+(e gravam) a mesma tabela.
+"""
+
+import asyncio
+import logging
+import os
+from typing import Dict, List, Optional, Protocol, Tuple
+
+from app.config import settings
+from app.core.cache import weather_cache
+from app.core.shm import encode_value
+from app.core.snapshot import SnapshotEntry, read_snapshot, write_snapshot
+from app.services.news import news_cache
+from app.services.quotation import quotation_service
+
+logger = logging.getLogger(__name__)
+
+
+class SnapshotCache(Protocol):
+    def snapshot_entries(self) -> List[SnapshotEntry]: ...
+
+    def restore_entries(self, entries: List[SnapshotEntry]) -> int: ...
+
+
+class CacheSnapshotter:
+    """Grava e restaura periodicamente os snapshots dos caches registrados"""
+
+    def __init__(self, directory: str, interval: float = 300.0):
+        self.directory = directory
+        self.interval = interval
+        self._caches: Dict[str, SnapshotCache] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def register(self, name: str, cache: SnapshotCache):
+        self._caches[name] = cache
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, f"{name}.snap")
+
+    def restore(self) -> Dict[str, int]:
+        """Carrega os snapshots existentes; devolve quantas entradas cada cache recebeu"""
+        restored = {}
+        for name, cache in self._caches.items():
+            try:
+                restored[name] = cache.restore_entries(read_snapshot(self._path(name)))
+            except Exception as e:
+                logger.error(f"[CacheSnapshot] Erro ao restaurar {name}: {e}")
+                restored[name] = 0
+        logger.info(f"[CacheSnapshot] Entradas restauradas: {restored}")
+        return restored
+
+    @staticmethod
+    def _collect(cache: SnapshotCache) -> List[SnapshotEntry]:
+        """
+        Entradas do cache já serializadas
+
+        Roda no event loop: os caches em memória não são thread-safe e os
+        valores são os próprios objetos do cache, que as requisições continuam
+        alterando. A thread de gravação só recebe bytes.
+        """
+        return [
+            (key, expires_at, stale_until, value if isinstance(value, bytes) else encode_value(value))
+            for key, expires_at, stale_until, value in cache.snapshot_entries()
+        ]
+
+    def _write_all(self, collected: List[Tuple[str, List[SnapshotEntry]]]) -> Dict[str, int]:
+        os.makedirs(self.directory, exist_ok=True)
+        written = {}
+        for name, entries in collected:
+            try:
+                written[name] = write_snapshot(self._path(name), entries)
+            except Exception as e:
+                logger.error(f"[CacheSnapshot] Erro ao gravar {name}: {e}")
+        return written
+
+    async def save(self) -> Dict[str, int]:
+        # Coleta e serialização no event loop; compressão e I/O em uma thread
+        collected = []
+        for name, cache in self._caches.items():
+            try:
+                collected.append((name, self._collect(cache)))
+            except Exception as e:
+                logger.error(f"[CacheSnapshot] Erro ao coletar {name}: {e}")
+        try:
+            written = await asyncio.to_thread(self._write_all, collected)
+        except Exception as e:
+            logger.error(f"[CacheSnapshot] Erro ao gravar snapshots em {self.directory}: {e}")
+            return {}
+        logger.debug(f"[CacheSnapshot] Entradas gravadas: {written}")
+        return written
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.save()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.save()
+
+
+# Instância global
+cache_snapshotter = CacheSnapshotter(
+    settings.CACHE_SNAPSHOT_DIR,
+    interval=settings.CACHE_SNAPSHOT_INTERVAL_SECONDS
+)
+cache_snapshotter.register("weather", weather_cache)
+cache_snapshotter.register("quotation", quotation_service.cache)
+cache_snapshotter.register("news", news_cache)
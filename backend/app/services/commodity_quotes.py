@@ -0,0 +1,218 @@
+"""
+Cotações de várias commodities do setor sucroenergético
+
+Registro de fontes (páginas da noticiasagricolas com blocos div.cotacao)
+buscadas em paralelo por um único cliente HTTP compartilhado, limitado por
+semáforo. Cada página é pedida com If-None-Match / If-Modified-Since: se não
+mudou, a fonte responde 304 e o resultado anterior é reaproveitado sem novo
+parse. Cada fonte tem seu próprio TTL.
+"""
+
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from app.config import settings
+from app.core.metrics import upstream_timer
+from app.core.tracing import span
+from app.services.quotation import (
+    QuotationScraper,
+    _DECIMAL_BR,
+    cotacao_soup,
+    noticiasagricolas_upstream,
+)
+
+logger = logging.getLogger(__name__)
+
+BASE_URL = f"{settings.NOTICIAS_AGRICOLAS_BASE_URL}/cotacoes/sucroenergetico"
+
+
+class QuoteSource:
+    """Página de cotação registrada"""
+
+    def __init__(self, key: str, name: str, path: str, unit: str, ttl_seconds: int, max_records: int = 10):
+        self.key = key
+        self.name = name
+        self.url = f"{BASE_URL}/{path}"
+        self.unit = unit
+        self.ttl_seconds = ttl_seconds
+        self.max_records = max_records
+
+
+SOURCES = [
+    QuoteSource("cana", "Cana-de-açúcar (PR)", "acucar-preco-da-cana-basica-pr", "R$/t", 3600),
+    QuoteSource("etanol_hidratado", "Etanol hidratado (Cepea/Esalq)", "etanol-hidratado-cepea-esalq-sp", "R$/m³", 6 * 3600),
+    QuoteSource("etanol_anidro", "Etanol anidro (Cepea/Esalq)", "etanol-anidro-cepea-esalq-sp", "R$/m³", 6 * 3600),
+    QuoteSource("acucar_ice11", "Açúcar demerara ICE nº 11", "acucar-bolsa-de-nova-iorque-nybot", "US$ c/lb", 900),
+    QuoteSource("acucar_cristal", "Açúcar cristal (Cepea/Esalq)", "acucar-cristal-cepea", "R$/saca 50kg", 3600),
+    QuoteSource("atr", "ATR (Consecana-SP)", "atr-consecana-sp", "R$/kg ATR", 12 * 3600),
+]
+
+
+def parse_blocks(html: str, max_records: int) -> List[Dict[str, Any]]:
+    """
+    Parse genérico dos blocos div.cotacao
+    
+    Cada linha da tabela vira um par rótulo → valor (primeira coluna
+    textual, segunda coluna numérica), o que cobre tanto "Campo/Esteira"
+    quanto vencimentos de contrato.
+    """
+    soup = cotacao_soup(html)
+    registros = []
+
+    for bloco in soup.find_all("div", class_="cotacao"):
+        fechamento = bloco.find("div", class_="fechamento")
+        tabela = bloco.find("table", class_="cot-fisicas")
+        if fechamento is None or tabela is None:
+            continue
+
+        data_str = fechamento.get_text(strip=True).replace("Fechamento: ", "")
+        try:
+            data_obj = QuotationScraper._parse_data(data_str)
+        except ValueError:
+            continue
+
+        valores = {}
+        for tr in (tabela.find("tbody") or tabela).find_all("tr"):
+            tds = tr.find_all("td", limit=2)
+            if len(tds) < 2:
+                continue
+            try:
+                valores[tds[0].get_text(strip=True)] = float(tds[1].get_text(strip=True).translate(_DECIMAL_BR))
+            except ValueError:
+                continue
+
+        if valores:
+            registros.append({
+                "data": data_obj.isoformat(),
+                "data_formatada": data_str,
+                "valores": valores,
+            })
+
+    registros.sort(key=lambda r: r["data"], reverse=True)
+    return registros[:max_records]
+
+
+class CommodityQuotes:
+    """Busca concorrente e cache por fonte, com requisições condicionais"""
+
+    def __init__(
+        self,
+        sources: List[QuoteSource],
+        max_concurrency: int = 3,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.sources = {source.key: source for source in sources}
+        self.max_concurrency = max_concurrency
+        self.transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        # Por fonte: registros, fetched_at, etag, last_modified, error
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                headers=QuotationScraper.HEADERS,
+                timeout=30.0,
+                follow_redirects=True,
+                limits=httpx.Limits(max_connections=self.max_concurrency),
+                transport=self.transport,
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _is_fresh(self, source: QuoteSource) -> bool:
+        entry = self._entries.get(source.key)
+        if entry is None or entry.get("fetched_at") is None:
+            return False
+        return (datetime.utcnow() - entry["fetched_at"]).total_seconds() < source.ttl_seconds
+
+    async def _fetch(self, source: QuoteSource):
+        entry = self._entries.setdefault(source.key, {})
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+        client = self.client
+
+        async def attempt(timeout: float) -> httpx.Response:
+            async with self._semaphore:
+                with upstream_timer("noticiasagricolas") as call:
+                    response = await client.get(source.url, headers=headers, timeout=timeout)
+                    call.status = response.status_code
+            return response
+
+        try:
+            response = await noticiasagricolas_upstream.call(attempt)
+
+            if response.status_code == 304 and "registros" in entry:
+                logger.info(f"[Commodities] {source.key}: 304 Not Modified")
+            else:
+                response.raise_for_status()
+                with span("parse", source=source.key):
+                    registros = parse_blocks(response.text, source.max_records)
+                if not registros:
+                    raise ValueError("Nenhum bloco de cotação encontrado")
+                entry["registros"] = registros
+                entry["etag"] = response.headers.get("ETag")
+                entry["last_modified"] = response.headers.get("Last-Modified")
+                logger.info(f"[Commodities] {source.key}: {len(registros)} registros")
+
+            entry["fetched_at"] = datetime.utcnow()
+            entry["error"] = None
+        except Exception as e:
+            logger.error(f"[Commodities] Erro em {source.key}: {e}")
+            entry["error"] = str(e) or e.__class__.__name__
+
+    async def _refresh(self, source: QuoteSource):
+        """Single-flight por fonte"""
+        task = self._inflight.get(source.key)
+        if task is None or task.done():
+            task = asyncio.create_task(self._fetch(source))
+            self._inflight[source.key] = task
+        await asyncio.shield(task)
+
+    async def get_quotes(self, keys: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Cotações das fontes pedidas (todas por padrão), atualizando as vencidas
+
+        Chaves desconhecidas não interrompem as demais: aparecem em `errors`.
+        """
+        keys = list(keys or self.sources)
+        sources = [self.sources[k] for k in keys if k in self.sources]
+        await asyncio.gather(*(self._refresh(s) for s in sources if not self._is_fresh(s)))
+
+        quotations = {}
+        errors = {k: "Fonte desconhecida" for k in keys if k not in self.sources}
+        for source in sources:
+            entry = self._entries.get(source.key, {})
+            if "registros" in entry:
+                quotations[source.key] = {
+                    "nome": source.name,
+                    "unidade": source.unit,
+                    "fonte": source.url,
+                    "registros": entry["registros"],
+                    "atualizado_em": entry["fetched_at"].isoformat() if entry.get("fetched_at") else None,
+                    "stale": not self._is_fresh(source),
+                }
+            if entry.get("error"):
+                errors[source.key] = entry["error"]
+
+        return {"quotations": quotations, "errors": errors}
+
+
+# Instância global
+commodity_quotes = CommodityQuotes(SOURCES, max_concurrency=settings.QUOTATION_MAX_CONCURRENCY)
@@ -1,18 +1,72 @@
-from geopy.geocoders import Nominatim
-from geopy.exc import GeocoderTimedOut, GeocoderServiceError
-from typing import List, Dict, Optional
+from typing import Any, Callable, List, Dict, Optional
+import asyncio
 import logging
 
+from app.config import settings
+from app.core.cache import TTLCache
+from app.core.lazy import LazyModule
+from app.core.metrics import upstream_timer
+from app.core.resilience import UpstreamUnavailable, register_upstream
+
 logger = logging.getLogger(__name__)
 
+# geopy só é importado na primeira busca
+geopy_exc = LazyModule("geopy.exc")
+geopy_geocoders = LazyModule("geopy.geocoders")
+
+# O Nominatim pede no máximo 1 req/s: um único retry. As exceções do geopy
+# que contam como falha são definidas quando o geolocator é criado.
+nominatim_upstream = register_upstream(
+    "nominatim",
+    timeout=10.0,
+    max_retries=1,
+    backoff_base=1.0,
+    retry_exceptions=(),
+)
+
+# Resultados de geocoding mudam raramente; autocomplete repete muito as buscas
+geocoding_cache = TTLCache(
+    ttl_seconds=settings.GEOCODING_CACHE_TTL_SECONDS,
+    max_entries=4096,
+    name="GeocodingCache"
+)
+
 class GeocodingService:
     def __init__(self):
-        self.geolocator = Nominatim(user_agent="cana-data/1.0")
+        self._geolocator = None
     
-    def search_locations(self, query: str, limit: int = 5) -> List[Dict]:
+    @property
+    def geolocator(self):
+        """Cliente Nominatim, criado no primeiro uso"""
+        if self._geolocator is None:
+            nominatim_upstream.retry_exceptions = (
+                geopy_exc.GeocoderTimedOut,
+                geopy_exc.GeocoderUnavailable,
+            )
+            self._geolocator = geopy_geocoders.Nominatim(
+                user_agent="cana-data/1.0",
+                domain=settings.NOMINATIM_DOMAIN,
+                scheme=settings.NOMINATIM_SCHEME
+            )
+        return self._geolocator
+    
+    async def _call(self, method: Callable[..., Any], *args, **kwargs) -> Any:
+        """Chama o geopy (bloqueante) em uma thread, com breaker, retry e deadline"""
+        async def attempt(timeout: float):
+            with upstream_timer("nominatim"):
+                return await asyncio.to_thread(method, *args, timeout=timeout, **kwargs)
+        return await nominatim_upstream.call(attempt)
+    
+    async def search_locations(self, query: str, limit: int = 5) -> List[Dict]:
         """Busca localizações por nome (forward geocoding)"""
+        cache_key = f"search:{query.strip().lower()}:{limit}"
+        cached = geocoding_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
         try:
-            locations = self.geolocator.geocode(
+            locations = await self._call(
+                self.geolocator.geocode,
                 query,
                 exactly_one=False,
                 limit=limit,
@@ -21,6 +75,7 @@ class GeocodingService:
             )
             
             if not locations:
+                geocoding_cache.set(cache_key, [])
                 return []
             
             results = []
@@ -35,19 +90,27 @@ class GeocodingService:
                     "display_name": loc.address
                 })
             
+            geocoding_cache.set(cache_key, results)
             return results
             
-        except (GeocoderTimedOut, GeocoderServiceError) as e:
+        except (geopy_exc.GeocoderServiceError, UpstreamUnavailable) as e:
             logger.error(f"Erro ao buscar localização: {e}")
             raise
     
-    def reverse_geocode(self, lat: float, lon: float) -> Optional[Dict]:
+    async def reverse_geocode(self, lat: float, lon: float) -> Optional[Dict]:
         """Geocoding reverso: coordenadas → endereço (reverse geocoding)"""
+        # ~100 m: coordenadas vizinhas do navegador caem na mesma entrada
+        cache_key = f"reverse:{round(lat, 3)}:{round(lon, 3)}"
+        cached = geocoding_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
         try:
             logger.info(f"[GeocodingService] Iniciando reverse geocoding para {lat}, {lon}")
             
             # Faz requisição reversa ao Nominatim
-            location = self.geolocator.reverse(
+            location = await self._call(
+                self.geolocator.reverse,
                 f"{lat}, {lon}",
                 language="pt-BR"
             )
@@ -69,12 +132,15 @@ class GeocodingService:
             }
             
             logger.info(f"[GeocodingService] ✓ Localização reversa encontrada: {result['name']}, {result['state']}")
+            geocoding_cache.set(cache_key, result)
             return result
             
-        except GeocoderTimedOut:
+        except UpstreamUnavailable:
+            raise
+        except geopy_exc.GeocoderTimedOut:
             logger.error("[GeocodingService] Timeout ao fazer geocoding reverso")
             raise Exception("Tempo esgotado ao buscar localização")
-        except GeocoderServiceError as e:
+        except geopy_exc.GeocoderServiceError as e:
             logger.error(f"[GeocodingService] Erro do serviço de geocoding: {e}")
             raise Exception("Erro ao buscar localização")
         except Exception as e:
@@ -0,0 +1,136 @@
+"""
+Cache read-through da primeira página de insights
+
+A maior parte do tráfego de /api/v1/insights é a primeira página, sem
+filtro ou filtrada por uma localização. Essas respostas são cacheadas por
+filtro e invalidadas quando um insight é criado.
+
+Para que a outra réplica também descarte o cache, cada invalidação
+incrementa um carimbo de versão em `cache_versions`. Cada réplica lê esse
+documento (no máximo uma vez por CHECK_INTERVAL) e limpa o cache local
+quando a versão muda, em vez de refazer sort + count no MongoDB.
+
+Uma página só é gravada se nenhuma invalidação (local ou de outra réplica)
+ocorreu entre a leitura do carimbo, antes da consulta, e o fim dela; do
+contrário uma escrita concorrente deixaria a página antiga no cache pelo
+TTL inteiro.
+
+Os caches espaciais (nearby, clusters) são registrados como dependentes:
+uma versão publicada por outra réplica também os limpa.
+"""
+
+import logging
+import re
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
+from pymongo.errors import PyMongoError
+
+from app.config import settings
+from app.core.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class InsightsPageCache:
+    """Cache da primeira página com carimbo de versão compartilhado"""
+
+    STAMP_ID = "insights_first_page"
+
+    def __init__(self, ttl_seconds: float = 60, check_interval: float = 1.0):
+        self._cache = TTLCache(ttl_seconds=ttl_seconds, max_entries=256, name="InsightsPageCache")
+        self.check_interval = check_interval
+        self._version: Optional[int] = None
+        self._last_check = 0.0
+        self._dependents: List[TTLCache] = []
+        # Incrementado a cada invalidação local ou limpeza
+        self._generation = 0
+
+    def add_dependent(self, cache: TTLCache):
+        """Cache limpo junto quando outra réplica publica uma nova versão"""
+        self._dependents.append(cache)
+
+    def _clear_all(self):
+        self._generation += 1
+        self._cache.clear()
+        for cache in self._dependents:
+            cache.clear()
+
+    @staticmethod
+    def _key(location: Optional[str], limit: int) -> str:
+        return f"{(location or '').strip().lower()}:{limit}"
+
+    async def sync(self, db: AsyncIOMotorDatabase):
+        """Limpa os caches locais se outra réplica publicou nova versão"""
+        now = time.monotonic()
+        if now - self._last_check < self.check_interval:
+            return
+        self._last_check = now
+
+        stamp = await db.cache_versions.find_one({"_id": self.STAMP_ID}, {"version": 1})
+        version = stamp["version"] if stamp else 0
+        if self._version is not None and version != self._version:
+            self._clear_all()
+            logger.info(f"[InsightsPageCache] Versão {self._version} -> {version}, cache limpo")
+        self._version = version
+
+    async def get(self, db: AsyncIOMotorDatabase, location: Optional[str], limit: int) -> Optional[Dict]:
+        await self.sync(db)
+        return self._cache.get(self._key(location, limit))
+
+    def stamp(self) -> Tuple[int, Optional[int]]:
+        """Carimbo a ler antes da consulta e passar para set()"""
+        return self._generation, self._version
+
+    async def set(self, db: AsyncIOMotorDatabase, location: Optional[str], limit: int, data: Dict, stamp: Tuple[int, Optional[int]]):
+        """Grava a página se o carimbo não mudou desde `stamp`"""
+        try:
+            doc = await db.cache_versions.find_one({"_id": self.STAMP_ID}, {"version": 1})
+        except PyMongoError as e:
+            logger.warning(f"[InsightsPageCache] Carimbo indisponível, página não cacheada: {e}")
+            return
+        version = doc["version"] if doc else 0
+        if version != self._version:
+            # Outra réplica publicou durante a consulta
+            self._clear_all()
+            self._version = version
+        if (self._generation, self._version) != stamp:
+            logger.debug("[InsightsPageCache] Invalidado durante a consulta; página não cacheada")
+            return
+        self._cache.set(self._key(location, limit), data, meta=(location or "").strip())
+
+    async def invalidate(self, db: AsyncIOMotorDatabase, location_names: Iterable[str]):
+        """Descarta as páginas afetadas pelos novos insights e publica a versão"""
+        names = set(location_names)
+
+        def affected(key: str, term: str) -> bool:
+            if not term:
+                return True
+            try:
+                pattern = re.compile(term, re.IGNORECASE)
+            except re.error:
+                return True
+            return any(pattern.search(name) for name in names)
+
+        self._generation += 1
+        self._cache.invalidate(affected)
+
+        stamp = await db.cache_versions.find_one_and_update(
+            {"_id": self.STAMP_ID},
+            {"$inc": {"version": 1}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        # Se outra réplica também incrementou nesse meio tempo, limpa tudo
+        if self._version is not None and stamp["version"] != self._version + 1:
+            self._clear_all()
+        self._version = stamp["version"]
+
+
+# Instância global
+insights_page_cache = InsightsPageCache(
+    ttl_seconds=settings.INSIGHTS_PAGE_CACHE_TTL_SECONDS,
+    check_interval=settings.INSIGHTS_CACHE_VERSION_CHECK_SECONDS,
+)
@@ -1,19 +1,130 @@
 from motor.motor_asyncio import AsyncIOMotorDatabase
-from typing import List, Dict, Optional
+from typing import AsyncIterator, List, Dict, Optional
 from datetime import datetime
 from bson import ObjectId
+from pydantic import ValidationError
+from pymongo.errors import BulkWriteError, PyMongoError
+from app.models.insight import InsightCreate
+from app.core.cache import TTLCache
+from app.core.geo import haversine_km, snap_to_cell
+from app.core.pagination import encode_cursor, decode_cursor
+from app.services.insights_cache import insights_page_cache
+from app.config import settings
+from math import floor
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Campos enviados na exportação (evita trafegar updated_at e campos internos)
+EXPORT_PROJECTION = {
+    "author": 1,
+    "location.name": 1,
+    "location.state": 1,
+    "location.lat": 1,
+    "location.lon": 1,
+    "weather_snapshot": 1,
+    "content": 1,
+    "tags": 1,
+    "reactions": 1,
+    "created_at": 1,
+}
+
+# Buckets de raio (km) usados como chave do cache de busca por proximidade
+NEARBY_RADIUS_BUCKETS_KM = (5, 10, 25, 50, 100, 250, 500)
+# Folga (km) para cobrir o deslocamento entre o centro real e o da célula
+# (maior que a meia diagonal de uma célula de 0.01°, ~0.79 km)
+NEARBY_SNAP_MARGIN_KM = 1.0
+# Quantidade buscada por entrada de cache (igual ao limite máximo da rota)
+NEARBY_FETCH_LIMIT = 50
+
+# Cache de buscas por proximidade, por célula do centro e bucket de raio
+nearby_cache = TTLCache(
+    ttl_seconds=settings.NEARBY_CACHE_TTL_SECONDS,
+    max_entries=2048,
+    name="NearbyCache"
+)
+
+# Células de agrupamento por tile do mapa (tile = 360° / 2^zoom)
+CLUSTER_CELLS_PER_TILE = 4
+
+# Cache de clusters por zoom e bbox alinhada aos tiles
+cluster_cache = TTLCache(
+    ttl_seconds=settings.CLUSTER_CACHE_TTL_SECONDS,
+    max_entries=1024,
+    name="ClusterCache"
+)
+
+# Insights criados em outra réplica também descartam os caches espaciais
+insights_page_cache.add_dependent(nearby_cache)
+insights_page_cache.add_dependent(cluster_cache)
+
+def _radius_bucket(radius_km: float) -> int:
+    for bucket in NEARBY_RADIUS_BUCKETS_KM:
+        if radius_km <= bucket:
+            return bucket
+    return NEARBY_RADIUS_BUCKETS_KM[-1]
+
+def invalidate_nearby_cache(lat: float, lon: float) -> int:
+    """Descarta as buscas em cache cujo círculo contém o ponto informado"""
+    return nearby_cache.invalidate(
+        lambda key, meta: meta is not None
+        and haversine_km(meta["lat"], meta["lon"], lat, lon) <= meta["radius_km"]
+    )
+
+def _encode_search_cursor(score: float, doc_id: ObjectId) -> str:
+    return encode_cursor({"s": score, "id": str(doc_id)})
+
+def _decode_search_cursor(cursor: str) -> tuple:
+    """Decodifica o cursor de busca; levanta ValueError se inválido"""
+    values = decode_cursor(cursor)
+    try:
+        return float(values["s"]), ObjectId(values["id"])
+    except Exception as e:
+        raise ValueError("Cursor de busca inválido") from e
+
+def invalidate_cluster_cache(lat: float, lon: float) -> int:
+    """Descarta os clusters em cache cuja bbox contém o ponto informado"""
+    return cluster_cache.invalidate(
+        lambda key, meta: meta is not None
+        and meta[0] <= lon <= meta[2] and meta[1] <= lat <= meta[3]
+    )
+
+def invalidate_spatial_caches(lat: float, lon: float):
+    invalidate_nearby_cache(lat, lon)
+    invalidate_cluster_cache(lat, lon)
+
 class InsightsService:
     def __init__(self, db: AsyncIOMotorDatabase):
+        self.db = db
         self.collection = db.insights
     
-    async def create_insight(self, insight_data: Dict) -> str:
-        """Cria novo insight"""
-        insight_data["created_at"] = datetime.utcnow()
-        insight_data["updated_at"] = datetime.utcnow()
+    @staticmethod
+    def _build_filter(
+        location: Optional[str] = None,
+        tag: Optional[str] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None
+    ) -> Dict:
+        """Monta o filtro MongoDB a partir dos parâmetros de consulta"""
+        query = {}
+        if location:
+            query["location.name"] = {"$regex": location, "$options": "i"}
+        if tag:
+            query["tags"] = tag
+        if date_from or date_to:
+            query["created_at"] = {}
+            if date_from:
+                query["created_at"]["$gte"] = date_from
+            if date_to:
+                query["created_at"]["$lte"] = date_to
+        return query
+    
+    @staticmethod
+    def _prepare_document(insight_data: Dict, now: Optional[datetime] = None) -> Dict:
+        """Completa o documento com timestamps, reações e GeoJSON"""
+        now = now or datetime.utcnow()
+        insight_data["created_at"] = now
+        insight_data["updated_at"] = now
         insight_data["reactions"] = {"helpful": 0, "tried": 0}
         
         # Converter location para GeoJSON
@@ -23,20 +134,138 @@ class InsightsService:
                 "type": "Point",
                 "coordinates": [loc["lon"], loc["lat"]]
             }
-        
+        return insight_data
+    
+    async def create_insight(self, insight_data: Dict) -> str:
+        """Cria novo insight"""
+        insight_data = self._prepare_document(insight_data)
         result = await self.collection.insert_one(insight_data)
+        invalidate_spatial_caches(insight_data["location"]["lat"], insight_data["location"]["lon"])
+        await insights_page_cache.invalidate(self.db, [insight_data["location"]["name"]])
         return str(result.inserted_id)
     
+    async def create_insights_bulk(self, items: List[Dict], chunk_size: int = 500) -> Dict:
+        """
+        Valida e insere um lote de insights
+        
+        Cada item é validado como InsightCreate; os válidos são gravados em
+        chunks com insert_many(ordered=False), de modo que falhas pontuais
+        não interrompem o restante do lote. Retorna o status de cada item
+        na mesma ordem do payload.
+        
+        Um erro que não é de escrita (rede, timeout) interrompe o lote: os
+        chunks anteriores já foram gravados, então o chunk que falhou e os
+        seguintes são marcados como erro e o resultado parcial é devolvido
+        normalmente.
+        """
+        results: List[Dict] = [None] * len(items)
+        valid: List[tuple] = []
+        now = datetime.utcnow()
+        
+        for index, item in enumerate(items):
+            try:
+                insight = InsightCreate(**item)
+            except (ValidationError, TypeError) as e:
+                errors = e.errors() if isinstance(e, ValidationError) else [{"msg": str(e)}]
+                results[index] = {
+                    "index": index,
+                    "status": "error",
+                    "error": [
+                        {
+                            "field": ".".join(str(part) for part in err.get("loc", ())),
+                            "message": err.get("msg")
+                        }
+                        for err in errors
+                    ]
+                }
+                continue
+            valid.append((index, self._prepare_document(insight.dict(), now)))
+        
+        # Documentos que podem ter sido gravados (para invalidar os caches)
+        written: List[Dict] = []
+        for start in range(0, len(valid), chunk_size):
+            chunk = valid[start:start + chunk_size]
+            docs = [doc for _, doc in chunk]
+            failed_positions: Dict[int, str] = {}
+            
+            try:
+                await self.collection.insert_many(docs, ordered=False)
+            except BulkWriteError as e:
+                for write_error in e.details.get("writeErrors", []):
+                    failed_positions[write_error["index"]] = write_error.get("errmsg", "Erro de escrita")
+            except PyMongoError as e:
+                logger.error(f"[Insights] Lote interrompido no item {chunk[0][0]}: {e}")
+                # Parte deste chunk pode ter sido gravada; o status não é confirmado
+                for index, _ in chunk:
+                    results[index] = {
+                        "index": index,
+                        "status": "error",
+                        "error": f"Falha ao gravar ({type(e).__name__}); gravação não confirmada"
+                    }
+                for index, _ in valid[start + chunk_size:]:
+                    results[index] = {
+                        "index": index,
+                        "status": "error",
+                        "error": "Não processado: o lote foi interrompido"
+                    }
+                written.extend(docs)
+                break
+            
+            # insert_many preenche o _id de cada documento antes de enviar
+            for position, (index, doc) in enumerate(chunk):
+                if position in failed_positions:
+                    results[index] = {
+                        "index": index,
+                        "status": "error",
+                        "error": failed_positions[position]
+                    }
+                else:
+                    results[index] = {
+                        "index": index,
+                        "status": "created",
+                        "id": str(doc["_id"])
+                    }
+                    written.append(doc)
+        
+        for doc in written:
+            invalidate_spatial_caches(doc["location"]["lat"], doc["location"]["lon"])
+        if written:
+            # Um único carimbo de versão por lote. O cache local já foi limpo
+            # antes do carimbo; uma falha aqui não pode esconder os resultados
+            try:
+                await insights_page_cache.invalidate(
+                    self.db, [doc["location"]["name"] for doc in written]
+                )
+            except PyMongoError as e:
+                logger.warning(f"[Insights] Erro ao publicar versão do cache: {e}")
+        
+        inserted = sum(1 for r in results if r["status"] == "created")
+        logger.info(f"[Insights] Lote processado: {inserted}/{len(items)} inseridos")
+        return {
+            "inserted": inserted,
+            "failed": len(items) - inserted,
+            "results": results
+        }
+    
     async def get_insights(
         self, 
         location: Optional[str] = None,
         limit: int = 20,
         offset: int = 0
     ) -> Dict:
-        """Lista insights com paginação"""
-        query = {}
-        if location:
-            query["location.name"] = {"$regex": location, "$options": "i"}
+        """
+        Lista insights com paginação
+        
+        A primeira página (offset 0) passa pelo cache read-through,
+        invalidado na criação de insights.
+        """
+        if offset == 0:
+            cached = await insights_page_cache.get(self.db, location, limit)
+            if cached is not None:
+                return cached
+            stamp = insights_page_cache.stamp()
+        
+        query = self._build_filter(location)
         
         total = await self.collection.count_documents(query)
         cursor = self.collection.find(query).sort("created_at", -1).skip(offset).limit(limit)
@@ -46,7 +275,7 @@ class InsightsService:
             doc["id"] = str(doc.pop("_id"))
             insights.append(doc)
         
-        return {
+        result = {
             "insights": insights,
             "pagination": {
                 "total": total,
@@ -55,31 +284,286 @@ class InsightsService:
                 "pages": (total + limit - 1) // limit
             }
         }
+        if offset == 0:
+            await insights_page_cache.set(self.db, location, limit, result, stamp)
+        return result
     
     async def get_nearby_insights(
         self,
         lat: float,
         lon: float,
         radius_km: int = 100,
-        limit: int = 20
+        limit: int = 20,
+        tag: Optional[str] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None
     ) -> List[Dict]:
-        """Busca insights próximos usando geolocalização"""
-        query = {
-            "location.coordinates": {
-                "$near": {
-                    "$geometry": {
-                        "type": "Point",
-                        "coordinates": [lon, lat]
+        """
+        Busca insights próximos usando $geoNear, com distância em km
+        
+        O resultado do MongoDB (os NEARBY_FETCH_LIMIT mais próximos do centro
+        da célula) é cacheado por célula (~1km) e bucket de raio; cada
+        requisição recalcula a distância a partir do centro real e recorta
+        pelo raio e limite pedidos.
+        
+        Quando a busca em cache foi truncada no limite, só os candidatos a
+        até (alcance - NEARBY_SNAP_MARGIN_KM) do ponto real são garantidamente
+        os mais próximos (desigualdade triangular); se eles não bastam para o
+        limite pedido, a consulta é feita no ponto real, sem cache.
+        """
+        await insights_page_cache.sync(self.db)
+        cell_lat, cell_lon = snap_to_cell(lat, lon)
+        bucket = _radius_bucket(radius_km)
+        query = self._build_filter(tag=tag, date_from=date_from, date_to=date_to)
+        key = (
+            f"nearby:{cell_lat}:{cell_lon}:{bucket}:{tag or ''}:"
+            f"{date_from.isoformat() if date_from else ''}:"
+            f"{date_to.isoformat() if date_to else ''}"
+        )
+        
+        entry = nearby_cache.get(key)
+        if entry is None:
+            docs = await self._geo_near(cell_lat, cell_lon, bucket + NEARBY_SNAP_MARGIN_KM, query)
+            # Alcance da busca truncada (None: todos os documentos do círculo vieram)
+            reach_km = None
+            if len(docs) >= NEARBY_FETCH_LIMIT:
+                last = docs[-1]["location"]
+                reach_km = haversine_km(cell_lat, cell_lon, last["lat"], last["lon"])
+            entry = {"docs": docs, "reach_km": reach_km}
+            nearby_cache.set(
+                key,
+                entry,
+                meta={"lat": cell_lat, "lon": cell_lon, "radius_km": bucket + NEARBY_SNAP_MARGIN_KM}
+            )
+        
+        exact_km = radius_km
+        if entry["reach_km"] is not None:
+            exact_km = min(radius_km, entry["reach_km"] - NEARBY_SNAP_MARGIN_KM)
+        
+        insights = []
+        for doc in entry["docs"]:
+            loc = doc["location"]
+            distance = haversine_km(lat, lon, loc["lat"], loc["lon"])
+            if distance <= exact_km:
+                insights.append({**doc, "distance_km": round(distance, 3)})
+        
+        if len(insights) < limit and exact_km < radius_km:
+            logger.debug(f"[Insights] Busca em cache insuficiente para ({lat}, {lon}); consultando o ponto real")
+            insights = []
+            for doc in await self._geo_near(lat, lon, radius_km, query, limit=limit):
+                distance = haversine_km(lat, lon, doc["location"]["lat"], doc["location"]["lon"])
+                if distance <= radius_km:
+                    insights.append({**doc, "distance_km": round(distance, 3)})
+        
+        insights.sort(key=lambda d: d["distance_km"])
+        return insights[:limit]
+    
+    async def _geo_near(
+        self, lat: float, lon: float, radius_km: float, query: Dict, limit: int = NEARBY_FETCH_LIMIT
+    ) -> List[Dict]:
+        pipeline = [
+            {
+                "$geoNear": {
+                    "near": {"type": "Point", "coordinates": [lon, lat]},
+                    "distanceField": "distance_m",
+                    "maxDistance": radius_km * 1000,  # converter km para metros
+                    "spherical": True,
+                    "query": query
+                }
+            },
+            {"$limit": limit},
+            {"$project": {"updated_at": 0, "distance_m": 0}}
+        ]
+        
+        insights = []
+        async for doc in self.collection.aggregate(pipeline):
+            doc["id"] = str(doc.pop("_id"))
+            insights.append(doc)
+        return insights
+    
+    async def get_clusters(
+        self,
+        bbox: tuple,
+        zoom: int
+    ) -> Dict:
+        """
+        Agrupa os insights da área visível em células de grade
+        
+        A bbox (min_lon, min_lat, max_lon, max_lat) é expandida para os
+        tiles do zoom e o agrupamento roda no MongoDB; o tamanho da resposta
+        depende da área da tela, não do volume de dados. O resultado é
+        cacheado por zoom e bbox expandida.
+        """
+        min_lon, min_lat, max_lon, max_lat = bbox
+        tile = 360.0 / (2 ** zoom)
+        cell = tile / CLUSTER_CELLS_PER_TILE
+        
+        # Alinha a bbox aos tiles para que viewports vizinhos reaproveitem o cache
+        snapped = (
+            max(floor(min_lon / tile) * tile, -180.0),
+            max(floor(min_lat / tile) * tile, -90.0),
+            min((floor(max_lon / tile) + 1) * tile, 180.0),
+            min((floor(max_lat / tile) + 1) * tile, 90.0),
+        )
+        key = f"clusters:{zoom}:" + ":".join(f"{v:.6f}" for v in snapped)
+        
+        await insights_page_cache.sync(self.db)
+        clusters = cluster_cache.get(key)
+        if clusters is None:
+            clusters = await self._aggregate_clusters(snapped, cell)
+            cluster_cache.set(key, clusters, meta=snapped)
+        
+        visible = [
+            c for c in clusters
+            if min_lon <= c["lon"] <= max_lon and min_lat <= c["lat"] <= max_lat
+        ]
+        return {
+            "clusters": visible,
+            "total": sum(c["count"] for c in visible),
+            "zoom": zoom,
+            "bbox": list(bbox),
+            "cell_size_deg": cell
+        }
+    
+    async def _aggregate_clusters(self, bbox: tuple, cell: float) -> List[Dict]:
+        min_lon, min_lat, max_lon, max_lat = bbox
+        
+        if max_lon - min_lon < 180 and max_lat - min_lat < 180:
+            match = {
+                "location.coordinates": {
+                    "$geoWithin": {
+                        "$geometry": {
+                            "type": "Polygon",
+                            "coordinates": [[
+                                [min_lon, min_lat], [max_lon, min_lat],
+                                [max_lon, max_lat], [min_lon, max_lat],
+                                [min_lon, min_lat]
+                            ]]
+                        }
+                    }
+                }
+            }
+        else:
+            # Polígonos maiores que um hemisfério não são aceitos pelo $geoWithin
+            match = {
+                "location.lon": {"$gte": min_lon, "$lte": max_lon},
+                "location.lat": {"$gte": min_lat, "$lte": max_lat}
+            }
+        
+        pipeline = [
+            {"$match": match},
+            {
+                "$group": {
+                    "_id": {
+                        "x": {"$floor": {"$divide": ["$location.lon", cell]}},
+                        "y": {"$floor": {"$divide": ["$location.lat", cell]}}
                     },
-                    "$maxDistance": radius_km * 1000  # converter km para metros
+                    "count": {"$sum": 1},
+                    "lat": {"$avg": "$location.lat"},
+                    "lon": {"$avg": "$location.lon"},
+                    "insight_id": {"$first": "$_id"}
                 }
+            },
+            {"$project": {"_id": 0, "count": 1, "lat": 1, "lon": 1, "insight_id": 1}}
+        ]
+        
+        clusters = []
+        async for doc in self.collection.aggregate(pipeline):
+            cluster = {
+                "lat": round(doc["lat"], 6),
+                "lon": round(doc["lon"], 6),
+                "count": doc["count"]
+            }
+            # Célula com um único insight vira marcador individual no mapa
+            if doc["count"] == 1:
+                cluster["insight_id"] = str(doc["insight_id"])
+            clusters.append(cluster)
+        return clusters
+    
+    async def search_insights(
+        self,
+        text: str,
+        tag: Optional[str] = None,
+        lat: Optional[float] = None,
+        lon: Optional[float] = None,
+        radius_km: Optional[float] = None,
+        limit: int = 20,
+        cursor: Optional[str] = None
+    ) -> Dict:
+        """
+        Busca textual (índice text em português) ordenada por relevância
+        
+        Paginação por keyset sobre (score, _id): o cursor guarda o último
+        par retornado e a próxima página continua a partir dele, sem skip.
+        Filtros de tag e raio geográfico são aplicados no mesmo $match.
+        """
+        match: Dict = {"$text": {"$search": text, "$language": "portuguese"}}
+        if tag:
+            match["tags"] = tag
+        if lat is not None and lon is not None and radius_km:
+            match["location.coordinates"] = {
+                "$geoWithin": {"$centerSphere": [[lon, lat], radius_km / 6371.0088]}
             }
+        
+        pipeline = [
+            {"$match": match},
+            {"$addFields": {"score": {"$meta": "textScore"}}},
+        ]
+        if cursor:
+            last_score, last_id = _decode_search_cursor(cursor)
+            pipeline.append({
+                "$match": {
+                    "$or": [
+                        {"score": {"$lt": last_score}},
+                        {"score": last_score, "_id": {"$lt": last_id}}
+                    ]
+                }
+            })
+        pipeline += [
+            {"$sort": {"score": -1, "_id": -1}},
+            {"$limit": limit + 1},
+            {"$project": {"updated_at": 0}}
+        ]
+        
+        docs = [doc async for doc in self.collection.aggregate(pipeline)]
+        has_more = len(docs) > limit
+        docs = docs[:limit]
+        
+        next_cursor = None
+        if has_more:
+            next_cursor = _encode_search_cursor(docs[-1]["score"], docs[-1]["_id"])
+        
+        for doc in docs:
+            doc["id"] = str(doc.pop("_id"))
+            doc["score"] = round(doc["score"], 4)
+        
+        return {
+            "insights": docs,
+            "next_cursor": next_cursor,
+            "limit": limit
         }
+    
+    async def stream_insights(
+        self,
+        location: Optional[str] = None,
+        tag: Optional[str] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        batch_size: int = 500
+    ) -> AsyncIterator[Dict]:
+        """
+        Itera sobre todos os insights que casam com o filtro, direto do cursor
+        
+        O cursor busca `batch_size` documentos por ida ao MongoDB, então a
+        memória usada não depende do tamanho da collection.
+        """
+        query = self._build_filter(location, tag, date_from, date_to)
+        cursor = (
+            self.collection.find(query, EXPORT_PROJECTION)
+            .sort("created_at", -1)
+            .batch_size(batch_size)
+        )
         
-        cursor = self.collection.find(query).limit(limit)
-        insights = []
         async for doc in cursor:
             doc["id"] = str(doc.pop("_id"))
-            insights.append(doc)
-        
-        return insights
+            yield doc
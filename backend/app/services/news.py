@@ -0,0 +1,637 @@
+"""
+Serviço de notícias (NewsAPI) com cache multi-entrada e orçamento de quota
+
+A NewsAPI gratuita permite 100 requisições por dia. Para economizar quota:
+
+- NewsCache guarda uma entrada por combinação de parâmetros (endpoint,
+  categoria, ordenação...) e responde page_size menores a partir de uma
+  página maior já cacheada;
+- NewsQuotaBudget conta as chamadas do dia e alonga o TTL conforme a quota
+  restante cai; sem quota, os dados antigos (stale) continuam sendo servidos.
+  SharedNewsQuotaBudget mantém o contador no MongoDB, para que as réplicas e
+  o NewsRefresher dividam a mesma quota;
+- sem entrada fresca, a requisição não espera a NewsAPI: serve a entrada
+  stale (ou, sem entrada, o arquivo da categoria) e atualiza em background;
+- NewsStore replica as entradas no MongoDB, para que as duas réplicas sirvam
+  o que a outra (ou o NewsRefresher) já buscou.
+"""
+
+import ast
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import httpx
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+from app.config import settings
+from app.core.metrics import CacheStats, upstream_timer
+from app.core.resilience import UpstreamUnavailable, register_upstream
+from app.core.shm import SharedMemoryTable, decode_value, encode_value, shared_cache_path
+from app.core.snapshot import SnapshotEntry
+from app.database.mongodb import get_database
+from app.services.news_archive import NewsArchive, news_archive
+
+logger = logging.getLogger(__name__)
+
+NEWSAPI_BASE_URL = settings.NEWSAPI_BASE_URL
+
+# Cada tentativa consome quota: no máximo um retry, e 429 (quota) não é repetido
+newsapi_upstream = register_upstream("newsapi", timeout=15.0, max_retries=1, retry_statuses=(500, 502, 503, 504))
+
+NEWS_CATEGORIES = {
+    "AGRIBUSINESS": 'agronegócio OR agricultura OR "cana-de-açúcar"',
+    "SUGARCANE": '"cana-de-açúcar" OR "canavial" OR "usina de açúcar"',
+    "WEATHER": "clima OR meteorologia AND agricultura",
+}
+
+HEADLINE_CATEGORIES = ("business", "technology", "science")
+
+# Parâmetros mantidos aquecidos pelo NewsRefresher
+WARM_SORT_BY = "publishedAt"
+WARM_COUNTRY = "br"
+WARM_PAGE_SIZE = 100
+
+
+def everything_params(category: str, sort_by: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """(parâmetros de cache, parâmetros da NewsAPI) para /everything"""
+    return (
+        {"category": category, "sort_by": sort_by},
+        {"q": NEWS_CATEGORIES[category], "language": "pt", "sortBy": sort_by},
+    )
+
+
+def headlines_params(country: str, category: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """(parâmetros de cache, parâmetros da NewsAPI) para /top-headlines"""
+    params = {"country": country, "category": category}
+    return params, dict(params)
+
+
+class NewsAPIError(Exception):
+    """Erro da NewsAPI já mapeado para a resposta HTTP"""
+
+    def __init__(self, status_code: int, code: str, message: str, retry_after: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.code = code
+        self.message = message
+        self.retry_after = retry_after
+
+    def to_detail(self) -> Dict[str, Any]:
+        detail = {"code": self.code, "message": self.message}
+        if self.retry_after is not None:
+            detail["retry_after"] = self.retry_after
+        return detail
+
+
+class NewsQuotaBudget:
+    """Controla a quota diária da NewsAPI (reinicia à meia-noite UTC)"""
+
+    # (fração mínima de quota restante, multiplicador do TTL)
+    TTL_STEPS = ((0.5, 1), (0.25, 2), (0.1, 4), (0.0, 12))
+
+    def __init__(self, daily_quota: int = 100):
+        self.daily_quota = daily_quota
+        self._day = datetime.utcnow().date()
+        self._used = 0
+
+    def _roll_day(self):
+        today = datetime.utcnow().date()
+        if today != self._day:
+            self._day = today
+            self._used = 0
+
+    @property
+    def remaining(self) -> int:
+        self._roll_day()
+        return max(self.daily_quota - self._used, 0)
+
+    def consume(self, amount: int = 1):
+        self._roll_day()
+        self._used += amount
+
+    async def try_consume(self) -> bool:
+        """Reserva uma chamada da quota do dia; False se ela já acabou"""
+        if not self.can_fetch():
+            return False
+        self.consume()
+        return True
+
+    async def exhaust(self):
+        """A NewsAPI respondeu 429: não tenta de novo até o próximo dia"""
+        self._roll_day()
+        self._used = self.daily_quota
+
+    async def sync(self):
+        """Atualiza o contador a partir do armazenamento compartilhado (se houver)"""
+
+    def can_fetch(self) -> bool:
+        return self.remaining > 0
+
+    def ttl_multiplier(self) -> int:
+        fraction = self.remaining / self.daily_quota if self.daily_quota else 0
+        for threshold, multiplier in self.TTL_STEPS:
+            if fraction > threshold:
+                return multiplier
+        return self.TTL_STEPS[-1][1]
+
+
+class NewsCache:
+    """
+    Cache por parâmetros de consulta
+    
+    O page_size não faz parte da chave: cada entrada guarda a maior página
+    buscada para aqueles parâmetros e atende qualquer page_size menor.
+    """
+
+    # Por quanto tempo depois de obtida uma entrada ainda é servida como stale
+    # fora deste processo (tabela compartilhada e snapshots)
+    STALE_SECONDS = 7 * 86400
+
+    def __init__(self, ttl_minutes: int = 60):
+        self.ttl_seconds = ttl_minutes * 60
+        self._entries: Dict[Tuple, Dict[str, Any]] = {}
+        self.stats = CacheStats("news")
+
+    @staticmethod
+    def _key(endpoint: str, params: Dict[str, Any]) -> Tuple:
+        return (endpoint,) + tuple(sorted(params.items()))
+
+    def _get(self, key: Tuple) -> Optional[Dict[str, Any]]:
+        return self._entries.get(key)
+
+    def _set(self, key: Tuple, entry: Dict[str, Any]):
+        self._entries[key] = entry
+
+    def lookup(
+        self,
+        endpoint: str,
+        params: Dict[str, Any],
+        page_size: int,
+        ttl_multiplier: int = 1
+    ) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """
+        Retorna (entrada, fresca)
+        
+        A entrada é None quando não há dados que cubram o page_size pedido;
+        `fresca` indica se ainda está dentro do TTL (já ajustado pela quota).
+        """
+        entry = self._get(self._key(endpoint, params))
+        if entry is None or entry["page_size"] < page_size:
+            self.stats.misses.inc()
+            return None, False
+        age = (datetime.utcnow() - entry["timestamp"]).total_seconds()
+        fresh = age < self.ttl_seconds * ttl_multiplier
+        (self.stats.hits if fresh else self.stats.misses).inc()
+        return entry, fresh
+
+    def store(self, endpoint: str, params: Dict[str, Any], page_size: int, articles: List[Dict]):
+        self.put(endpoint, params, {
+            "articles": articles,
+            "page_size": page_size,
+            "timestamp": datetime.utcnow(),
+        })
+
+    def put(self, endpoint: str, params: Dict[str, Any], entry: Dict[str, Any]):
+        """Insere uma entrada pronta, mantendo a mais recente"""
+        key = self._key(endpoint, params)
+        current = self._get(key)
+        if current is None or current["timestamp"] <= entry["timestamp"]:
+            self._set(key, entry)
+
+    def get_entry(self, endpoint: str, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        return self._get(self._key(endpoint, params))
+
+    def snapshot_entries(self) -> List[SnapshotEntry]:
+        """Entradas para app.core.snapshot; a chave é o repr da tupla de parâmetros"""
+        entries = []
+        for key, entry in list(self._entries.items()):
+            obtained_at = entry["timestamp"].replace(tzinfo=timezone.utc).timestamp()
+            entries.append((repr(key), obtained_at + self.ttl_seconds, obtained_at + self.STALE_SECONDS, entry))
+        return entries
+
+    def restore_entries(self, entries: Iterable[SnapshotEntry]) -> int:
+        """Carrega entradas de um snapshot com put (a mais recente prevalece)"""
+        restored = 0
+        for key, _, _, value in entries:
+            try:
+                endpoint, *params = ast.literal_eval(key)
+            except (ValueError, SyntaxError):
+                logger.warning(f"[NewsCache] Chave inválida no snapshot: {key[:80]}")
+                continue
+            self.put(endpoint, dict(params), decode_value(value))
+            restored += 1
+        return restored
+
+
+class SharedNewsCache(NewsCache):
+    """
+    NewsCache em memória compartilhada entre workers (app.core.shm)
+
+    As entradas continuam disponíveis depois do TTL (servidas como stale),
+    então ficam na tabela por STALE_SECONDS; o frescor é decidido em lookup.
+    """
+
+    def __init__(self, table: SharedMemoryTable, ttl_minutes: int = 60):
+        super().__init__(ttl_minutes=ttl_minutes)
+        self.table = table
+
+    def _get(self, key: Tuple) -> Optional[Dict[str, Any]]:
+        raw = self.table.get(repr(key), allow_stale=True)
+        return None if raw is None else decode_value(raw)
+
+    def _set(self, key: Tuple, entry: Dict[str, Any]):
+        if not self.table.set(repr(key), encode_value(entry), self.ttl_seconds, self.STALE_SECONDS):
+            logger.warning(f"[NewsCache] Entrada {key[0]} não coube no slot compartilhado")
+
+    def snapshot_entries(self) -> List[SnapshotEntry]:
+        return list(self.table.items())
+
+
+class NewsStore:
+    """
+    Entradas de notícias compartilhadas entre réplicas (collection news_cache)
+    
+    Cada réplica consulta o store no máximo uma vez a cada
+    `check_interval` segundos por chave.
+    """
+
+    def __init__(self, check_interval: float = 30.0):
+        self.check_interval = check_interval
+        self._checked_at: Dict[str, float] = {}
+
+    @staticmethod
+    def _id(endpoint: str, params: Dict[str, Any]) -> str:
+        return json.dumps([endpoint, sorted(params.items())])
+
+    def should_check(self, endpoint: str, params: Dict[str, Any]) -> bool:
+        key = self._id(endpoint, params)
+        now = time.monotonic()
+        if now - self._checked_at.get(key, 0.0) < self.check_interval:
+            return False
+        self._checked_at[key] = now
+        return True
+
+    async def load(self, endpoint: str, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        doc = await get_database().news_cache.find_one({"_id": self._id(endpoint, params)})
+        if doc is None:
+            return None
+        return {
+            "articles": doc["articles"],
+            "page_size": doc["page_size"],
+            "timestamp": doc["timestamp"],
+        }
+
+    async def save(self, endpoint: str, params: Dict[str, Any], entry: Dict[str, Any]):
+        await get_database().news_cache.replace_one(
+            {"_id": self._id(endpoint, params)},
+            {"endpoint": endpoint, "params": params, **entry},
+            upsert=True,
+        )
+
+
+class SharedNewsQuotaBudget(NewsQuotaBudget):
+    """
+    NewsQuotaBudget com o contador do dia na collection news_quota
+
+    Cada chamada à NewsAPI é reservada com um $inc condicional (used < quota),
+    então as réplicas e o NewsRefresher nunca somam mais que a quota diária.
+    A leitura para o TTL usa o último valor conhecido, relido no máximo uma
+    vez por `sync_interval`. Sem MongoDB, volta a contar só no processo.
+    """
+
+    def __init__(self, daily_quota: int = 100, sync_interval: float = 30.0):
+        super().__init__(daily_quota)
+        self.sync_interval = sync_interval
+        self._synced_at = 0.0
+
+    @staticmethod
+    def _collection():
+        db = get_database()
+        return None if db is None else db.news_quota
+
+    def _day_id(self) -> str:
+        self._roll_day()
+        return self._day.isoformat()
+
+    async def sync(self):
+        now = time.monotonic()
+        collection = self._collection()
+        if collection is None or now - self._synced_at < self.sync_interval:
+            return
+        self._synced_at = now
+        day = self._day_id()
+        try:
+            doc = await collection.find_one({"_id": day})
+        except PyMongoError as e:
+            logger.warning(f"[NewsQuota] Erro ao ler quota compartilhada: {e}")
+            return
+        if doc is not None and self._day.isoformat() == day:
+            self._used = max(self._used, doc["used"])
+
+    async def try_consume(self) -> bool:
+        collection = self._collection()
+        if collection is None:
+            return await super().try_consume()
+        day = self._day_id()
+        try:
+            doc = await collection.find_one_and_update(
+                {"_id": day, "used": {"$lt": self.daily_quota}},
+                {
+                    "$inc": {"used": 1},
+                    "$setOnInsert": {"expires_at": datetime.utcnow() + timedelta(days=2)},
+                },
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError:
+            # O documento do dia existe com used >= quota
+            self._used = max(self._used, self.daily_quota)
+            return False
+        except PyMongoError as e:
+            logger.warning(f"[NewsQuota] Quota compartilhada indisponível, contando localmente: {e}")
+            return await super().try_consume()
+        self._used = max(self._used, doc["used"])
+        return True
+
+    async def exhaust(self):
+        await super().exhaust()
+        collection = self._collection()
+        if collection is None:
+            return
+        try:
+            await collection.update_one(
+                {"_id": self._day_id()},
+                {
+                    "$max": {"used": self.daily_quota},
+                    "$setOnInsert": {"expires_at": datetime.utcnow() + timedelta(days=2)},
+                },
+                upsert=True,
+            )
+        except PyMongoError as e:
+            logger.warning(f"[NewsQuota] Erro ao gravar quota esgotada: {e}")
+
+
+def _clean_articles(data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Remove artigos sem título ou marcados como [Removed]"""
+    return [
+        article for article in data.get("articles", [])
+        if article.get("title") and "[Removed]" not in article["title"]
+    ]
+
+
+class NewsService:
+    """Acesso à NewsAPI com cache, store compartilhado e orçamento de quota"""
+
+    def __init__(
+        self,
+        cache: NewsCache,
+        budget: NewsQuotaBudget,
+        store: Optional[NewsStore] = None,
+        archive: Optional[NewsArchive] = None,
+        warm_enabled: bool = False
+    ):
+        self.cache = cache
+        self.budget = budget
+        self.store = store
+        self.archive = archive
+        # Há um NewsRefresher mantendo os parâmetros aquecidos (warm=True)
+        self.warm_enabled = warm_enabled
+        # Idade a partir da qual uma entrada aquecida volta a ser tratada
+        # como expirada (ajustada pelo NewsRefresher conforme a cadência)
+        self.warm_max_age_seconds = cache.ttl_seconds * 2
+        # Atualizações em background em andamento, uma por entrada
+        self._refreshing: Dict[Tuple, asyncio.Task] = {}
+
+    async def _request(self, path: str, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        try:
+            async with httpx.AsyncClient() as client:
+                async def attempt(timeout: float) -> httpx.Response:
+                    # Cada tentativa (inclusive retry) gasta quota
+                    if not await self.budget.try_consume():
+                        raise NewsAPIError(429, "NEWS_API_QUOTA_EXCEEDED", "Limite diário de notícias excedido", retry_after=3600)
+                    with upstream_timer("newsapi") as call:
+                        response = await client.get(
+                            f"{NEWSAPI_BASE_URL}/{path}",
+                            params={**params, "apiKey": settings.NEWSAPI_KEY},
+                            timeout=timeout
+                        )
+                        call.status = response.status_code
+                    return response
+                
+                response = await newsapi_upstream.call(attempt)
+        except UpstreamUnavailable as e:
+            logger.error(f"[News] NewsAPI indisponível: {e}")
+            raise NewsAPIError(503, "NEWS_API_UNAVAILABLE", "Serviço de notícias temporariamente indisponível")
+        except httpx.TimeoutException:
+            logger.error("[News] Timeout ao buscar notícias")
+            raise NewsAPIError(504, "NEWS_API_TIMEOUT", "Timeout ao buscar notícias")
+        except httpx.HTTPError as e:
+            logger.error(f"[News] Erro HTTP: {e}")
+            raise NewsAPIError(503, "NEWS_API_ERROR", "Erro ao buscar notícias")
+
+        if response.status_code == 401:
+            logger.error("[News] NewsAPI key inválida")
+            raise NewsAPIError(503, "NEWS_API_ERROR", "Serviço de notícias temporariamente indisponível")
+
+        if response.status_code == 429:
+            logger.error("[News] Quota da NewsAPI excedida")
+            await self.budget.exhaust()
+            raise NewsAPIError(429, "NEWS_API_QUOTA_EXCEEDED", "Limite diário de notícias excedido", retry_after=3600)
+
+        if response.is_error:
+            logger.error(f"[News] NewsAPI respondeu {response.status_code}")
+            raise NewsAPIError(503, "NEWS_API_ERROR", "Erro ao buscar notícias")
+
+        return _clean_articles(response.json())
+
+    async def fetch(
+        self,
+        endpoint: str,
+        cache_params: Dict[str, Any],
+        request_params: Dict[str, Any],
+        page_size: int
+    ) -> List[Dict[str, Any]]:
+        """
+        Busca na NewsAPI e grava no arquivo, no cache local e no store
+        
+        Com o arquivo disponível, buscas por publishedAt são incrementais:
+        a NewsAPI só é consultada a partir do publishedAt mais recente já
+        arquivado, e a página é montada a partir do arquivo.
+        """
+        archive_category = self._archive_category(endpoint, cache_params)
+        incremental = (
+            self.archive is not None
+            and endpoint == "everything"
+            and request_params.get("sortBy") == "publishedAt"
+        )
+        params = {**request_params, "pageSize": page_size}
+        
+        if incremental:
+            since = await self.archive.latest_published_at(archive_category)
+            if since is not None:
+                params["from"] = since.isoformat(timespec="seconds")
+        
+        articles = await self._request(endpoint, params)
+        
+        if self.archive is not None:
+            try:
+                await self.archive.upsert_articles(articles, archive_category)
+                if incremental:
+                    articles = await self.archive.latest(archive_category, page_size)
+            except Exception as e:
+                logger.warning(f"[News] Erro ao atualizar arquivo de notícias: {e}")
+        
+        self.cache.store(endpoint, cache_params, page_size, articles)
+        if self.store is not None:
+            try:
+                await self.store.save(endpoint, cache_params, self.cache.get_entry(endpoint, cache_params))
+            except Exception as e:
+                logger.warning(f"[News] Erro ao gravar no store compartilhado: {e}")
+        logger.info(
+            f"[News] Busca realizada: {len(articles)} artigos {cache_params} "
+            f"(quota restante: {self.budget.remaining})"
+        )
+        return articles
+
+    async def get_articles(
+        self,
+        endpoint: str,
+        cache_params: Dict[str, Any],
+        request_params: Dict[str, Any],
+        page_size: int,
+        warm: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Busca artigos passando pelo cache
+        
+        Ordem: entrada fresca local → store compartilhado → entrada stale →
+        arquivo da categoria → NewsAPI. Entradas stale e o arquivo são
+        servidos na hora (stale=true) enquanto uma atualização roda em
+        background (se houver quota); a requisição só espera a NewsAPI quando
+        não há nada para servir. Com `warm=True` (parâmetros mantidos pelo
+        NewsRefresher, se habilitado), a entrada é servida sem atualização
+        própria enquanto tiver menos de `warm_max_age_seconds`; mais velha
+        que isso (refresher parado ou sem líder), segue o caminho normal.
+        Retorna dict com articles, cached, stale e cached_at.
+        """
+        await self.budget.sync()
+        ttl_multiplier = self.budget.ttl_multiplier()
+        entry, fresh = self.cache.lookup(endpoint, cache_params, page_size, ttl_multiplier)
+
+        if not fresh and self.store is not None and self.store.should_check(endpoint, cache_params):
+            try:
+                stored = await self.store.load(endpoint, cache_params)
+            except Exception as e:
+                logger.warning(f"[News] Erro ao ler store compartilhado: {e}")
+                stored = None
+            if stored is not None:
+                self.cache.put(endpoint, cache_params, stored)
+                entry, fresh = self.cache.lookup(endpoint, cache_params, page_size, ttl_multiplier)
+
+        if entry is not None and fresh:
+            logger.info(f"[News] Cache HIT {endpoint} {cache_params}")
+            return self._from_entry(entry, page_size, stale=False)
+
+        if warm and self.warm_enabled and entry is not None:
+            age = (datetime.utcnow() - entry["timestamp"]).total_seconds()
+            if age <= self.warm_max_age_seconds:
+                return self._from_entry(entry, page_size, stale=False)
+
+        if entry is not None:
+            self._refresh_in_background(endpoint, cache_params, request_params, page_size)
+            logger.info(f"[News] Servindo dados antigos {cache_params}")
+            return self._from_entry(entry, page_size, stale=True)
+
+        archived = await self._from_archive(endpoint, cache_params, page_size)
+        if archived:
+            self._refresh_in_background(endpoint, cache_params, request_params, page_size)
+            logger.info(f"[News] Cache MISS, servindo arquivo {cache_params}")
+            return {"articles": archived, "cached": True, "stale": True}
+
+        if not self.budget.can_fetch():
+            raise NewsAPIError(429, "NEWS_API_QUOTA_EXCEEDED", "Limite diário de notícias excedido", retry_after=3600)
+
+        articles = await self.fetch(endpoint, cache_params, request_params, page_size)
+        return {"articles": articles, "cached": False, "stale": False}
+
+    async def _from_archive(
+        self, endpoint: str, cache_params: Dict[str, Any], page_size: int
+    ) -> List[Dict[str, Any]]:
+        """Artigos mais recentes já arquivados para os parâmetros (vazio se não houver)"""
+        if self.archive is None:
+            return []
+        try:
+            return await self.archive.latest(self._archive_category(endpoint, cache_params), page_size)
+        except Exception as e:
+            logger.warning(f"[News] Erro ao ler arquivo de notícias: {e}")
+            return []
+
+    def _refresh_in_background(
+        self,
+        endpoint: str,
+        cache_params: Dict[str, Any],
+        request_params: Dict[str, Any],
+        page_size: int
+    ):
+        """Busca na NewsAPI sem bloquear a requisição (uma busca por entrada)"""
+        key = NewsCache._key(endpoint, cache_params)
+        if key in self._refreshing or not self.budget.can_fetch():
+            return
+
+        async def refresh():
+            try:
+                await self.fetch(endpoint, cache_params, request_params, page_size)
+            except NewsAPIError as e:
+                logger.warning(f"[News] Atualização em background falhou {cache_params}: {e.message}")
+            except Exception as e:
+                logger.error(f"[News] Erro na atualização em background {cache_params}: {e}")
+            finally:
+                self._refreshing.pop(key, None)
+
+        self._refreshing[key] = asyncio.create_task(refresh())
+
+    async def close(self):
+        """Cancela as atualizações em background pendentes"""
+        tasks = list(self._refreshing.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._refreshing.clear()
+
+    @staticmethod
+    def _archive_category(endpoint: str, cache_params: Dict[str, Any]) -> str:
+        if endpoint == "top-headlines":
+            return f"headlines:{cache_params['country']}:{cache_params['category']}"
+        return cache_params["category"]
+
+    @staticmethod
+    def _from_entry(entry: Dict[str, Any], page_size: int, stale: bool) -> Dict[str, Any]:
+        return {
+            "articles": entry["articles"][:page_size],
+            "cached": True,
+            "stale": stale,
+            "cached_at": entry["timestamp"].isoformat(),
+        }
+
+
+# Instâncias globais
+if settings.CACHE_BACKEND == "shared":
+    news_cache = SharedNewsCache(
+        SharedMemoryTable(shared_cache_path("news", settings.SHARED_CACHE_DIR), slots=64, slot_size=262144),
+        ttl_minutes=settings.NEWS_CACHE_TTL_MINUTES
+    )
+else:
+    news_cache = NewsCache(ttl_minutes=settings.NEWS_CACHE_TTL_MINUTES)
+if settings.NEWSAPI_QUOTA_BACKEND == "mongo":
+    news_quota = SharedNewsQuotaBudget(daily_quota=settings.NEWSAPI_DAILY_QUOTA)
+else:
+    news_quota = NewsQuotaBudget(daily_quota=settings.NEWSAPI_DAILY_QUOTA)
+news_store = NewsStore()
+news_service = NewsService(
+    news_cache, news_quota, news_store, news_archive, warm_enabled=settings.NEWS_REFRESH_ENABLED
+)
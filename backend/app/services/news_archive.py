@@ -0,0 +1,163 @@
+"""
+Arquivo persistente de notícias (collection news_archive)
+
+Todo artigo que volta da NewsAPI é gravado (upsert) com _id = hash da URL,
+acumulando as categorias em que apareceu. Paginação e busca textual sobre
+artigos já vistos são atendidas inteiramente pelo arquivo, sem gastar quota.
+"""
+
+import hashlib
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from pymongo import UpdateOne
+
+from app.core.pagination import decode_cursor, encode_cursor
+from app.database.mongodb import get_database
+
+logger = logging.getLogger(__name__)
+
+# Campos do artigo da NewsAPI devolvidos pelo arquivo
+ARTICLE_PROJECTION = {
+    "_id": 1,
+    "source": 1,
+    "author": 1,
+    "title": 1,
+    "description": 1,
+    "url": 1,
+    "urlToImage": 1,
+    "publishedAt": 1,
+    "content": 1,
+    "categories": 1,
+    "published_at": 1,
+}
+
+# Campos de um artigo como a NewsAPI devolve
+LIVE_ARTICLE_FIELDS = (
+    "source", "author", "title", "description", "url", "urlToImage", "publishedAt", "content",
+)
+
+
+def url_hash(url: str) -> str:
+    return hashlib.sha1(url.encode("utf-8")).hexdigest()
+
+
+def _parse_published_at(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        # NewsAPI usa "2025-11-30T12:00:00Z"
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).replace(tzinfo=None)
+    except ValueError:
+        return None
+
+
+class NewsArchive:
+    @property
+    def collection(self):
+        return get_database().news_archive
+
+    async def upsert_articles(self, articles: List[Dict[str, Any]], category: str) -> int:
+        """Grava os artigos, deduplicados pela URL; retorna quantos eram novos"""
+        now = datetime.utcnow()
+        operations = []
+        for article in articles:
+            url = article.get("url")
+            published_at = _parse_published_at(article.get("publishedAt"))
+            if not url or published_at is None:
+                continue
+            operations.append(UpdateOne(
+                {"_id": url_hash(url)},
+                {
+                    "$setOnInsert": {
+                        **{k: v for k, v in article.items() if k in ARTICLE_PROJECTION},
+                        "published_at": published_at,
+                        "archived_at": now,
+                    },
+                    "$addToSet": {"categories": category},
+                },
+                upsert=True,
+            ))
+
+        if not operations:
+            return 0
+        result = await self.collection.bulk_write(operations, ordered=False)
+        if result.upserted_count:
+            logger.info(f"[NewsArchive] {result.upserted_count} artigos novos ({category})")
+        return result.upserted_count
+
+    async def latest_published_at(self, category: str) -> Optional[datetime]:
+        doc = await self.collection.find_one(
+            {"categories": category},
+            {"published_at": 1},
+            sort=[("published_at", -1)],
+        )
+        return doc["published_at"] if doc else None
+
+    async def search(
+        self,
+        category: Optional[str] = None,
+        text: Optional[str] = None,
+        limit: int = 20,
+        cursor: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Lista artigos do arquivo, mais recentes primeiro
+        
+        Paginação por keyset sobre (published_at, _id); `text` usa o índice
+        text em português sobre título e descrição.
+        """
+        query: Dict[str, Any] = {}
+        if category:
+            query["categories"] = category
+        if text:
+            query["$text"] = {"$search": text, "$language": "portuguese"}
+        if cursor:
+            values = decode_cursor(cursor)
+            try:
+                last_published = datetime.fromisoformat(values["p"])
+                last_id = str(values["id"])
+            except (KeyError, TypeError, ValueError) as e:
+                raise ValueError("Cursor de paginação inválido") from e
+            query["$or"] = [
+                {"published_at": {"$lt": last_published}},
+                {"published_at": last_published, "_id": {"$lt": last_id}},
+            ]
+
+        docs = await (
+            self.collection.find(query, ARTICLE_PROJECTION)
+            .sort([("published_at", -1), ("_id", -1)])
+            .limit(limit + 1)
+            .to_list(length=limit + 1)
+        )
+        has_more = len(docs) > limit
+        docs = docs[:limit]
+
+        next_cursor = None
+        if has_more:
+            last = docs[-1]
+            next_cursor = encode_cursor({"p": last["published_at"].isoformat(), "id": last["_id"]})
+
+        return {"articles": [self.to_article(doc) for doc in docs], "next_cursor": next_cursor}
+
+    async def latest(self, category: str, limit: int) -> List[Dict[str, Any]]:
+        """Artigos mais recentes da categoria no mesmo formato da busca ao vivo"""
+        articles = (await self.search(category=category, limit=limit))["articles"]
+        return [self.to_live_article(article) for article in articles]
+
+    @staticmethod
+    def to_article(doc: Dict[str, Any]) -> Dict[str, Any]:
+        """Documento do arquivo → formato de artigo da NewsAPI"""
+        article = {k: v for k, v in doc.items() if k not in ("_id", "published_at")}
+        article["id"] = doc["_id"]
+        return article
+
+    @staticmethod
+    def to_live_article(article: Dict[str, Any]) -> Dict[str, Any]:
+        """Remove os campos do arquivo (id, categories) de um artigo"""
+        return {k: article[k] for k in LIVE_ARTICLE_FIELDS if k in article}
+
+
+# Instância global
+news_archive = NewsArchive()
@@ -0,0 +1,142 @@
+"""
+Atualização em background das notícias
+
+Mantém aquecidas todas as categorias de NEWS_CATEGORIES (ordenadas por
+publishedAt) e as categorias de headlines do Brasil, para que requisições
+de usuários nunca esperem a NewsAPI. Apenas a réplica dona do lease
+`news_refresher` busca; o resultado vai para o store compartilhado e é
+servido pelas duas réplicas.
+
+A cadência respeita a quota diária: o intervalo entre ciclos é o maior entre
+NEWS_REFRESH_MIN_INTERVAL_MINUTES e o necessário para que os ciclos do dia
+consumam no máximo NEWS_REFRESH_QUOTA_SHARE da quota, e é multiplicado
+pelo fator de TTL do NewsQuotaBudget quando a quota restante cai.
+"""
+
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.database.lease import MongoLease
+from app.services.news import (
+    HEADLINE_CATEGORIES,
+    NEWS_CATEGORIES,
+    WARM_COUNTRY,
+    WARM_PAGE_SIZE,
+    WARM_SORT_BY,
+    NewsAPIError,
+    NewsService,
+    everything_params,
+    headlines_params,
+    news_service,
+)
+
+logger = logging.getLogger(__name__)
+
+# (endpoint, parâmetros de cache, parâmetros da NewsAPI)
+RefreshJob = Tuple[str, Dict[str, Any], Dict[str, Any]]
+
+
+def build_jobs() -> List[RefreshJob]:
+    jobs = [("everything", *everything_params(c, WARM_SORT_BY)) for c in NEWS_CATEGORIES]
+    jobs += [("top-headlines", *headlines_params(WARM_COUNTRY, c)) for c in HEADLINE_CATEGORIES]
+    return jobs
+
+
+class NewsRefresher:
+    def __init__(
+        self,
+        service: NewsService,
+        lease: MongoLease,
+        check_interval: float = 60.0,
+        min_interval: float = 3600.0,
+        quota_share: float = 0.8
+    ):
+        self.service = service
+        self.lease = lease
+        self.check_interval = check_interval
+        self.min_interval = min_interval
+        self.quota_share = quota_share
+        self.jobs = build_jobs()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def interval_seconds(self) -> float:
+        """Intervalo entre atualizações de cada job, respeitando a quota"""
+        budget = self.service.budget
+        quota_interval = 86400 * len(self.jobs) / max(budget.daily_quota * self.quota_share, 1)
+        return max(self.min_interval, quota_interval) * budget.ttl_multiplier()
+
+    async def _age_seconds(self, endpoint: str, cache_params: Dict[str, Any]) -> Optional[float]:
+        entry = self.service.cache.get_entry(endpoint, cache_params)
+        if self.service.store is not None:
+            stored = await self.service.store.load(endpoint, cache_params)
+            if stored is not None and (entry is None or stored["timestamp"] > entry["timestamp"]):
+                self.service.cache.put(endpoint, cache_params, stored)
+                entry = stored
+        if entry is None:
+            return None
+        return (datetime.utcnow() - entry["timestamp"]).total_seconds()
+
+    async def refresh_due(self) -> int:
+        """Atualiza os jobs vencidos; retorna quantos foram buscados"""
+        await self.service.budget.sync()
+        interval = self.interval_seconds
+        refreshed = 0
+
+        for endpoint, cache_params, request_params in self.jobs:
+            age = await self._age_seconds(endpoint, cache_params)
+            if age is not None and age < interval:
+                continue
+            if not self.service.budget.can_fetch():
+                logger.warning("[NewsRefresher] Quota esgotada, atualização adiada")
+                break
+            try:
+                await self.service.fetch(endpoint, cache_params, request_params, WARM_PAGE_SIZE)
+                refreshed += 1
+            except NewsAPIError as e:
+                logger.error(f"[NewsRefresher] Falha em {endpoint} {cache_params}: {e.message}")
+
+        if refreshed:
+            logger.info(f"[NewsRefresher] {refreshed} jobs atualizados (intervalo: {interval / 60:.0f} min)")
+        return refreshed
+
+    async def _run(self):
+        while True:
+            # Em todas as réplicas, não só na dona do lease
+            self.service.warm_max_age_seconds = self.interval_seconds * 2
+            try:
+                if await self.lease.acquire():
+                    await self.refresh_due()
+            except Exception as e:
+                logger.error(f"[NewsRefresher] Erro no ciclo: {e}")
+            await asyncio.sleep(self.check_interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self.lease.release()
+        except Exception as e:
+            logger.warning(f"[NewsRefresher] Erro ao liberar lease: {e}")
+
+
+# Instância global
+news_refresher = NewsRefresher(
+    news_service,
+    MongoLease("news_refresher", ttl_seconds=settings.NEWS_REFRESH_CHECK_SECONDS * 3),
+    check_interval=settings.NEWS_REFRESH_CHECK_SECONDS,
+    min_interval=settings.NEWS_REFRESH_MIN_INTERVAL_MINUTES * 60,
+    quota_share=settings.NEWS_REFRESH_QUOTA_SHARE,
+)
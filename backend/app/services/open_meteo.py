@@ -2,10 +2,16 @@ import httpx
 from typing import Dict, Any
 import logging
 
+from app.config import settings
+from app.core.metrics import upstream_timer
+from app.core.resilience import register_upstream
+
 logger = logging.getLogger(__name__)
 
+open_meteo_upstream = register_upstream("open_meteo", timeout=10.0)
+
 class OpenMeteoService:
-    BASE_URL = "https://api.open-meteo.com/v1"
+    BASE_URL = settings.OPEN_METEO_BASE_URL
     
     async def get_current_weather(self, lat: float, lon: float) -> Dict[str, Any]:
         """Busca dados climáticos da Open-Meteo API"""
@@ -36,11 +42,17 @@ class OpenMeteoService:
         
         try:
             async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.BASE_URL}/forecast",
-                    params=params,
-                    timeout=10.0
-                )
+                async def attempt(timeout: float) -> httpx.Response:
+                    with upstream_timer("open_meteo") as call:
+                        response = await client.get(
+                            f"{self.BASE_URL}/forecast",
+                            params=params,
+                            timeout=timeout
+                        )
+                        call.status = response.status_code
+                    return response
+                
+                response = await open_meteo_upstream.call(attempt)
                 response.raise_for_status()
                 return response.json()
         except httpx.TimeoutException:
@@ -4,58 +4,357 @@ Fonte: https://www.noticiasagricolas.com.br/cotacoes/sucroenergetico/acucar-prec
 """
 
 import httpx
-from bs4 import BeautifulSoup
-from typing import List, Dict, Any
+from importlib.util import find_spec
+from pymongo import UpdateOne
+from pymongo.errors import PyMongoError
+from typing import List, Dict, Any, Iterable, Optional, Set, Tuple
+import asyncio
 import logging
-from datetime import datetime
+import time
+from datetime import datetime, timezone
 from abc import ABC, abstractmethod
+from app.config import settings
+from app.core.lazy import LazyModule
+from app.core.metrics import CacheStats, upstream_timer
+from app.core.resilience import register_upstream
+from app.core.shm import SharedMemoryTable, decode_value, encode_value, shared_cache_path
+from app.core.snapshot import SnapshotEntry
+from app.core.tracing import span
+from app.database.mongodb import get_database
 
 logger = logging.getLogger(__name__)
 
+# bs4 (e o lxml) só são importados no primeiro parse
+bs4 = LazyModule("bs4")
+
+# Parser em C (lxml) quando instalado; html.parser puro como fallback
+HTML_PARSER = "lxml" if find_spec("lxml") is not None else "html.parser"
+
+
+def cotacao_soup(html: str):
+    """Parse materializando apenas os blocos div.cotacao, ignorando o resto da página"""
+    return bs4.BeautifulSoup(html, HTML_PARSER, parse_only=bs4.SoupStrainer("div", class_="cotacao"))
+
+# "1.234,56" -> "1234.56"
+_DECIMAL_BR = str.maketrans({".": None, ",": "."})
+
+# Breaker único para o site (página da cana e das demais commodities)
+noticiasagricolas_upstream = register_upstream("noticiasagricolas", timeout=30.0)
+
 class QuotationCache(ABC):
     """Interface para cache de cotação"""
     
     @abstractmethod
     async def get(self) -> List[Dict[str, Any]] | None:
+        """Dados dentro do TTL, ou None"""
         pass
     
     @abstractmethod
     async def set(self, data: List[Dict[str, Any]]) -> None:
         pass
+    
+    @abstractmethod
+    async def get_stale(self) -> Tuple[List[Dict[str, Any]], datetime] | None:
+        """Últimos dados válidos e quando foram obtidos, mesmo se expirados"""
+        pass
+    
+    def snapshot_entries(self) -> List[SnapshotEntry]:
+        """Entradas para app.core.snapshot (caches sem snapshot devolvem [])"""
+        return []
+    
+    def restore_entries(self, entries: Iterable[SnapshotEntry]) -> int:
+        return 0
 
 
 class InMemoryQuotationCache(QuotationCache):
     """Cache em memória (simples, sem persistência)"""
     
+    KEY = "quotation:sugarcane"
+    # Os últimos dados válidos ficam disponíveis para stale-if-error
+    STALE_SECONDS = 30 * 86400
+    
     def __init__(self):
         self.data: List[Dict[str, Any]] | None = None
         self.timestamp: datetime | None = None
         self.ttl_seconds = 3600  # 1 hora
+        self.stats = CacheStats("quotation")
+    
+    def _read(self) -> Tuple[List[Dict[str, Any]] | None, datetime | None]:
+        """(dados, timestamp) armazenados; subclasses trocam o armazenamento"""
+        return self.data, self.timestamp
+    
+    def _write(self, data: List[Dict[str, Any]], timestamp: datetime):
+        self.data = data
+        self.timestamp = timestamp
     
     async def get(self) -> List[Dict[str, Any]] | None:
-        if self.data is None or self.timestamp is None:
+        data, timestamp = self._read()
+        if data is None or timestamp is None:
+            self.stats.misses.inc()
             return None
         
-        age_seconds = (datetime.now() - self.timestamp).total_seconds()
+        age_seconds = (datetime.utcnow() - timestamp).total_seconds()
         if age_seconds > self.ttl_seconds:
+            # Mantém os dados para get_stale (stale-if-error)
             logger.info("[QuotationCache] Cache expirado")
-            self.data = None
-            self.timestamp = None
+            self.stats.misses.inc()
             return None
         
         logger.info(f"[QuotationCache] Cache HIT (idade: {age_seconds:.0f}s)")
-        return self.data
+        self.stats.hits.inc()
+        return data
     
     async def set(self, data: List[Dict[str, Any]]) -> None:
-        self.data = data
-        self.timestamp = datetime.now()
+        self._write(data, datetime.utcnow())
         logger.info(f"[QuotationCache] Dados cacheados ({len(data)} registros)")
+    
+    async def get_stale(self) -> Tuple[List[Dict[str, Any]], datetime] | None:
+        data, timestamp = self._read()
+        if data is None or timestamp is None:
+            return None
+        return data, timestamp
+    
+    def snapshot_entries(self) -> List[SnapshotEntry]:
+        data, timestamp = self._read()
+        if data is None or timestamp is None:
+            return []
+        obtained_at = timestamp.replace(tzinfo=timezone.utc).timestamp()
+        return [(
+            self.KEY,
+            obtained_at + self.ttl_seconds,
+            obtained_at + self.STALE_SECONDS,
+            {"data": data, "timestamp": timestamp}
+        )]
+    
+    def restore_entries(self, entries: Iterable[SnapshotEntry]) -> int:
+        """Carrega o snapshot se ele for mais recente que os dados atuais"""
+        for key, _, _, value in entries:
+            if key != self.KEY:
+                continue
+            entry = decode_value(value)
+            _, timestamp = self._read()
+            if timestamp is None or entry["timestamp"] > timestamp:
+                self._write(entry["data"], entry["timestamp"])
+                return 1
+        return 0
+
+
+class PersistentQuotationCache(InMemoryQuotationCache):
+    """
+    Cache em memória com cópia no MongoDB (collection quotation_cache)
+    
+    A cópia persistida é carregada na primeira leitura após um restart, de
+    modo que o último dado válido sobrevive a deploys e continua disponível
+    para o fallback stale-if-error. Se a leitura falhar, ela é tentada de
+    novo a cada LOAD_RETRY_SECONDS.
+    """
+    
+    DOC_ID = "sugarcane"
+    LOAD_RETRY_SECONDS = 30.0
+    
+    def __init__(self):
+        super().__init__()
+        self._loaded = False
+        self._load_failed_at: Optional[float] = None
+    
+    async def _load(self):
+        if self._loaded:
+            return
+        if self._load_failed_at is not None and time.monotonic() - self._load_failed_at < self.LOAD_RETRY_SECONDS:
+            return
+        db = get_database()
+        if db is None:
+            return
+        try:
+            doc = await db.quotation_cache.find_one({"_id": self.DOC_ID})
+        except Exception as e:
+            self._load_failed_at = time.monotonic()
+            logger.warning(f"[QuotationCache] Erro ao carregar cópia persistida: {e}")
+            return
+        self._loaded = True
+        _, timestamp = self._read()
+        if doc and (timestamp is None or doc["timestamp"] > timestamp):
+            self._write(doc["data"], doc["timestamp"])
+            logger.info(f"[QuotationCache] Cópia persistida carregada ({doc['timestamp'].isoformat()})")
+    
+    async def get(self) -> List[Dict[str, Any]] | None:
+        await self._load()
+        return await super().get()
+    
+    async def set(self, data: List[Dict[str, Any]]) -> None:
+        await super().set(data)
+        db = get_database()
+        if db is None:
+            return
+        _, timestamp = self._read()
+        try:
+            await db.quotation_cache.replace_one(
+                {"_id": self.DOC_ID},
+                {"data": data, "timestamp": timestamp},
+                upsert=True
+            )
+        except Exception as e:
+            logger.warning(f"[QuotationCache] Erro ao persistir cache: {e}")
+    
+    async def get_stale(self) -> Tuple[List[Dict[str, Any]], datetime] | None:
+        await self._load()
+        return await super().get_stale()
+
+
+class SharedQuotationCache(PersistentQuotationCache):
+    """PersistentQuotationCache com os dados em memória compartilhada entre workers (app.core.shm)"""
+    
+    def __init__(self, table: SharedMemoryTable):
+        super().__init__()
+        self.table = table
+    
+    def _read(self) -> Tuple[List[Dict[str, Any]] | None, datetime | None]:
+        raw = self.table.get(self.KEY, allow_stale=True)
+        if raw is None:
+            return None, None
+        entry = decode_value(raw)
+        return entry["data"], entry["timestamp"]
+    
+    def _write(self, data: List[Dict[str, Any]], timestamp: datetime):
+        age = (datetime.utcnow() - timestamp).total_seconds()
+        stored = self.table.set(
+            self.KEY,
+            encode_value({"data": data, "timestamp": timestamp}),
+            ttl_seconds=max(0.0, self.ttl_seconds - age),
+            stale_seconds=self.STALE_SECONDS
+        )
+        if not stored:
+            logger.warning("[QuotationCache] Dados não couberam no slot compartilhado")
+
+
+class QuotationHistory:
+    """
+    Histórico de cotações no MongoDB (collection quotations, _id = data)
+    
+    Cada registro raspado é gravado com upsert. As médias móveis são
+    calculadas na gravação e armazenadas no próprio documento, então as
+    consultas por período só leem e agregam.
+    """
+    
+    # Janelas das médias móveis (em número de cotações)
+    MA_WINDOWS = (7, 30)
+    
+    @property
+    def collection(self):
+        db = get_database()
+        return db.quotations if db is not None else None
+    
+    @property
+    def available(self) -> bool:
+        return self.collection is not None
+    
+    async def known_dates(self, limit: int = 100) -> Set[str]:
+        """Datas (ISO) das cotações mais recentes já armazenadas"""
+        cursor = self.collection.find({}, {"data": 1}).sort("_id", -1).limit(limit)
+        return {doc["data"] async for doc in cursor}
+    
+    async def save(self, registros: List[Dict[str, Any]]) -> int:
+        """Grava os registros e recalcula as médias móveis a partir do mais antigo"""
+        if not registros:
+            return 0
+        
+        now = datetime.utcnow()
+        await self.collection.bulk_write([
+            UpdateOne(
+                {"_id": datetime.fromisoformat(r["data"])},
+                {"$set": {**r, "scraped_at": now}},
+                upsert=True
+            )
+            for r in registros
+        ], ordered=False)
+        
+        earliest = min(datetime.fromisoformat(r["data"]) for r in registros)
+        await self._update_moving_averages(earliest)
+        logger.info(f"[QuotationHistory] {len(registros)} cotações gravadas")
+        return len(registros)
+    
+    async def _update_moving_averages(self, since: datetime):
+        window = max(self.MA_WINDOWS)
+        previous = await (
+            self.collection.find({"_id": {"$lt": since}}, {"valor_campo": 1, "valor_esteira": 1})
+            .sort("_id", -1)
+            .limit(window - 1)
+            .to_list(length=window - 1)
+        )
+        affected = await (
+            self.collection.find({"_id": {"$gte": since}}, {"valor_campo": 1, "valor_esteira": 1})
+            .sort("_id", 1)
+            .to_list(length=None)
+        )
+        series = list(reversed(previous)) + affected
+        offset = len(previous)
+        
+        operations = []
+        for i, doc in enumerate(affected, start=offset):
+            fields = {}
+            for n in self.MA_WINDOWS:
+                window_docs = series[max(0, i - n + 1):i + 1]
+                for campo in ("campo", "esteira"):
+                    values = [d[f"valor_{campo}"] for d in window_docs if d.get(f"valor_{campo}") is not None]
+                    fields[f"mm{n}_{campo}"] = round(sum(values) / len(values), 2) if values else None
+            operations.append(UpdateOne({"_id": doc["_id"]}, {"$set": fields}))
+        
+        if operations:
+            await self.collection.bulk_write(operations, ordered=False)
+    
+    async def latest(self, limit: int = 10) -> List[Dict[str, Any]]:
+        cursor = (
+            self.collection.find({}, {"_id": 0, "data": 1, "data_formatada": 1, "valor_campo": 1, "valor_esteira": 1})
+            .sort("_id", -1)
+            .limit(limit)
+        )
+        return [doc async for doc in cursor]
+    
+    async def get_range(self, date_from: Optional[datetime], date_to: Optional[datetime]) -> Dict[str, Any]:
+        """Cotações do período (com médias móveis) e mínimo/máximo do período"""
+        query: Dict[str, Any] = {}
+        if date_from or date_to:
+            query["_id"] = {}
+            if date_from:
+                query["_id"]["$gte"] = date_from
+            if date_to:
+                query["_id"]["$lte"] = date_to
+        
+        registros = await (
+            self.collection.find(query, {"_id": 0, "scraped_at": 0})
+            .sort("_id", 1)
+            .to_list(length=None)
+        )
+        
+        resumo = None
+        async for doc in self.collection.aggregate([
+            {"$match": query},
+            {
+                "$group": {
+                    "_id": None,
+                    "campo_min": {"$min": "$valor_campo"},
+                    "campo_max": {"$max": "$valor_campo"},
+                    "campo_media": {"$avg": "$valor_campo"},
+                    "esteira_min": {"$min": "$valor_esteira"},
+                    "esteira_max": {"$max": "$valor_esteira"},
+                    "esteira_media": {"$avg": "$valor_esteira"},
+                    "total": {"$sum": 1},
+                }
+            },
+            {"$project": {"_id": 0}},
+        ]):
+            resumo = doc
+            for key in ("campo_media", "esteira_media"):
+                if resumo[key] is not None:
+                    resumo[key] = round(resumo[key], 2)
+        
+        return {"registros": registros, "resumo": resumo}
 
 
 class QuotationScraper:
     """Scraper para cotação de cana-de-açúcar"""
     
-    URL = "https://www.noticiasagricolas.com.br/cotacoes/sucroenergetico/acucar-preco-da-cana-basica-pr"
+    URL = f"{settings.NOTICIAS_AGRICOLAS_BASE_URL}/cotacoes/sucroenergetico/acucar-preco-da-cana-basica-pr"
     
     # Headers padrão (identifica como navegador legítimo)
     HEADERS = {
@@ -64,10 +363,14 @@ class QuotationScraper:
         "Accept-Language": "pt-BR,pt;q=0.9,en-US;q=0.8,en;q=0.7",
     }
     
-    async def scrape(self) -> List[Dict[str, Any]]:
+    async def scrape(self, known_dates: Optional[Set[str]] = None) -> List[Dict[str, Any]]:
         """
         Faz scraping da página de cotação
         
+        Com `known_dates`, o parse para no primeiro bloco cuja data já é
+        conhecida (a página lista as cotações da mais recente para a mais
+        antiga) e retorna apenas os registros novos.
+        
         Retorna lista de dicts com:
         - data: ISO timestamp
         - data_formatada: "dd/mm/aaaa"
@@ -79,32 +382,20 @@ class QuotationScraper:
             
             # Requisição HTTP
             async with httpx.AsyncClient(headers=self.HEADERS, timeout=30.0) as client:
-                response = await client.get(self.URL)
+                async def attempt(timeout: float) -> httpx.Response:
+                    with upstream_timer("noticiasagricolas") as call:
+                        response = await client.get(self.URL, timeout=timeout)
+                        call.status = response.status_code
+                    return response
+                
+                response = await noticiasagricolas_upstream.call(attempt)
                 response.raise_for_status()
                 html = response.text
             
             logger.info(f"[Scraper] Página obtida ({len(html)} bytes)")
             
-            # Parse HTML
-            soup = BeautifulSoup(html, "html.parser")
-            blocos = soup.find_all("div", class_="cotacao")
-            logger.info(f"[Scraper] Blocos encontrados: {len(blocos)}")
-            
-            registros = []
-            
-            for bloco in blocos:
-                try:
-                    registro = self._parse_bloco(bloco)
-                    if registro:
-                        registros.append(registro)
-                except Exception as e:
-                    logger.warning(f"[Scraper] Erro ao parsear bloco: {e}")
-                    continue
-            
-            logger.info(f"[Scraper] Registros válidos: {len(registros)}")
-            
-            # Retorna apenas os 10 mais recentes
-            return sorted(registros, key=lambda x: x['data'], reverse=True)[:10]
+            with span("parse"):
+                return self.parse_html(html, known_dates)
             
         except httpx.TimeoutException:
             logger.error("[Scraper] Timeout ao buscar página")
@@ -116,6 +407,41 @@ class QuotationScraper:
             logger.error(f"[Scraper] Erro desconhecido: {e}")
             raise
     
+    def parse_html(self, html: str, known_dates: Optional[Set[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Extrai os registros de cotação do HTML
+        
+        Só os div.cotacao são materializados (SoupStrainer), com lxml
+        quando disponível; o resto da página é descartado durante o parse.
+        """
+        soup = cotacao_soup(html)
+        blocos = soup.find_all("div", class_="cotacao")
+        logger.info(f"[Scraper] Blocos encontrados: {len(blocos)}")
+        
+        registros = []
+        
+        for bloco in blocos:
+            try:
+                registro = self._parse_bloco(bloco)
+                if registro:
+                    if known_dates and registro["data"] in known_dates:
+                        logger.info(f"[Scraper] Bloco já conhecido ({registro['data_formatada']}), parando")
+                        break
+                    registros.append(registro)
+            except Exception as e:
+                logger.warning(f"[Scraper] Erro ao parsear bloco: {e}")
+                continue
+        
+        logger.info(f"[Scraper] Registros válidos: {len(registros)}")
+        
+        return sorted(registros, key=lambda x: x['data'], reverse=True)
+    
+    @staticmethod
+    def _parse_data(data_str: str) -> datetime:
+        """"dd/mm/aaaa" -> datetime (mais rápido que strptime)"""
+        dia, mes, ano = data_str.split("/")
+        return datetime(int(ano), int(mes), int(dia))
+    
     def _parse_bloco(self, bloco) -> Dict[str, Any] | None:
         """Parse um bloco individual de cotação"""
         
@@ -135,7 +461,7 @@ class QuotationScraper:
         
         # Parse data
         try:
-            data_obj = datetime.strptime(data_str, "%d/%m/%Y")
+            data_obj = self._parse_data(data_str)
         except ValueError:
             logger.warning(f"Data inválida: {data_str}")
             return None
@@ -154,7 +480,7 @@ class QuotationScraper:
         valor_esteira = None
         
         for tr in linhas:
-            tds = tr.find_all("td")
+            tds = tr.find_all("td", limit=2)
             if len(tds) < 2:
                 continue
             
@@ -166,7 +492,7 @@ class QuotationScraper:
             
             try:
                 # Converte "129,50" para 129.5
-                valor_num = float(valor_str.replace(".", "").replace(",", "."))
+                valor_num = float(valor_str.translate(_DECIMAL_BR))
             except ValueError:
                 continue
             
@@ -187,35 +513,127 @@ class QuotationScraper:
         }
 
 
+def _default_cache() -> QuotationCache:
+    if settings.CACHE_BACKEND == "shared":
+        return SharedQuotationCache(
+            SharedMemoryTable(shared_cache_path("quotation", settings.SHARED_CACHE_DIR), slots=8, slot_size=65536)
+        )
+    return PersistentQuotationCache()
+
+
 class QuotationService:
-    """Serviço de cotação com cache"""
+    """
+    Serviço de cotação com cache
     
-    def __init__(self):
+    Refreshes concorrentes são coalescidos (single-flight): quando o cache
+    expira, apenas uma chamada faz scraping e as demais aguardam o mesmo
+    resultado. Se o scraping falhar, os últimos dados válidos são servidos
+    com a idade (stale-if-error), e novas tentativas esperam
+    QUOTATION_RETRY_AFTER_ERROR_SECONDS.
+    """
+    
+    def __init__(self, cache: Optional[QuotationCache] = None):
         self.scraper = QuotationScraper()
-        self.cache = InMemoryQuotationCache()
+        self.cache = cache or _default_cache()
+        self.history = QuotationHistory()
+        self._inflight: Optional[asyncio.Task] = None
+        self._failed_at: Optional[datetime] = None
     
     async def get_sugarcane_quotation(self) -> List[Dict[str, Any]]:
+        """Obtém cotação de cana (com cache); veja get_quotation_with_meta"""
+        data, _ = await self.get_quotation_with_meta()
+        return data
+    
+    async def get_quotation_with_meta(self) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
         """
-        Obtém cotação de cana (com cache)
+        Obtém cotação de cana e metadados (stale, age_seconds)
         
-        1. Verifica cache em memória
-        2. Se expirado/vazio, faz novo scraping
-        3. Armazena em cache
+        1. Verifica cache
+        2. Se expirado/vazio, faz novo scraping (coalescido entre chamadas)
+        3. Se o scraping falhar, usa os últimos dados válidos (stale)
         """
         
         # Tenta cache primeiro
         cached = await self.cache.get()
         if cached:
-            return cached
+            return cached, {"stale": False, "age_seconds": 0}
+        
+        retry_after = settings.QUOTATION_RETRY_AFTER_ERROR_SECONDS
+        recently_failed = (
+            self._failed_at is not None
+            and (datetime.utcnow() - self._failed_at).total_seconds() < retry_after
+        )
         
-        # Cache miss: faz scraping
+        try:
+            if recently_failed:
+                raise Exception("Fonte indisponível na última tentativa")
+            data = await self._refresh()
+            self._failed_at = None
+            return data, {"stale": False, "age_seconds": 0}
+        except Exception as e:
+            if not recently_failed:
+                self._failed_at = datetime.utcnow()
+            stale = await self.cache.get_stale()
+            if stale is None:
+                raise
+            data, timestamp = stale
+            age = (datetime.utcnow() - timestamp).total_seconds()
+            logger.warning(f"[QuotationService] Servindo dados antigos ({age:.0f}s): {e}")
+            return data, {"stale": True, "age_seconds": int(age)}
+    
+    async def _refresh(self) -> List[Dict[str, Any]]:
+        """Single-flight: chamadas concorrentes aguardam o mesmo scraping"""
+        if self._inflight is None or self._inflight.done():
+            self._inflight = asyncio.create_task(self._scrape_and_store())
+        # shield: o cancelamento de uma requisição não cancela o scraping das demais
+        return await asyncio.shield(self._inflight)
+    
+    async def _scrape_and_store(self) -> List[Dict[str, Any]]:
         logger.info("[QuotationService] Cache miss - iniciando scraping")
-        data = await self.scraper.scrape()
+        if not self.history.available:
+            data = (await self.scraper.scrape())[:10]
+        else:
+            data = await self._scrape_with_history()
         
         # Armazena no cache
         await self.cache.set(data)
         
         return data
+    
+    async def _scrape_with_history(self) -> List[Dict[str, Any]]:
+        """
+        Scraping incremental gravado no histórico
+        
+        Se o MongoDB falhar, a cotação raspada continua sendo servida: sem as
+        datas conhecidas, o scraping é completo; se a gravação falhar depois
+        de um scraping incremental, a página é raspada de novo por inteiro.
+        """
+        try:
+            known = await self.history.known_dates()
+        except PyMongoError as e:
+            logger.warning(f"[QuotationService] Histórico indisponível, scraping completo: {e}")
+            return (await self.scraper.scrape())[:10]
+        
+        novos = await self.scraper.scrape(known_dates=known)
+        try:
+            await self.history.save(novos)
+            return await self.history.latest(10)
+        except PyMongoError as e:
+            logger.warning(f"[QuotationService] Erro ao gravar histórico de cotações: {e}")
+        
+        if not known:
+            return novos[:10]
+        return (await self.scraper.scrape())[:10]
+    
+    async def get_history(
+        self,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None
+    ) -> Dict[str, Any]:
+        """Histórico armazenado no período (não faz scraping)"""
+        if not self.history.available:
+            raise Exception("Histórico de cotações indisponível")
+        return await self.history.get_range(date_from, date_to)
 
 
 # Instância global do serviço
@@ -0,0 +1,119 @@
+"""
+Buffer write-behind para reações dos insights
+
+Cliques em "útil"/"testei" não vão direto ao MongoDB: os incrementos são
+acumulados em memória por insight e gravados periodicamente (ou ao atingir
+um limite de tamanho) em um único bulk_write de $inc. Um insight popular
+passa a receber um update por intervalo em vez de um por clique.
+"""
+
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Dict, Optional
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from app.config import settings
+from app.database.mongodb import get_database
+
+logger = logging.getLogger(__name__)
+
+REACTION_TYPES = ("helpful", "tried")
+
+
+class ReactionBuffer:
+    """Acumula incrementos de reações e grava em lote"""
+
+    def __init__(self, flush_interval: float = 5.0, flush_threshold: int = 500):
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self._pending: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self._pending_count = 0
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._threshold_flush: Optional[asyncio.Task] = None
+
+    def add(self, insight_id: str, reaction: str, amount: int = 1) -> int:
+        """Registra um incremento; retorna o total pendente para o insight"""
+        self._pending[insight_id][reaction] += amount
+        self._pending_count += amount
+
+        if self._pending_count >= self.flush_threshold and (
+            self._threshold_flush is None or self._threshold_flush.done()
+        ):
+            self._threshold_flush = asyncio.create_task(self.flush())
+
+        return sum(self._pending[insight_id].values())
+
+    def pending_for(self, insight_id: str) -> Dict[str, int]:
+        """Incrementos ainda não gravados de um insight"""
+        return dict(self._pending.get(insight_id, {}))
+
+    async def flush(self) -> int:
+        """Grava os incrementos pendentes; retorna o número de insights atualizados"""
+        async with self._lock:
+            if not self._pending:
+                return 0
+
+            # Troca o buffer antes do await para não perder cliques concorrentes
+            batch, self._pending = self._pending, defaultdict(lambda: defaultdict(int))
+            batch_count, self._pending_count = self._pending_count, 0
+
+            operations = [
+                UpdateOne(
+                    {"_id": ObjectId(insight_id)},
+                    {"$inc": {f"reactions.{name}": n for name, n in counts.items()}}
+                )
+                for insight_id, counts in batch.items()
+            ]
+
+            try:
+                await get_database().insights.bulk_write(operations, ordered=False)
+            except Exception as e:
+                # Devolve os incrementos ao buffer (at-least-once)
+                for insight_id, counts in batch.items():
+                    for name, n in counts.items():
+                        self._pending[insight_id][name] += n
+                self._pending_count += batch_count
+                logger.error(f"[Reactions] Erro ao gravar reações: {e}")
+                raise
+
+            logger.info(f"[Reactions] Flush: {len(operations)} insights, {batch_count} reações")
+            return len(operations)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception:
+                pass  # já logado; tenta de novo no próximo intervalo
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"[Reactions] Flush periódico a cada {self.flush_interval}s")
+
+    async def stop(self):
+        """Para o loop periódico e grava o que restou"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        try:
+            await self.flush()
+        except Exception:
+            logger.error(f"[Reactions] {self._pending_count} reações não gravadas no shutdown")
+
+
+# Instância global
+reaction_buffer = ReactionBuffer(
+    flush_interval=settings.REACTIONS_FLUSH_INTERVAL_SECONDS,
+    flush_threshold=settings.REACTIONS_FLUSH_THRESHOLD,
+)
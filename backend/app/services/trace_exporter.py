@@ -0,0 +1,141 @@
+"""
+Exportação dos traces amostrados
+
+Os traces entram em um buffer em memória e são gravados em lote a cada
+`export_interval` segundos, em um dos destinos:
+
+- "file": uma linha JSON por trace (TRACING_FILE_PATH);
+- "otlp": POST em OTLP/HTTP JSON para um coletor (TRACING_OTLP_ENDPOINT),
+  por exemplo o OpenTelemetry Collector ou benchmarks/otlp_collector.py.
+"""
+
+import asyncio
+import json
+import logging
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from app.config import settings
+from app.core.tracing import Trace
+
+logger = logging.getLogger(__name__)
+
+# Descarta traces além deste limite se o destino estiver fora do ar
+MAX_BUFFERED_TRACES = 10000
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def to_otlp(traces: List[Trace], service_name: str) -> Dict[str, Any]:
+    """Converte traces para o payload OTLP/JSON (ExportTraceServiceRequest)"""
+    spans = []
+    for trace in traces:
+        for s in trace.spans:
+            otlp_span = {
+                "traceId": trace.trace_id,
+                "spanId": s["span_id"],
+                "name": s["name"],
+                "kind": 2 if s["parent_span_id"] == trace.parent_span_id else 1,  # SERVER / INTERNAL
+                "startTimeUnixNano": str(s["start_ns"]),
+                "endTimeUnixNano": str(s["end_ns"]),
+                "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in s["attributes"].items()],
+                "status": {"code": 2, "message": s["error"]} if s["error"] else {"code": 1},
+            }
+            if s["parent_span_id"]:
+                otlp_span["parentSpanId"] = s["parent_span_id"]
+            spans.append(otlp_span)
+
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": service_name}}]},
+            "scopeSpans": [{"scope": {"name": "app.core.tracing"}, "spans": spans}],
+        }]
+    }
+
+
+def to_json_line(trace: Trace) -> str:
+    return json.dumps({"trace_id": trace.trace_id, "spans": trace.spans}, default=str)
+
+
+class TraceExporter:
+    def __init__(self, exporter: str, file_path: str, otlp_endpoint: str, export_interval: float, service_name: str):
+        self.exporter = exporter
+        self.file_path = file_path
+        self.otlp_endpoint = otlp_endpoint
+        self.export_interval = export_interval
+        self.service_name = service_name
+        self._buffer: List[Trace] = []
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter in ("file", "otlp")
+
+    def submit(self, trace: Trace):
+        if not self.enabled:
+            return
+        if len(self._buffer) >= MAX_BUFFERED_TRACES:
+            self._buffer.pop(0)
+        self._buffer.append(trace)
+
+    def _write_file(self, lines: List[str]):
+        with open(self.file_path, "a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+    async def flush(self) -> int:
+        if not self._buffer:
+            return 0
+        batch, self._buffer = self._buffer, []
+
+        try:
+            if self.exporter == "file":
+                await asyncio.to_thread(self._write_file, [to_json_line(t) for t in batch])
+            else:
+                async with httpx.AsyncClient(timeout=5.0) as client:
+                    response = await client.post(self.otlp_endpoint, json=to_otlp(batch, self.service_name))
+                    response.raise_for_status()
+        except Exception as e:
+            logger.warning(f"[Tracing] Falha ao exportar {len(batch)} traces: {e}")
+            return 0
+
+        logger.debug(f"[Tracing] {len(batch)} traces exportados ({self.exporter})")
+        return len(batch)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.export_interval)
+            await self.flush()
+
+    def start(self):
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"[Tracing] Exportando traces amostrados via {self.exporter} a cada {self.export_interval}s")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+# Instância global
+trace_exporter = TraceExporter(
+    exporter=settings.TRACING_EXPORTER,
+    file_path=settings.TRACING_FILE_PATH,
+    otlp_endpoint=settings.TRACING_OTLP_ENDPOINT,
+    export_interval=settings.TRACING_EXPORT_INTERVAL_SECONDS,
+    service_name=settings.TRACING_SERVICE_NAME,
+)
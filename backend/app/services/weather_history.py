@@ -0,0 +1,225 @@
+"""
+Histórico de observações climáticas (collection time-series)
+
+Cada condição atual obtida da Open-Meteo é registrada em memória e gravada
+em lote, fora do caminho da requisição, na collection time-series
+`weather_observations`. O metaField é a célula de ~1km (mesma grade do
+WeatherCache), e as consultas de histórico leem apenas desta collection.
+
+A mesma observação (célula, horário) pode ser obtida várias vezes: em
+flushes diferentes e pelas duas réplicas. Collections time-series não
+aceitam índice único nem upsert, então cada processo lembra as
+observações que já gravou e as consultas descartam as repetidas (por
+célula e horário) antes de agregar.
+"""
+
+import asyncio
+import logging
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from app.config import settings
+from app.core.geo import snap_to_cell
+from app.database.mongodb import get_database
+
+logger = logging.getLogger(__name__)
+
+COLLECTION = "weather_observations"
+
+# Fuso usado para fechar os dias nas agregações diárias
+HISTORY_TIMEZONE = "America/Sao_Paulo"
+
+# Observações já gravadas lembradas por processo (para não regravar)
+WRITTEN_KEYS_MAX = 10000
+
+# Uma observação por horário: descarta as repetidas antes de agregar
+DEDUP_STAGES = [
+    {"$group": {"_id": "$timestamp", "doc": {"$first": "$$ROOT"}}},
+    {"$replaceRoot": {"newRoot": "$doc"}},
+]
+
+
+def cell_for(lat: float, lon: float) -> Dict[str, Any]:
+    cell_lat, cell_lon = snap_to_cell(lat, lon)
+    return {"key": f"{cell_lat}:{cell_lon}", "lat": cell_lat, "lon": cell_lon}
+
+
+class WeatherObservationRecorder:
+    """Acumula observações e grava com insert_many periodicamente"""
+
+    def __init__(self, flush_interval: float = 30.0, batch_size: int = 200):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._pending: Dict[tuple, Dict[str, Any]] = {}
+        self._written: "OrderedDict[tuple, None]" = OrderedDict()
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._size_flush: Optional[asyncio.Task] = None
+
+    def record(self, lat: float, lon: float, raw_data: Dict[str, Any]):
+        """Registra a condição atual de uma resposta da Open-Meteo"""
+        current = raw_data.get("current") or {}
+        if "time" not in current:
+            return
+
+        # Open-Meteo devolve "time" no fuso local; converte para UTC
+        offset = timedelta(seconds=raw_data.get("utc_offset_seconds", 0))
+        try:
+            timestamp = datetime.fromisoformat(current["time"]) - offset
+        except (TypeError, ValueError):
+            logger.warning(f"[WeatherHistory] Horário inválido: {current.get('time')}")
+            return
+        cell = cell_for(lat, lon)
+        key = (cell["key"], timestamp)
+        if key in self._written:
+            return
+
+        # Mesma célula e mesmo horário só geram uma observação
+        self._pending[key] = {
+            "timestamp": timestamp,
+            "cell": cell,
+            "temperature": current.get("temperature_2m"),
+            "humidity": current.get("relative_humidity_2m"),
+            "precipitation": current.get("precipitation"),
+            "wind_speed": current.get("wind_speed_10m"),
+            "wind_direction": current.get("wind_direction_10m"),
+            "pressure": current.get("pressure_msl"),
+            "cloud_cover": current.get("cloud_cover"),
+            "weather_code": current.get("weather_code"),
+        }
+
+        if len(self._pending) >= self.batch_size and (
+            self._size_flush is None or self._size_flush.done()
+        ):
+            self._size_flush = asyncio.create_task(self.flush())
+
+    async def flush(self) -> int:
+        async with self._lock:
+            if not self._pending:
+                return 0
+
+            pending = self._pending
+            batch = list(pending.values())
+            self._pending = {}
+
+            try:
+                await get_database()[COLLECTION].insert_many(batch, ordered=False)
+            except Exception as e:
+                logger.error(f"[WeatherHistory] Erro ao gravar {len(batch)} observações: {e}")
+                return 0
+
+            for key in pending:
+                self._written[key] = None
+            while len(self._written) > WRITTEN_KEYS_MAX:
+                self._written.popitem(last=False)
+
+            logger.info(f"[WeatherHistory] {len(batch)} observações gravadas")
+            return len(batch)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+class WeatherHistoryService:
+    """Consultas sobre as observações armazenadas"""
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.collection = db[COLLECTION]
+
+    async def get_observations(
+        self,
+        lat: float,
+        lon: float,
+        date_from: datetime,
+        date_to: datetime,
+        limit: int = 1000
+    ) -> List[Dict[str, Any]]:
+        """Observações da célula no intervalo, em ordem cronológica"""
+        pipeline = [
+            {
+                "$match": {
+                    "cell.key": cell_for(lat, lon)["key"],
+                    "timestamp": {"$gte": date_from, "$lte": date_to},
+                }
+            },
+            *DEDUP_STAGES,
+            {"$sort": {"timestamp": 1}},
+            {"$limit": limit},
+            {"$project": {"_id": 0, "cell": 0}},
+        ]
+        return [doc async for doc in self.collection.aggregate(pipeline)]
+
+    async def get_daily_summary(
+        self,
+        lat: float,
+        lon: float,
+        date_from: datetime,
+        date_to: datetime
+    ) -> List[Dict[str, Any]]:
+        """Mínima/máxima/média de temperatura e chuva acumulada por dia"""
+        pipeline = [
+            {
+                "$match": {
+                    "cell.key": cell_for(lat, lon)["key"],
+                    "timestamp": {"$gte": date_from, "$lte": date_to},
+                }
+            },
+            *DEDUP_STAGES,
+            {
+                "$group": {
+                    "_id": {
+                        "$dateTrunc": {
+                            "date": "$timestamp",
+                            "unit": "day",
+                            "timezone": HISTORY_TIMEZONE,
+                        }
+                    },
+                    "temp_min": {"$min": "$temperature"},
+                    "temp_max": {"$max": "$temperature"},
+                    "temp_avg": {"$avg": "$temperature"},
+                    "humidity_avg": {"$avg": "$humidity"},
+                    "precipitation_total": {"$sum": "$precipitation"},
+                    "samples": {"$sum": 1},
+                }
+            },
+            {"$sort": {"_id": 1}},
+        ]
+
+        days = []
+        async for doc in self.collection.aggregate(pipeline):
+            days.append({
+                "date": doc["_id"].isoformat(),
+                "temp_min": doc["temp_min"],
+                "temp_max": doc["temp_max"],
+                "temp_avg": round(doc["temp_avg"], 1) if doc["temp_avg"] is not None else None,
+                "humidity_avg": round(doc["humidity_avg"], 1) if doc["humidity_avg"] is not None else None,
+                "precipitation_total": round(doc["precipitation_total"], 1),
+                "samples": doc["samples"],
+            })
+        return days
+
+
+# Instância global
+weather_recorder = WeatherObservationRecorder(
+    flush_interval=settings.WEATHER_HISTORY_FLUSH_SECONDS,
+    batch_size=settings.WEATHER_HISTORY_BATCH_SIZE,
+)
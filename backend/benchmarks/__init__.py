@@ -0,0 +1,8 @@
+"""
+Benchmarks do backend
+
+Scripts executados manualmente (não fazem parte da suíte de testes).
+Rodar a partir de backend/, por exemplo:
+
+    python -m benchmarks.bench_bulk_insert
+"""
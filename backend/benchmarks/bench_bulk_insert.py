@@ -0,0 +1,104 @@
+"""
+Benchmark: inserção de insights um a um vs. endpoint de lote
+
+Compara o caminho atual (um insert_one por insight) com
+InsightsService.create_insights_bulk (insert_many em chunks, ordered=False)
+contra um mongod local. Usa um banco descartável, removido ao final.
+
+Uso (a partir de backend/):
+
+    python -m benchmarks.bench_bulk_insert --count 5000 --chunk-size 500
+    BENCH_MONGODB_URL=mongodb://localhost:27017 python -m benchmarks.bench_bulk_insert
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import time
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app.services.insights_service import InsightsService
+
+BENCH_DB_NAME = "sugarcane_bench"
+
+CITIES = [
+    ("Ribeirão Preto", -21.1704, -47.8103),
+    ("Piracicaba", -22.7253, -47.6492),
+    ("Sertãozinho", -21.1378, -47.9903),
+    ("Jaú", -22.2936, -48.5592),
+    ("Araçatuba", -21.2089, -50.4328),
+]
+
+TAGS = ["manejo", "irrigação", "pragas", "colheita", "solo", "ferrugem", "broca"]
+
+
+def make_insight(i: int) -> dict:
+    name, lat, lon = random.choice(CITIES)
+    return {
+        "author": {"name": f"Produtor {i}", "role": "Produtor"},
+        "location": {
+            "name": name,
+            "lat": lat + random.uniform(-0.2, 0.2),
+            "lon": lon + random.uniform(-0.2, 0.2),
+        },
+        "weather_snapshot": {
+            "temperature": random.uniform(15, 35),
+            "humidity": random.uniform(40, 95),
+            "precipitation": random.uniform(0, 20),
+            "condition": "Parcialmente nublado",
+        },
+        "content": f"Observação de campo número {i} sobre o canavial.",
+        "tags": random.sample(TAGS, 2),
+    }
+
+
+async def bench_insert_one(service: InsightsService, items: list) -> float:
+    start = time.perf_counter()
+    for item in items:
+        await service.create_insight(dict(item, location=dict(item["location"])))
+    return time.perf_counter() - start
+
+
+async def bench_bulk(service: InsightsService, items: list, chunk_size: int) -> float:
+    start = time.perf_counter()
+    result = await service.create_insights_bulk(items, chunk_size=chunk_size)
+    elapsed = time.perf_counter() - start
+    assert result["failed"] == 0, result
+    return elapsed
+
+
+async def main(count: int, chunk_size: int, mongodb_url: str):
+    client = AsyncIOMotorClient(mongodb_url)
+    db = client[BENCH_DB_NAME]
+    await db.insights.drop()
+    await db.insights.create_index([("location.coordinates", "2dsphere")])
+    service = InsightsService(db)
+
+    items = [make_insight(i) for i in range(count)]
+
+    try:
+        one_by_one = await bench_insert_one(service, items)
+        await db.insights.delete_many({})
+        bulk = await bench_bulk(service, items, chunk_size)
+    finally:
+        await client.drop_database(BENCH_DB_NAME)
+        client.close()
+
+    print(f"Documentos:          {count}")
+    print(f"insert_one (loop):   {one_by_one:.3f}s  ({count / one_by_one:,.0f} docs/s)")
+    print(f"insert_many (chunk={chunk_size}): {bulk:.3f}s  ({count / bulk:,.0f} docs/s)")
+    print(f"Ganho:               {one_by_one / bulk:.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--count", type=int, default=5000)
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument(
+        "--mongodb-url",
+        default=os.getenv("BENCH_MONGODB_URL", "mongodb://localhost:27017"),
+    )
+    args = parser.parse_args()
+    asyncio.run(main(args.count, args.chunk_size, args.mongodb_url))
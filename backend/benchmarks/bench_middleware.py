@@ -0,0 +1,127 @@
+"""
+Benchmark: middleware de erro via BaseHTTPMiddleware vs. pilha ASGI pura
+
+Monta dois apps com as mesmas rotas (/health e /api/v1/weather):
+
+- original: `app.middleware("http")(error_handler_middleware)`, como antes;
+- atual: ErrorHandlerMiddleware + RequestContextMiddleware (ASGI puro).
+
+As requisições vão direto ao app via httpx.ASGITransport (sem rede), com
+`--concurrency` clientes simultâneos. /health usa um banco falso que
+responde ao ping; /weather é servido do WeatherCache pré-populado, então o
+que se mede é o custo do framework e dos middlewares.
+
+Uso (a partir de backend/):
+
+    python -m benchmarks.bench_middleware
+    python -m benchmarks.bench_middleware --requests 20000 --concurrency 64
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import datetime
+
+import httpx
+from fastapi import FastAPI, Request, status
+from fastapi.responses import JSONResponse
+
+from app.api.middlewares.error_handler import ErrorHandlerMiddleware
+from app.api.middlewares.request_context import RequestContextMiddleware
+from app.api.routes import health, weather
+from app.core.cache import weather_cache
+from app.database.mongodb import get_database
+
+LAT, LON = -21.17, -47.81
+WEATHER_PATH = f"/api/v1/weather?lat={LAT}&lon={LON}&location_name=Ribeirao"
+
+
+async def legacy_error_handler(request: Request, call_next):
+    """Middleware original (function-style, sobre BaseHTTPMiddleware)"""
+    try:
+        return await call_next(request)
+    except Exception as e:
+        return JSONResponse(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            content={
+                "error": {
+                    "code": "INTERNAL_SERVER_ERROR",
+                    "message": "Erro interno do servidor",
+                    "details": str(e),
+                    "timestamp": datetime.utcnow().isoformat()
+                }
+            }
+        )
+
+
+class FakeDatabase:
+    async def command(self, name):
+        return {"ok": 1}
+
+
+def build_app(pure_asgi: bool) -> FastAPI:
+    app = FastAPI()
+    if pure_asgi:
+        app.add_middleware(ErrorHandlerMiddleware)
+        app.add_middleware(RequestContextMiddleware)
+    else:
+        app.middleware("http")(legacy_error_handler)
+    app.include_router(health.router)
+    app.include_router(weather.router, prefix="/api/v1")
+    app.dependency_overrides[get_database] = lambda: FakeDatabase()
+    return app
+
+
+async def run_load(app: FastAPI, path: str, total: int, concurrency: int) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    latencies = []
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # Aquecimento
+        for _ in range(50):
+            (await client.get(path)).raise_for_status()
+
+        remaining = total
+
+        async def worker():
+            nonlocal remaining
+            while remaining > 0:
+                remaining -= 1
+                start = time.perf_counter()
+                response = await client.get(path)
+                latencies.append((time.perf_counter() - start) * 1000)
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies),
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1],
+    }
+
+
+async def main(total: int, concurrency: int):
+    import logging
+    logging.disable(logging.WARNING)
+
+    weather_cache.set(LAT, LON, {"location": {"name": "Ribeirao"}, "cached": False})
+
+    for name, path in (("/health", "/health"), ("/weather (cache)", WEATHER_PATH)):
+        legacy = await run_load(build_app(pure_asgi=False), path, total, concurrency)
+        current = await run_load(build_app(pure_asgi=True), path, total, concurrency)
+        print(f"\n{name}: {total} requisições, {concurrency} concorrentes")
+        print(f"  original (BaseHTTPMiddleware): {legacy['rps']:8.0f} req/s  p50 {legacy['p50_ms']:6.2f} ms  p99 {legacy['p99_ms']:6.2f} ms")
+        print(f"  atual (ASGI puro):             {current['rps']:8.0f} req/s  p50 {current['p50_ms']:6.2f} ms  p99 {current['p99_ms']:6.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency))
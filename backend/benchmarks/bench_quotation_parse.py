@@ -0,0 +1,150 @@
+"""
+Benchmark: parse do HTML de cotação (implementação original vs. atual)
+
+Compara o tempo de parse e o pico de memória (tracemalloc) de:
+
+- original: BeautifulSoup com html.parser sobre a página inteira +
+  strptime / replace para datas e valores;
+- atual: QuotationScraper.parse_html (SoupStrainer só nos div.cotacao,
+  lxml quando instalado, parse numérico e de data no loop).
+
+Sem argumentos, usa as páginas salvas em benchmarks/fixtures/*.html; se não
+houver nenhuma, gera uma página sintética no formato da noticiasagricolas
+(blocos div.cotacao em meio a menus, scripts e notícias).
+
+Uso (a partir de backend/):
+
+    python -m benchmarks.bench_quotation_parse
+    python -m benchmarks.bench_quotation_parse --html pagina_salva.html --runs 50
+"""
+
+import argparse
+import glob
+import os
+import random
+import statistics
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+
+from bs4 import BeautifulSoup
+
+from app.services.quotation import HTML_PARSER, QuotationScraper
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def synthetic_page(blocks: int = 120, noise: int = 400) -> str:
+    """Página no formato da fonte, com ruído ao redor dos blocos"""
+    parts = ["<html><head><title>Cotações</title>"]
+    parts += [f"<script>var x{i} = {i};</script>" for i in range(40)]
+    parts.append("</head><body><nav><ul>")
+    parts += [f'<li><a href="/menu/{i}">Menu {i}</a></li>' for i in range(noise // 4)]
+    parts.append("</ul></nav><main>")
+    day = date(2025, 11, 28)
+    for i in range(blocks):
+        campo = random.uniform(100, 160)
+        parts.append(
+            '<div class="cotacao"><div class="info">'
+            f'<div class="fechamento">Fechamento: {day:%d/%m/%Y}</div></div>'
+            '<table class="cot-fisicas"><thead><tr><th>Tipo</th><th>R$/t</th></tr></thead><tbody>'
+            f'<tr><td>Cana Campo</td><td>{campo:,.2f}</td></tr>'.replace(",", "X").replace(".", ",").replace("X", ".")
+            + f'<tr><td>Cana Esteira</td><td>{campo * 1.1:.2f}</td></tr>'.replace(".", ",")
+            + "</tbody></table></div>"
+        )
+        day -= timedelta(days=1)
+        parts += [
+            f'<article class="noticia"><h3>Notícia {i}-{j}</h3><p>{"texto " * 30}</p></article>'
+            for j in range(noise // blocks)
+        ]
+    parts.append("</main><footer>" + "<p>rodapé</p>" * 50 + "</footer></body></html>")
+    return "".join(parts)
+
+
+def legacy_parse(html: str) -> list:
+    """Cópia da implementação original (html.parser na página inteira)"""
+    soup = BeautifulSoup(html, "html.parser")
+    registros = []
+    for bloco in soup.find_all("div", class_="cotacao"):
+        info = bloco.find("div", class_="info")
+        fechamento_div = info.find("div", class_="fechamento") if info else None
+        if not fechamento_div:
+            continue
+        data_str = fechamento_div.get_text(strip=True).replace("Fechamento: ", "")
+        try:
+            data_obj = datetime.strptime(data_str, "%d/%m/%Y")
+        except ValueError:
+            continue
+        tabela = bloco.find("table", class_="cot-fisicas")
+        if not tabela or not tabela.find("tbody"):
+            continue
+        valores = {}
+        for tr in tabela.find("tbody").find_all("tr"):
+            tds = tr.find_all("td")
+            if len(tds) < 2:
+                continue
+            tipo = tds[0].get_text(strip=True).lower()
+            valor_str = tds[1].get_text(strip=True)
+            try:
+                valor = float(valor_str.replace(".", "").replace(",", "."))
+            except ValueError:
+                continue
+            if "campo" in tipo:
+                valores["valor_campo"] = valor
+            elif "esteira" in tipo:
+                valores["valor_esteira"] = valor
+        if valores:
+            registros.append({
+                "data": data_obj.isoformat(),
+                "data_formatada": data_str,
+                "valor_campo": valores.get("valor_campo"),
+                "valor_esteira": valores.get("valor_esteira"),
+            })
+    return sorted(registros, key=lambda x: x["data"], reverse=True)
+
+
+def measure(fn, html: str, runs: int) -> dict:
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn(html)
+        times.append((time.perf_counter() - start) * 1000)
+
+    tracemalloc.start()
+    fn(html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {"median_ms": statistics.median(times), "peak_kib": peak / 1024}
+
+
+def main(paths: list, runs: int):
+    import logging
+    logging.disable(logging.INFO)
+
+    pages = [(os.path.basename(p), open(p, encoding="utf-8").read()) for p in paths]
+    if not pages:
+        random.seed(42)
+        pages = [("sintética", synthetic_page())]
+
+    scraper = QuotationScraper()
+    print(f"Parser atual: {HTML_PARSER}")
+    for name, html in pages:
+        assert legacy_parse(html) == scraper.parse_html(html), f"resultados divergentes em {name}"
+        legacy = measure(legacy_parse, html, runs)
+        current = measure(scraper.parse_html, html, runs)
+        print(f"\n{name} ({len(html) / 1024:.0f} KiB)")
+        print(f"  original: {legacy['median_ms']:8.2f} ms  pico {legacy['peak_kib']:9.0f} KiB")
+        print(f"  atual:    {current['median_ms']:8.2f} ms  pico {current['peak_kib']:9.0f} KiB")
+        print(
+            f"  ganho:    {legacy['median_ms'] / current['median_ms']:8.1f}x tempo, "
+            f"{legacy['peak_kib'] / current['peak_kib']:.1f}x memória"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--html", nargs="*", help="arquivos HTML salvos da fonte")
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+    main(args.html or sorted(glob.glob(os.path.join(FIXTURES_DIR, "*.html"))), args.runs)
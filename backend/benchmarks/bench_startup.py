@@ -0,0 +1,152 @@
+"""
+Benchmark: tempo de startup da réplica
+
+Três medidas, cada uma em processos novos:
+
+1. import-time profile: `python -X importtime -c "import app.main"`, com o
+   tempo total e os pacotes de topo mais caros (cumulativo);
+2. módulos adiados: confirma que bs4, lxml e geopy não são importados
+   junto com o app (app.core.lazy);
+3. tempo até servir: sobe `uvicorn app.main:app` e mede quanto tempo leva
+   até /livez responder 200 e até /readyz responder 200 (este depende do
+   MongoDB em MONGODB_URL; sem banco, é reportado como não pronto).
+
+Uso (a partir de backend/):
+
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --runs 10 --top 20
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+LAZY_MODULES = ("bs4", "lxml", "geopy")
+
+
+def import_profile() -> Tuple[float, Dict[str, float]]:
+    """Roda um import do app com -X importtime; retorna (total ms, ms cumulativo por pacote de topo)"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+    )
+    total = 0.0
+    packages: Dict[str, float] = defaultdict(float)
+    # A saída é pós-ordem: os imports feitos por app.main (um nível de
+    # indentação abaixo) aparecem antes da linha do próprio app.main
+    children: List[Tuple[str, float]] = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or line.count("|") != 2:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue  # cabeçalho
+        depth = len(name) - len(name.lstrip())
+        name = name.strip()
+        ms = int(cumulative) / 1000
+        if depth == 1:
+            if name == "app.main":
+                total = ms
+                for child, child_ms in children:
+                    packages[child.split(".")[0] if not child.startswith("app.") else child] += child_ms
+            children = []
+        elif depth == 3:
+            children.append((name, ms))
+    return total, packages
+
+
+def loaded_lazy_modules() -> List[str]:
+    code = f"import sys, app.main; print(','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+    out = subprocess.run(
+        [sys.executable, "-c", code], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+    ).stdout.strip()
+    return [m for m in out.split(",") if m]
+
+
+def time_to_serve(port: int, timeout: float) -> Tuple[Optional[float], Optional[float]]:
+    """Segundos até /livez e /readyz responderem 200 (None se não responderam)"""
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+         "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=os.environ.copy(),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    started = time.perf_counter()
+    live = ready = None
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=1.0) as client:
+            while time.perf_counter() - started < timeout and ready is None:
+                if process.poll() is not None:
+                    break
+                for path in ("/livez", "/readyz"):
+                    try:
+                        ok = client.get(path).status_code == 200
+                    except httpx.HTTPError:
+                        ok = False
+                    if ok and path == "/livez" and live is None:
+                        live = time.perf_counter() - started
+                    if ok and path == "/readyz":
+                        ready = time.perf_counter() - started
+                time.sleep(0.02)
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+    return live, ready
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de startup")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=12)
+    parser.add_argument("--port", type=int, default=8190)
+    parser.add_argument("--ready-timeout", type=float, default=30.0)
+    args = parser.parse_args()
+
+    totals = []
+    per_package: Dict[str, List[float]] = defaultdict(list)
+    for _ in range(args.runs):
+        total, packages = import_profile()
+        totals.append(total)
+        for name, ms in packages.items():
+            per_package[name].append(ms)
+
+    print(f"import app.main: mediana {statistics.median(totals):.0f}ms "
+          f"(min {min(totals):.0f}ms, {args.runs} execuções)")
+    ranking = sorted(per_package.items(), key=lambda item: statistics.median(item[1]), reverse=True)
+    for name, values in ranking[:args.top]:
+        print(f"  {name:<36} {statistics.median(values):>7.1f}ms")
+
+    loaded = loaded_lazy_modules()
+    print(f"\nMódulos adiados carregados no import: {', '.join(loaded) if loaded else 'nenhum'}")
+
+    lives, readies = [], []
+    for _ in range(args.runs):
+        live, ready = time_to_serve(args.port, args.ready_timeout)
+        if live is not None:
+            lives.append(live)
+        if ready is not None:
+            readies.append(ready)
+
+    def describe(values: List[float]) -> str:
+        if not values:
+            return "não respondeu"
+        return f"mediana {statistics.median(values) * 1000:.0f}ms ({len(values)}/{args.runs})"
+
+    print(f"\nAté /livez 200:  {describe(lives)}")
+    print(f"Até /readyz 200: {describe(readies)}")
+
+
+if __name__ == "__main__":
+    main()
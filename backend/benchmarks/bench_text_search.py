@@ -0,0 +1,110 @@
+"""
+Benchmark: latência da busca textual conforme a collection cresce
+
+Popula um banco descartável em etapas (por padrão 10k, 100k e 1M insights),
+cria o índice text em português e mede p50/p95 de
+InsightsService.search_insights para termos comuns e raros. A latência
+deve acompanhar o número de documentos que casam com a busca, não o
+tamanho da collection.
+
+Uso (a partir de backend/):
+
+    python -m benchmarks.bench_text_search
+    python -m benchmarks.bench_text_search --sizes 10000 100000 --queries 50
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app.services.insights_service import InsightsService
+from benchmarks.bench_bulk_insert import make_insight
+
+BENCH_DB_NAME = "sugarcane_bench_search"
+
+FILLER = [
+    "Chuva regular na última semana e canavial com bom desenvolvimento.",
+    "Aplicamos adubação de cobertura após a colheita mecanizada.",
+    "Solo seco, aguardando previsão de chuva para o plantio.",
+    "Temperatura alta e vento forte durante a tarde.",
+]
+
+# Termos raros são inseridos em ~0,1% dos documentos
+RARE_PHRASES = [
+    "Foco de ferrugem alaranjada nas folhas do talhão 3.",
+    "Ataque de broca-da-cana identificado na bordadura.",
+    "Testamos irrigação por gotejamento subterrâneo neste ciclo.",
+]
+
+QUERIES = ["ferrugem", "broca", "irrigação por gotejamento", "chuva"]
+
+
+def make_document(service: InsightsService, i: int) -> dict:
+    item = make_insight(i)
+    if random.random() < 0.001:
+        item["content"] = random.choice(RARE_PHRASES)
+    else:
+        item["content"] = random.choice(FILLER)
+    return service._prepare_document(item)
+
+
+async def grow_to(service: InsightsService, current: int, target: int, batch: int = 5000):
+    for start in range(current, target, batch):
+        docs = [make_document(service, i) for i in range(start, min(start + batch, target))]
+        await service.collection.insert_many(docs, ordered=False)
+
+
+async def measure(service: InsightsService, query: str, runs: int) -> dict:
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        await service.search_insights(query, limit=20)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "p50": statistics.median(samples),
+        "p95": samples[int(len(samples) * 0.95) - 1],
+    }
+
+
+async def main(sizes: list, runs: int, mongodb_url: str):
+    client = AsyncIOMotorClient(mongodb_url)
+    db = client[BENCH_DB_NAME]
+    await db.insights.drop()
+    await db.insights.create_index(
+        [("content", "text"), ("tags", "text"), ("location.name", "text")],
+        weights={"content": 10, "tags": 5, "location.name": 3},
+        default_language="portuguese",
+        name="insights_text_pt",
+    )
+    service = InsightsService(db)
+
+    try:
+        current = 0
+        print(f"{'docs':>10}  {'query':<28} {'p50 (ms)':>9} {'p95 (ms)':>9}")
+        for size in sorted(sizes):
+            await grow_to(service, current, size)
+            current = size
+            for query in QUERIES:
+                result = await measure(service, query, runs)
+                print(f"{size:>10}  {query:<28} {result['p50']:>9.2f} {result['p95']:>9.2f}")
+    finally:
+        await client.drop_database(BENCH_DB_NAME)
+        client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--queries", type=int, default=30, help="execuções por termo")
+    parser.add_argument(
+        "--mongodb-url",
+        default=os.getenv("BENCH_MONGODB_URL", "mongodb://localhost:27017"),
+    )
+    args = parser.parse_args()
+    asyncio.run(main(args.sizes, args.queries, args.mongodb_url))
@@ -0,0 +1,374 @@
+"""
+Teste de carga de ponta a ponta contra stubs locais dos serviços externos
+
+Sobe os stubs (benchmarks.stubs) e, para cada cenário, um processo novo do
+app real (`uvicorn app.main:app`) apontado para eles pelas variáveis
+*_BASE_URL, e dispara requisições concorrentes com httpx:
+
+- cold:          coordenadas únicas, todo /weather vai ao Open-Meteo;
+- warm:          poucas coordenadas "quentes" já em cache, mais um mix de
+                 /locations/search, /news e /quotation;
+- expiry_storm:  aquece o cache, espera o TTL vencer e dispara uma rajada
+                 sobre as mesmas chaves (mede o efeito manada nos upstreams);
+- outage:        aquece, espera o TTL vencer e derruba os upstreams
+                 (error_rate=1); mede quantas respostas saem stale/503;
+- restart:       aquece, reinicia o app (snapshot dos caches no shutdown,
+                 restaurado no startup) e dispara a carga sobre as mesmas
+                 chaves: com o warm restart, quase nada vai aos upstreams.
+
+Para cada cenário reporta req/s, p50/p95/p99/max, status HTTP, respostas
+stale e o número de chamadas a cada upstream. O resultado vai para
+benchmarks/results/load-<commit>-<timestamp>.json; `--compare` mostra a
+diferença para um resultado anterior.
+
+O app precisa de um MongoDB acessível (MONGODB_URL, ex.: `docker compose
+up -d mongodb`), pois o startup falha sem banco.
+
+Uso (a partir de backend/):
+
+    python -m benchmarks.load_test
+    python -m benchmarks.load_test --scenarios warm,outage --requests 5000 --concurrency 64
+    python -m benchmarks.load_test --latency-ms 150 --compare benchmarks/results/load-abc1234-....json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import httpx
+
+from benchmarks.stubs import StubServer, StubState
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+# TTL curto do cache de clima nos cenários que dependem de expiração
+SHORT_TTL_MINUTES = 0.05  # 3s
+
+HOT_COORDS = [(-21.17 - i * 0.37, -47.81 + i * 0.29) for i in range(20)]
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+# ----------------------------------------------------------------------
+# Mix de requisições
+# ----------------------------------------------------------------------
+
+def weather_path(lat: float, lon: float) -> str:
+    return f"/api/v1/weather?lat={lat:.4f}&lon={lon:.4f}&location_name=Carga"
+
+
+def cold_paths() -> Callable[[int], str]:
+    # Passo de 0.01°: o WeatherCache arredonda as coordenadas em 2 casas
+    return lambda i: weather_path(-30 + (i % 3000) * 0.01, -55 + (i // 3000) * 0.01)
+
+
+def warm_paths() -> Callable[[int], str]:
+    rng = random.Random(42)
+    mix = (
+        [lambda: weather_path(*rng.choice(HOT_COORDS))] * 7
+        + [lambda: f"/api/v1/locations/search?q={rng.choice(['ribeirao', 'piracicaba', 'sertaozinho'])}"]
+        + [lambda: "/api/v1/news?category=AGRIBUSINESS"]
+        + [lambda: "/api/v1/quotation"]
+    )
+    return lambda i: rng.choice(mix)()
+
+
+def hot_weather_paths() -> Callable[[int], str]:
+    return lambda i: weather_path(*HOT_COORDS[i % len(HOT_COORDS)])
+
+
+# ----------------------------------------------------------------------
+# Gerador de carga
+# ----------------------------------------------------------------------
+
+async def run_load(base_url: str, next_path: Callable[[int], str], total: int, concurrency: int) -> dict:
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    stale = 0
+    counter = iter(range(total))
+
+    async def worker(client: httpx.AsyncClient):
+        nonlocal stale
+        for i in counter:
+            path = next_path(i)
+            start = time.perf_counter()
+            try:
+                response = await client.get(path)
+                statuses[str(response.status_code)] += 1
+                if response.headers.get("x-quotation-stale") or (
+                    response.status_code == 200 and b'"stale":true' in response.content.replace(b" ", b"")
+                ):
+                    stale += 1
+            except httpx.HTTPError as e:
+                statuses[type(e).__name__] += 1
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=30.0, limits=limits) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": total,
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 3),
+        "rps": round(total / elapsed, 1),
+        "latency_ms": {
+            "p50": round(_percentile(latencies, 50), 2),
+            "p95": round(_percentile(latencies, 95), 2),
+            "p99": round(_percentile(latencies, 99), 2),
+            "max": round(latencies[-1], 2) if latencies else 0.0,
+            "mean": round(statistics.fmean(latencies), 2) if latencies else 0.0,
+        },
+        "status": dict(statuses),
+        "stale_responses": stale,
+    }
+
+
+# ----------------------------------------------------------------------
+# App sob teste
+# ----------------------------------------------------------------------
+
+class AppProcess:
+    """Um `uvicorn app.main:app` novo por cenário (caches vazios)"""
+
+    def __init__(self, port: int, env: Dict[str, str], log_path: Path):
+        self.port = port
+        self.env = {**os.environ, **env}
+        self.log_path = log_path
+        self.process: Optional[subprocess.Popen] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self, timeout: float = 30.0):
+        # Logs do app vão para arquivo para não poluir o relatório
+        self.log_path.parent.mkdir(parents=True, exist_ok=True)
+        # Um restart dentro do cenário continua o mesmo log
+        with open(self.log_path, "ab" if self.process is not None else "wb") as log:
+            self.process = subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+                 "--port", str(self.port), "--log-level", "warning", "--no-access-log"],
+                cwd=BACKEND_DIR, env=self.env, stdout=log, stderr=subprocess.STDOUT,
+            )
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"App saiu no startup (código {self.process.returncode}); veja {self.log_path}")
+            try:
+                if httpx.get(f"{self.base_url}/readyz", timeout=1.0).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.2)
+        self.stop()
+        raise RuntimeError(f"App não ficou pronto (/readyz) dentro do tempo limite; o MongoDB está acessível? Veja {self.log_path}")
+
+    def stop(self):
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+
+def app_env(stubs: StubServer, ttl_minutes: Optional[float] = None) -> Dict[str, str]:
+    env = {
+        **stubs.env(),
+        "RATE_LIMIT_ENABLED": "false",
+        "NEWS_REFRESH_ENABLED": "false",
+        "NEWSAPI_KEY": os.environ.get("NEWSAPI_KEY") or "load-test",
+        "NEWSAPI_DAILY_QUOTA": "1000000",
+        "TRACING_ENABLED": "false",
+    }
+    if ttl_minutes is not None:
+        env["CACHE_TTL_MINUTES"] = str(ttl_minutes)
+    return env
+
+
+# ----------------------------------------------------------------------
+# Cenários
+# ----------------------------------------------------------------------
+
+async def _warm_up(base_url: str, concurrency: int):
+    await run_load(base_url, hot_weather_paths(), len(HOT_COORDS), concurrency)
+
+
+async def scenario_cold(app, stubs, args):
+    return await run_load(app.base_url, cold_paths(), args.requests, args.concurrency)
+
+
+async def scenario_warm(app, stubs, args):
+    await _warm_up(app.base_url, args.concurrency)
+    return await run_load(app.base_url, warm_paths(), args.requests, args.concurrency)
+
+
+async def scenario_expiry_storm(app, stubs, args):
+    await _warm_up(app.base_url, args.concurrency)
+    await asyncio.sleep(SHORT_TTL_MINUTES * 60 + 0.5)
+    return await run_load(app.base_url, hot_weather_paths(), args.requests, args.concurrency)
+
+
+async def scenario_outage(app, stubs, args):
+    await _warm_up(app.base_url, args.concurrency)
+    await asyncio.sleep(SHORT_TTL_MINUTES * 60 + 0.5)
+    stubs.state.configure(error_rate=1.0)
+    try:
+        return await run_load(app.base_url, warm_paths(), args.requests, args.concurrency)
+    finally:
+        stubs.state.configure(error_rate=args.error_rate)
+
+
+async def scenario_restart(app, stubs, args):
+    await _warm_up(app.base_url, args.concurrency)
+    await run_load(app.base_url, warm_paths(), len(HOT_COORDS) * 4, args.concurrency)
+    await asyncio.to_thread(app.stop)
+    await asyncio.to_thread(app.start)
+    return await run_load(app.base_url, warm_paths(), args.requests, args.concurrency)
+
+
+SCENARIOS = {
+    "cold": (scenario_cold, None),
+    "warm": (scenario_warm, None),
+    "expiry_storm": (scenario_expiry_storm, SHORT_TTL_MINUTES),
+    "outage": (scenario_outage, SHORT_TTL_MINUTES),
+    "restart": (scenario_restart, None),
+}
+
+
+def run_scenario(name: str, stubs: StubServer, args) -> dict:
+    fn, ttl_minutes = SCENARIOS[name]
+    # Diretório de snapshots novo por cenário: todos começam com os caches vazios
+    with tempfile.TemporaryDirectory(prefix="cana-snapshots-") as snapshot_dir:
+        env = {**app_env(stubs, ttl_minutes), "CACHE_SNAPSHOT_DIR": snapshot_dir}
+        app = AppProcess(args.app_port, env, RESULTS_DIR / f"app-{name}.log")
+        app.start()
+        try:
+            before = stubs.state.snapshot_calls()
+            result = asyncio.run(fn(app, stubs, args))
+            after = stubs.state.snapshot_calls()
+        finally:
+            app.stop()
+    # Inclui as chamadas do aquecimento: o que importa é o total por cenário
+    result["upstream_calls"] = {k: after[k] - before[k] for k in after}
+    return result
+
+
+# ----------------------------------------------------------------------
+# Relatório
+# ----------------------------------------------------------------------
+
+def print_result(name: str, r: dict):
+    lat = r["latency_ms"]
+    calls = ", ".join(f"{k}={v}" for k, v in r["upstream_calls"].items() if v)
+    print(
+        f"{name:<13} {r['rps']:>9.1f} req/s  p50={lat['p50']:>7.1f}ms  p95={lat['p95']:>7.1f}ms  "
+        f"p99={lat['p99']:>7.1f}ms  status={r['status']}  stale={r['stale_responses']}"
+    )
+    print(f"{'':<13} upstream: {calls or 'nenhuma chamada'}")
+
+
+def compare(previous_path: str, current: dict):
+    previous = json.loads(Path(previous_path).read_text())
+    print(f"\nComparação com {previous.get('commit')} ({previous_path}):")
+    for name, r in current["scenarios"].items():
+        old = previous.get("scenarios", {}).get(name)
+        if not old:
+            continue
+
+        def delta(new, base):
+            return f"{(new - base) / base * 100:+.1f}%" if base else "n/a"
+
+        print(
+            f"{name:<13} req/s {delta(r['rps'], old['rps']):>8}  "
+            f"p95 {delta(r['latency_ms']['p95'], old['latency_ms']['p95']):>8}  "
+            f"p99 {delta(r['latency_ms']['p99'], old['latency_ms']['p99']):>8}  "
+            f"upstream {sum(old['upstream_calls'].values())} -> {sum(r['upstream_calls'].values())}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga com stubs dos serviços externos")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Cenários separados por vírgula")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Latência média dos stubs")
+    parser.add_argument("--jitter-ms", type=float, default=20.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fração de respostas com erro dos stubs")
+    parser.add_argument("--stub-port", type=int, default=9100)
+    parser.add_argument("--app-port", type=int, default=8100)
+    parser.add_argument("--output", help="Arquivo JSON de saída (padrão: benchmarks/results/)")
+    parser.add_argument("--compare", help="Resultado anterior para comparar")
+    args = parser.parse_args()
+
+    names = [n.strip() for n in args.scenarios.split(",") if n.strip()]
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown:
+        parser.error(f"Cenários desconhecidos: {', '.join(unknown)}")
+
+    stubs = StubServer(StubState(args.latency_ms, args.jitter_ms, args.error_rate), port=args.stub_port)
+    stubs.start()
+    commit = _git_commit()
+    report = {
+        "commit": commit,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "config": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "stub_latency_ms": args.latency_ms,
+            "stub_jitter_ms": args.jitter_ms,
+            "stub_error_rate": args.error_rate,
+        },
+        "scenarios": {},
+    }
+    try:
+        for name in names:
+            result = run_scenario(name, stubs, args)
+            report["scenarios"][name] = result
+            print_result(name, result)
+    finally:
+        stubs.stop()
+
+    output = Path(args.output) if args.output else (
+        RESULTS_DIR / f"load-{commit}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+    print(f"\nResultado salvo em {output}")
+
+    if args.compare:
+        compare(args.compare, report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Coletor OTLP/HTTP local (stand-in) para testar a exportação de traces
+
+Recebe POST /v1/traces em OTLP/JSON, imprime um resumo de cada span e,
+com --out, grava os payloads recebidos (um por linha).
+
+Uso (a partir de backend/):
+
+    python -m benchmarks.otlp_collector --port 4318 --out /tmp/otlp.jsonl
+    TRACING_EXPORTER=otlp TRACING_SAMPLE_RATE=1 uvicorn app.main:app
+"""
+
+import argparse
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def make_handler(out_path):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            if self.path != "/v1/traces":
+                self.send_response(404)
+                self.end_headers()
+                return
+
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            try:
+                payload = json.loads(body)
+            except ValueError:
+                self.send_response(400)
+                self.end_headers()
+                return
+
+            for resource_spans in payload.get("resourceSpans", []):
+                for scope_spans in resource_spans.get("scopeSpans", []):
+                    for span in scope_spans.get("spans", []):
+                        duration_ms = (int(span["endTimeUnixNano"]) - int(span["startTimeUnixNano"])) / 1e6
+                        print(f"{span['traceId'][:8]} {span['name']:<20} {duration_ms:8.2f} ms")
+
+            if out_path:
+                with open(out_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(payload) + "\n")
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.end_headers()
+            self.wfile.write(b"{}")
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Coletor OTLP/HTTP local")
+    parser.add_argument("--port", type=int, default=4318)
+    parser.add_argument("--out", default=None, help="Arquivo para gravar os payloads recebidos")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(args.out))
+    print(f"Coletor OTLP em http://127.0.0.1:{args.port}/v1/traces")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
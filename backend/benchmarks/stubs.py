@@ -0,0 +1,224 @@
+"""
+Stubs locais dos serviços externos para os testes de carga
+
+Um único servidor (Starlette + uvicorn, em uma thread) responde pelos
+quatro upstreams, roteados por path:
+
+- Open-Meteo:          GET /v1/forecast
+- NewsAPI:             GET /v2/everything, GET /v2/top-headlines
+- Nominatim:           GET /search, GET /reverse
+- noticiasagricolas:   GET /cotacoes/sucroenergetico/{pagina}
+
+Latência (média + jitter) e taxa de erro são configuráveis por upstream e
+podem ser alteradas durante a execução (ex.: simular uma queda no meio de
+um cenário). Cada chamada é contada por upstream.
+
+Uso isolado (a partir de backend/):
+
+    python -m benchmarks.stubs --port 9100 --latency-ms 80
+"""
+
+import argparse
+import asyncio
+import random
+import threading
+import time
+from collections import Counter
+from datetime import date, timedelta
+from typing import Dict, Optional
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import HTMLResponse, JSONResponse, Response
+from starlette.routing import Route
+
+from benchmarks.bench_quotation_parse import synthetic_page
+
+UPSTREAMS = ("open_meteo", "newsapi", "nominatim", "noticiasagricolas")
+
+
+class UpstreamBehavior:
+    def __init__(self, latency_ms: float = 50.0, jitter_ms: float = 20.0, error_rate: float = 0.0, error_status: int = 503):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+
+
+class StubState:
+    def __init__(self, latency_ms: float = 50.0, jitter_ms: float = 20.0, error_rate: float = 0.0):
+        self.behavior: Dict[str, UpstreamBehavior] = {
+            name: UpstreamBehavior(latency_ms, jitter_ms, error_rate) for name in UPSTREAMS
+        }
+        self.calls: Counter = Counter()
+
+    def configure(self, upstream: Optional[str] = None, **changes):
+        """Altera o comportamento de um upstream (ou de todos)"""
+        targets = [upstream] if upstream else UPSTREAMS
+        for name in targets:
+            for key, value in changes.items():
+                setattr(self.behavior[name], key, value)
+
+    def snapshot_calls(self) -> Dict[str, int]:
+        return {name: self.calls[name] for name in UPSTREAMS}
+
+
+def _forecast(lat: float, lon: float) -> dict:
+    today = date.today()
+    days = [today + timedelta(days=i) for i in range(7)]
+    return {
+        "latitude": lat,
+        "longitude": lon,
+        "timezone": "America/Sao_Paulo",
+        "utc_offset_seconds": -10800,
+        "current": {
+            "time": f"{today.isoformat()}T12:00",
+            "temperature_2m": round(random.uniform(18, 34), 1),
+            "relative_humidity_2m": random.randint(30, 95),
+            "precipitation": round(random.choice([0, 0, 0, random.uniform(0, 12)]), 1),
+            "weather_code": random.choice([0, 1, 2, 3, 61]),
+            "cloud_cover": random.randint(0, 100),
+            "pressure_msl": 1013.2,
+            "wind_speed_10m": round(random.uniform(2, 30), 1),
+            "wind_direction_10m": random.randint(0, 359),
+        },
+        "hourly": {
+            "temperature_2m": [25.0] * 24,
+            "precipitation": [0.0] * 24,
+            "uv_index": [round(random.uniform(0, 11), 1) for _ in range(24)],
+        },
+        "daily": {
+            "time": [d.isoformat() for d in days],
+            "temperature_2m_max": [31.0] * 7,
+            "temperature_2m_min": [18.0] * 7,
+            "precipitation_sum": [0.0, 2.5, 0.0, 0.0, 8.1, 0.0, 0.0],
+            "precipitation_hours": [0, 2, 0, 0, 5, 0, 0],
+            "sunrise": [f"{d.isoformat()}T05:45" for d in days],
+            "sunset": [f"{d.isoformat()}T18:20" for d in days],
+        },
+    }
+
+
+def _articles(n: int) -> dict:
+    now = time.time()
+    articles = [
+        {
+            "source": {"id": None, "name": "Stub News"},
+            "author": "Redação",
+            "title": f"Safra de cana {i}: produtividade e clima",
+            "description": "Notícia gerada pelo stub da NewsAPI.",
+            "url": f"https://stub.local/noticia/{int(now)}-{i}",
+            "urlToImage": None,
+            "publishedAt": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(now - i * 600)),
+            "content": "Conteúdo.",
+        }
+        for i in range(n)
+    ]
+    return {"status": "ok", "totalResults": len(articles), "articles": articles}
+
+
+def _place(lat: float, lon: float, name: str) -> dict:
+    return {
+        "lat": str(lat),
+        "lon": str(lon),
+        "display_name": f"{name}, São Paulo, Brasil",
+        "address": {"city": name, "state": "São Paulo", "country": "Brasil"},
+    }
+
+
+def build_app(state: StubState) -> Starlette:
+    random.seed(7)
+    quotation_html = synthetic_page()
+
+    async def behave(upstream: str) -> Optional[Response]:
+        """Conta a chamada, aplica latência e, se sorteado, devolve erro"""
+        state.calls[upstream] += 1
+        behavior = state.behavior[upstream]
+        delay = max(0.0, random.gauss(behavior.latency_ms, behavior.jitter_ms)) / 1000
+        await asyncio.sleep(delay)
+        if behavior.error_rate and random.random() < behavior.error_rate:
+            return JSONResponse({"error": "stub failure"}, status_code=behavior.error_status)
+        return None
+
+    async def forecast(request: Request):
+        return await behave("open_meteo") or JSONResponse(_forecast(
+            float(request.query_params.get("latitude", -21.17)),
+            float(request.query_params.get("longitude", -47.81)),
+        ))
+
+    async def news(request: Request):
+        page_size = int(request.query_params.get("pageSize", 20))
+        return await behave("newsapi") or JSONResponse(_articles(page_size))
+
+    async def search(request: Request):
+        limit = int(request.query_params.get("limit", 5))
+        query = request.query_params.get("q", "Cidade")
+        return await behave("nominatim") or JSONResponse([
+            _place(-21.0 - i * 0.1, -47.0 - i * 0.1, f"{query.title()} {i}") for i in range(limit)
+        ])
+
+    async def reverse(request: Request):
+        lat = float(request.query_params.get("lat", -21.17))
+        lon = float(request.query_params.get("lon", -47.81))
+        return await behave("nominatim") or JSONResponse(_place(lat, lon, "Ribeirão Preto"))
+
+    async def quotation(request: Request):
+        return await behave("noticiasagricolas") or HTMLResponse(quotation_html)
+
+    return Starlette(routes=[
+        Route("/v1/forecast", forecast),
+        Route("/v2/everything", news),
+        Route("/v2/top-headlines", news),
+        Route("/search", search),
+        Route("/reverse", reverse),
+        Route("/cotacoes/sucroenergetico/{page}", quotation),
+    ])
+
+
+class StubServer:
+    """Servidor de stubs em uma thread própria"""
+
+    def __init__(self, state: StubState, port: int = 9100):
+        self.state = state
+        self.port = port
+        self._server = uvicorn.Server(uvicorn.Config(
+            build_app(state), host="127.0.0.1", port=port, log_level="warning", access_log=False
+        ))
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def env(self) -> Dict[str, str]:
+        """Variáveis de ambiente que apontam o app para os stubs"""
+        return {
+            "OPEN_METEO_BASE_URL": f"{self.base_url}/v1",
+            "NEWSAPI_BASE_URL": f"{self.base_url}/v2",
+            "NOMINATIM_DOMAIN": f"127.0.0.1:{self.port}",
+            "NOMINATIM_SCHEME": "http",
+            "NOTICIAS_AGRICOLAS_BASE_URL": self.base_url,
+        }
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+        self._thread.start()
+        while not self._server.started:
+            time.sleep(0.05)
+
+    def stop(self):
+        self._server.should_exit = True
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stubs locais dos serviços externos")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    stub_state = StubState(latency_ms=args.latency_ms, error_rate=args.error_rate)
+    uvicorn.run(build_app(stub_state), host="127.0.0.1", port=args.port, log_level="info")
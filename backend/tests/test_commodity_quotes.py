@@ -0,0 +1,132 @@
+from datetime import timedelta
+
+import httpx
+import pytest
+
+from app.services.commodity_quotes import CommodityQuotes, QuoteSource, parse_blocks
+
+
+# Layouts encontrados nas páginas: tabela com thead/tbody (Campo/Esteira),
+# vencimentos de contrato sem tbody, bloco sem fechamento e linhas inválidas
+HTML = """
+<html><body>
+<div class="menu"><table class="cot-fisicas"><tr><td>Fora</td><td>1,00</td></tr></table></div>
+<div class="cotacao">
+  <div class="info"><div class="fechamento">Fechamento: 02/01/2026</div></div>
+  <table class="cot-fisicas">
+    <thead><tr><th>Produto</th><th>Preço</th></tr></thead>
+    <tbody>
+      <tr><td>Campo</td><td>1.150,25</td></tr>
+      <tr><td>Esteira</td><td>1.180,50</td></tr>
+    </tbody>
+  </table>
+</div>
+<div class="cotacao">
+  <div class="fechamento">Fechamento: 05/01/2026</div>
+  <table class="cot-fisicas">
+    <tr><td>Mar/26</td><td>15,12</td><td>+0,3%</td></tr>
+    <tr><td>Mai/26</td><td>s/ cotação</td></tr>
+    <tr><td>Jul/26</td><td>15,40</td></tr>
+    <tr><td>Sem valor</td></tr>
+  </table>
+</div>
+<div class="cotacao">
+  <table class="cot-fisicas"><tr><td>Campo</td><td>99,00</td></tr></table>
+</div>
+<div class="cotacao">
+  <div class="fechamento">Fechamento: ontem</div>
+  <table class="cot-fisicas"><tr><td>Campo</td><td>99,00</td></tr></table>
+</div>
+</body></html>
+"""
+
+
+def test_parse_blocks_table_layouts():
+    registros = parse_blocks(HTML, max_records=10)
+
+    assert registros == [
+        {
+            "data": "2026-01-05T00:00:00",
+            "data_formatada": "05/01/2026",
+            "valores": {"Mar/26": 15.12, "Jul/26": 15.40},
+        },
+        {
+            "data": "2026-01-02T00:00:00",
+            "data_formatada": "02/01/2026",
+            "valores": {"Campo": 1150.25, "Esteira": 1180.50},
+        },
+    ]
+    assert len(parse_blocks(HTML, max_records=1)) == 1
+
+
+class FakeSite:
+    """Responde com ETag e 304 quando o If-None-Match bate"""
+
+    def __init__(self):
+        self.requests = []
+        self.etag = '"v1"'
+
+    def __call__(self, request):
+        self.requests.append(request)
+        if request.headers.get("If-None-Match") == self.etag:
+            return httpx.Response(304)
+        return httpx.Response(200, text=HTML, headers={"ETag": self.etag, "Last-Modified": "Fri, 02 Jan 2026 12:00:00 GMT"})
+
+
+def make_quotes(site, ttl_seconds=60):
+    sources = [
+        QuoteSource("cana", "Cana", "cana", "R$/t", ttl_seconds),
+        QuoteSource("atr", "ATR", "atr", "R$/kg ATR", 12 * 3600),
+    ]
+    return CommodityQuotes(sources, transport=httpx.MockTransport(site))
+
+
+def expire(quotes, key):
+    quotes._entries[key]["fetched_at"] -= timedelta(hours=1)
+
+
+@pytest.mark.asyncio
+async def test_not_modified_reuses_previous_records():
+    site = FakeSite()
+    quotes = make_quotes(site)
+
+    first = await quotes.get_quotes(["cana"])
+    registros = quotes._entries["cana"]["registros"]
+    expire(quotes, "cana")
+    second = await quotes.get_quotes(["cana"])
+    await quotes.close()
+
+    assert [r.headers.get("If-None-Match") for r in site.requests] == [None, '"v1"']
+    assert site.requests[1].headers["If-Modified-Since"] == "Fri, 02 Jan 2026 12:00:00 GMT"
+    assert quotes._entries["cana"]["registros"] is registros
+    assert second["quotations"]["cana"]["registros"] == first["quotations"]["cana"]["registros"]
+    assert not second["quotations"]["cana"]["stale"] and second["errors"] == {}
+
+
+@pytest.mark.asyncio
+async def test_each_source_has_its_own_ttl():
+    site = FakeSite()
+    quotes = make_quotes(site)
+
+    await quotes.get_quotes()
+    expire(quotes, "cana")
+    expire(quotes, "atr")
+    await quotes.get_quotes()
+    await quotes.close()
+
+    # Uma hora depois só a cana (TTL de 60s) vence; o ATR (12h) segue fresco
+    paths = [r.url.path.rsplit("/", 1)[-1] for r in site.requests]
+    assert sorted(paths[:2]) == ["atr", "cana"]
+    assert paths[2:] == ["cana"]
+
+
+@pytest.mark.asyncio
+async def test_unknown_key_reported_as_error():
+    site = FakeSite()
+    quotes = make_quotes(site)
+
+    result = await quotes.get_quotes(["cana", "soja"])
+    await quotes.close()
+
+    assert list(result["quotations"]) == ["cana"]
+    assert result["errors"] == {"soja": "Fonte desconhecida"}
@@ -0,0 +1,210 @@
+from types import SimpleNamespace
+
+import pytest
+from bson import ObjectId
+from pymongo.errors import AutoReconnect
+
+from app.core.cache import TTLCache
+from app.core.geo import haversine_km
+from app.services.insights_cache import InsightsPageCache
+from app.services import insights_service
+from app.services.insights_service import InsightsService, nearby_cache
+
+
+class FakeInsightsCollection:
+    """insert_many que falha com erro de rede a partir da chamada `fail_on_call`"""
+
+    def __init__(self, fail_on_call=None):
+        self.fail_on_call = fail_on_call
+        self.calls = 0
+        self.docs = []
+
+    async def insert_many(self, docs, ordered=True):
+        self.calls += 1
+        for doc in docs:
+            doc.setdefault("_id", ObjectId())
+        if self.calls == self.fail_on_call:
+            raise AutoReconnect("connection reset")
+        self.docs.extend(docs)
+
+
+class FakeVersions:
+    def __init__(self):
+        self.version = 0
+
+    async def find_one(self, *args, **kwargs):
+        return {"version": self.version}
+
+    async def find_one_and_update(self, *args, **kwargs):
+        self.version += 1
+        return {"version": self.version}
+
+
+class FakeGeoCollection:
+    """aggregate que executa $geoNear + $limit sobre documentos em memória"""
+
+    def __init__(self, points):
+        self.docs = [
+            {"_id": ObjectId(), "location": {"name": f"P{i}", "lat": lat, "lon": lon}}
+            for i, (lat, lon) in enumerate(points)
+        ]
+
+    async def aggregate(self, pipeline):
+        geo = pipeline[0]["$geoNear"]
+        lon, lat = geo["near"]["coordinates"]
+        limit = pipeline[1]["$limit"]
+        ranked = sorted(
+            ((haversine_km(lat, lon, d["location"]["lat"], d["location"]["lon"]), d) for d in self.docs),
+            key=lambda pair: pair[0]
+        )
+        for distance, doc in ranked[:limit]:
+            if distance * 1000 <= geo["maxDistance"]:
+                yield dict(doc)
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, *args):
+        return self
+
+    def skip(self, n):
+        return self
+
+    def limit(self, n):
+        return self
+
+    async def __aiter__(self):
+        for doc in self.docs:
+            yield dict(doc)
+
+
+class FakePageCollection:
+    """find/count_documents; `during_query` roda no meio da consulta"""
+
+    def __init__(self, docs, during_query=None):
+        self.docs = docs
+        self.during_query = during_query
+
+    async def count_documents(self, query):
+        if self.during_query is not None:
+            await self.during_query()
+        return len(self.docs)
+
+    def find(self, query):
+        return FakeCursor(self.docs)
+
+
+def make_service(collection, versions=None):
+    return InsightsService(SimpleNamespace(insights=collection, cache_versions=versions or FakeVersions()))
+
+
+def insight(i):
+    return {
+        "author": {"name": "Produtor"},
+        "location": {"name": f"Fazenda {i}", "lat": -21.0 - i * 0.01, "lon": -47.0},
+        "weather_snapshot": {"temperature": 25, "humidity": 60, "condition": "Sol"},
+        "content": f"Observação de campo número {i}",
+    }
+
+
+@pytest.mark.asyncio
+async def test_bulk_network_error_returns_partial_results():
+    collection = FakeInsightsCollection(fail_on_call=2)
+    items = [insight(i) for i in range(5)] + [{"content": "inválido"}]
+
+    result = await make_service(collection).create_insights_bulk(items, chunk_size=2)
+
+    statuses = [r["status"] for r in result["results"]]
+    assert statuses == ["created", "created", "error", "error", "error", "error"]
+    assert result["inserted"] == 2
+    assert result["failed"] == 4
+    assert "não confirmada" in result["results"][2]["error"]
+    assert "interrompido" in result["results"][4]["error"]
+    assert collection.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_nearby_falls_back_when_cell_candidates_are_truncated():
+    nearby_cache.clear()
+    # 50 insights a ~300 m a oeste do centro da célula (-21.00, -47.00) e um
+    # exatamente no ponto consultado, ~400 m a leste do centro
+    points = [(-21.0, -47.0029 - i * 0.00001) for i in range(50)] + [(-21.0, -46.996)]
+    service = make_service(FakeGeoCollection(points))
+
+    results = await service.get_nearby_insights(-21.0, -46.996, radius_km=5, limit=5)
+
+    assert results[0]["location"]["name"] == "P50"
+    assert results[0]["distance_km"] == 0
+    assert [r["distance_km"] for r in results] == sorted(r["distance_km"] for r in results)
+
+
+@pytest.mark.asyncio
+async def test_nearby_uses_cache_when_candidates_are_complete():
+    nearby_cache.clear()
+    collection = FakeGeoCollection([(-21.0, -47.0 + i * 0.001) for i in range(10)])
+    service = make_service(collection)
+
+    first = await service.get_nearby_insights(-21.001, -47.001, radius_km=5, limit=3)
+    collection.docs = []  # uma segunda consulta ao banco não acharia nada
+    second = await service.get_nearby_insights(-21.002, -46.999, radius_km=5, limit=3)
+
+    assert len(first) == len(second) == 3
+    assert second[0]["distance_km"] == pytest.approx(
+        haversine_km(-21.002, -46.999, -21.0, -46.999), abs=1e-3
+    )
+
+
+@pytest.mark.asyncio
+async def test_version_from_other_replica_clears_dependent_caches():
+    versions = FakeVersions()
+    db = SimpleNamespace(cache_versions=versions)
+    dependent = TTLCache(ttl_seconds=60)
+    page_cache = InsightsPageCache(ttl_seconds=60, check_interval=0)
+    page_cache.add_dependent(dependent)
+
+    await page_cache.sync(db)
+    dependent.set("nearby:-21.0:-47.0", ["cached"])
+    versions.version += 1  # insight criado na outra réplica
+    await page_cache.sync(db)
+
+    assert dependent.get("nearby:-21.0:-47.0") is None
+
+
+@pytest.mark.asyncio
+async def test_first_page_not_cached_when_invalidated_during_query(monkeypatch):
+    page_cache = InsightsPageCache(ttl_seconds=60, check_interval=0)
+    monkeypatch.setattr(insights_service, "insights_page_cache", page_cache)
+    versions = FakeVersions()
+    collection = FakePageCollection([{"_id": ObjectId(), "content": "antigo"}])
+    service = make_service(collection, versions)
+    db = service.db
+
+    async def concurrent_write():
+        collection.during_query = None
+        await page_cache.invalidate(db, ["Fazenda"])
+
+    collection.during_query = concurrent_write
+    await service.get_insights()
+    assert await page_cache.get(db, None, 20) is None
+
+    # Sem escrita concorrente a página é cacheada normalmente
+    await service.get_insights()
+    assert await page_cache.get(db, None, 20) is not None
+
+
+@pytest.mark.asyncio
+async def test_first_page_not_cached_when_other_replica_writes_during_query(monkeypatch):
+    page_cache = InsightsPageCache(ttl_seconds=60, check_interval=0)
+    monkeypatch.setattr(insights_service, "insights_page_cache", page_cache)
+    versions = FakeVersions()
+    collection = FakePageCollection([{"_id": ObjectId(), "content": "antigo"}])
+    service = make_service(collection, versions)
+
+    async def other_replica_write():
+        versions.version += 1
+
+    collection.during_query = other_replica_write
+    await service.get_insights()
+    assert await page_cache.get(service.db, None, 20) is None
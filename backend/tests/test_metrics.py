@@ -0,0 +1,57 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.middlewares.metrics import MetricsMiddleware
+from app.core.metrics import HTTP_REQUEST_DURATION, Counter, Gauge, Histogram, MetricsRegistry
+
+
+def test_registry_renders_prometheus_text():
+    registry = MetricsRegistry()
+    hits = registry.register(Counter("hits_total", "Acertos", ("cache",)))
+    in_flight = registry.register(Gauge("in_flight", "Em andamento"))
+    duration = registry.register(Histogram("duration_seconds", "Duração", ("route",), buckets=(0.1, 1.0)))
+
+    hits.labels("weather").inc()
+    hits.labels("weather").inc(2)
+    hits.labels('a"b').inc()
+    in_flight.labels().inc()
+    duration.labels("/x").observe(0.1)
+    duration.labels("/x").observe(0.5)
+    duration.labels("/x").observe(3)
+
+    assert registry.render() == "\n".join([
+        "# HELP hits_total Acertos",
+        "# TYPE hits_total counter",
+        'hits_total{cache="weather"} 3',
+        'hits_total{cache="a\\"b"} 1',
+        "# HELP in_flight Em andamento",
+        "# TYPE in_flight gauge",
+        "in_flight 1",
+        "# HELP duration_seconds Duração",
+        "# TYPE duration_seconds histogram",
+        'duration_seconds_bucket{route="/x",le="0.1"} 1',
+        'duration_seconds_bucket{route="/x",le="1"} 2',
+        'duration_seconds_bucket{route="/x",le="+Inf"} 3',
+        'duration_seconds_sum{route="/x"} 3.6',
+        'duration_seconds_count{route="/x"} 3',
+    ]) + "\n"
+
+
+def test_middleware_labels_route_template_and_unknown_methods():
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: int):
+        return {"id": item_id}
+
+    client = TestClient(app)
+    client.get("/items/1")
+    client.get("/items/2")
+    for method in ("FOO", "BAR"):
+        client.request(method, "/items/1")
+
+    labels = set(HTTP_REQUEST_DURATION._children)
+    assert sum(HTTP_REQUEST_DURATION.labels("GET", "/items/{item_id}", "200").counts) == 2
+    assert not any(method in ("FOO", "BAR") for method, _, _ in labels)
+    assert ("OTHER", "unmatched", "405") in labels
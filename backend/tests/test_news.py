@@ -0,0 +1,230 @@
+import asyncio
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from pymongo.errors import DuplicateKeyError
+
+from app.services import news
+from app.services.news import NewsCache, NewsQuotaBudget, NewsService, SharedNewsQuotaBudget
+from app.services.news_archive import NewsArchive
+
+
+class FakeQuotaCollection:
+    """find_one_and_update com upsert, como o MongoDB faz com o filtro em used"""
+
+    def __init__(self):
+        self.docs = {}
+
+    async def find_one(self, query):
+        return self.docs.get(query["_id"])
+
+    async def find_one_and_update(self, query, update, upsert=False, return_document=None):
+        doc = self.docs.get(query["_id"])
+        if doc is None:
+            doc = self.docs[query["_id"]] = {"_id": query["_id"], "used": 0}
+        elif doc["used"] >= query["used"]["$lt"]:
+            # O upsert tentaria inserir um segundo documento com o mesmo _id
+            raise DuplicateKeyError("E11000 duplicate key")
+        doc["used"] += update["$inc"]["used"]
+        return dict(doc)
+
+    async def update_one(self, query, update, upsert=False):
+        doc = self.docs.setdefault(query["_id"], {"_id": query["_id"], "used": 0})
+        doc["used"] = max(doc["used"], update["$max"]["used"])
+
+
+class FakeArchive:
+    def __init__(self, articles):
+        self.articles = articles
+
+    async def latest(self, category, limit):
+        return self.articles[:limit]
+
+
+def article(i):
+    return {"title": f"Notícia {i}", "url": f"https://example.com/{i}", "publishedAt": "2026-01-01T00:00:00Z"}
+
+
+def make_service(archive=None):
+    service = NewsService(NewsCache(ttl_minutes=60), NewsQuotaBudget(daily_quota=10), archive=archive)
+    service.fetch_calls = 0
+
+    async def fetch(endpoint, cache_params, request_params, page_size):
+        service.fetch_calls += 1
+        articles = [article(i) for i in range(page_size)]
+        service.cache.store(endpoint, cache_params, page_size, articles)
+        return articles
+
+    service.fetch = fetch
+    return service
+
+
+@pytest.mark.asyncio
+async def test_shared_quota_is_split_between_replicas(monkeypatch):
+    collection = FakeQuotaCollection()
+    monkeypatch.setattr(news, "get_database", lambda: SimpleNamespace(news_quota=collection))
+    replicas = [SharedNewsQuotaBudget(daily_quota=5), SharedNewsQuotaBudget(daily_quota=5)]
+
+    granted = [await replicas[i % 2].try_consume() for i in range(8)]
+
+    assert granted.count(True) == 5
+    assert granted[5:] == [False, False, False]
+    assert all(not budget.can_fetch() for budget in replicas)
+
+
+@pytest.mark.asyncio
+async def test_shared_quota_exhaust_reaches_other_replicas(monkeypatch):
+    collection = FakeQuotaCollection()
+    monkeypatch.setattr(news, "get_database", lambda: SimpleNamespace(news_quota=collection))
+    first = SharedNewsQuotaBudget(daily_quota=5)
+    second = SharedNewsQuotaBudget(daily_quota=5, sync_interval=0)
+
+    await first.exhaust()  # 429 da NewsAPI
+    await second.sync()
+
+    assert second.remaining == 0
+    assert not await second.try_consume()
+
+
+@pytest.mark.asyncio
+async def test_cold_start_serves_archive_and_refreshes_in_background():
+    service = make_service(FakeArchive([article("arquivado")]))
+    cache_params, request_params = news.everything_params("SUGARCANE", "relevancy")
+
+    result = await service.get_articles("everything", cache_params, request_params, page_size=5)
+    again = await service.get_articles("everything", cache_params, request_params, page_size=5)
+    await asyncio.gather(*service._refreshing.values())
+    refreshed = await service.get_articles("everything", cache_params, request_params, page_size=5)
+
+    assert result["stale"] and result["articles"][0]["title"] == "Notícia arquivado"
+    assert again["stale"]
+    assert service.fetch_calls == 1
+    assert not refreshed["stale"] and len(refreshed["articles"]) == 5
+
+
+@pytest.mark.asyncio
+async def test_stale_entry_is_served_without_waiting():
+    service = make_service()
+    cache_params, request_params = news.everything_params("SUGARCANE", "popularity")
+    service.cache.store("everything", cache_params, 5, [article(0)])
+    entry = service.cache.get_entry("everything", cache_params)
+    entry["timestamp"] -= timedelta(hours=3)
+
+    result = await service.get_articles("everything", cache_params, request_params, page_size=5)
+
+    assert result["stale"] and len(result["articles"]) == 1
+    assert len(service._refreshing) == 1
+    await service.close()
+    assert service._refreshing == {}
+
+
+@pytest.mark.asyncio
+async def test_without_entry_or_archive_fetches_synchronously():
+    service = make_service(FakeArchive([]))
+    cache_params, request_params = news.headlines_params("us", "science")
+
+    result = await service.get_articles("top-headlines", cache_params, request_params, page_size=3)
+
+    assert not result["stale"] and service.fetch_calls == 1
+
+
+def test_archive_document_in_live_shape():
+    doc = {
+        "_id": "abc",
+        "title": "Safra recorde",
+        "url": "https://example.com/safra",
+        "categories": ["SUGARCANE"],
+        "published_at": datetime(2026, 1, 1),
+    }
+
+    live = NewsArchive.to_live_article(NewsArchive.to_article(doc))
+
+    assert live == {"title": "Safra recorde", "url": "https://example.com/safra"}
+
+
+def store_aged(service, cache_params, hours):
+    service.cache.store("everything", cache_params, 5, [article(0)])
+    service.cache.get_entry("everything", cache_params)["timestamp"] -= timedelta(hours=hours)
+
+
+@pytest.mark.asyncio
+async def test_warm_entry_served_while_refresher_keeps_it_recent():
+    service = make_service()
+    service.warm_enabled = True
+    service.warm_max_age_seconds = 4 * 3600
+    cache_params, request_params = news.everything_params("SUGARCANE", "publishedAt")
+    store_aged(service, cache_params, hours=2)
+
+    result = await service.get_articles("everything", cache_params, request_params, page_size=5, warm=True)
+
+    assert not result["stale"]
+    assert service._refreshing == {}
+
+
+@pytest.mark.asyncio
+async def test_warm_entry_refreshed_when_refresher_falls_behind():
+    service = make_service()
+    service.warm_enabled = True
+    service.warm_max_age_seconds = 4 * 3600
+    cache_params, request_params = news.everything_params("SUGARCANE", "publishedAt")
+    store_aged(service, cache_params, hours=5)
+
+    result = await service.get_articles("everything", cache_params, request_params, page_size=5, warm=True)
+    await asyncio.gather(*service._refreshing.values())
+
+    assert result["stale"]
+    assert service.fetch_calls == 1
+
+
+@pytest.mark.asyncio
+async def test_warm_flag_ignored_without_refresher():
+    service = make_service()
+    cache_params, request_params = news.everything_params("SUGARCANE", "publishedAt")
+    store_aged(service, cache_params, hours=2)
+
+    result = await service.get_articles("everything", cache_params, request_params, page_size=5, warm=True)
+    await asyncio.gather(*service._refreshing.values())
+
+    assert result["stale"]
+    assert service.fetch_calls == 1
+
+
+def test_cache_key_ignores_param_order_and_page_size_covers_smaller():
+    cache = NewsCache(ttl_minutes=60)
+    cache.store("everything", {"category": "SUGARCANE", "sort_by": "relevancy"}, 20, [article(i) for i in range(20)])
+
+    entry, fresh = cache.lookup("everything", {"sort_by": "relevancy", "category": "SUGARCANE"}, page_size=10)
+    bigger, _ = cache.lookup("everything", {"category": "SUGARCANE", "sort_by": "relevancy"}, page_size=50)
+    other, _ = cache.lookup("everything", {"category": "SUGARCANE", "sort_by": "popularity"}, page_size=10)
+
+    assert entry is not None and fresh
+    assert bigger is None and other is None
+
+
+def test_cache_ttl_stretched_by_multiplier():
+    cache = NewsCache(ttl_minutes=60)
+    params = {"country": "us", "category": "science"}
+    cache.store("top-headlines", params, 5, [article(0)])
+    cache.get_entry("top-headlines", params)["timestamp"] -= timedelta(hours=3)
+
+    assert cache.lookup("top-headlines", params, 5)[1] is False
+    assert cache.lookup("top-headlines", params, 5, ttl_multiplier=4)[1] is True
+
+
+@pytest.mark.asyncio
+async def test_quota_budget_steps_exhausts_and_resets_next_day():
+    budget = NewsQuotaBudget(daily_quota=10)
+    multipliers = []
+    while await budget.try_consume():
+        multipliers.append(budget.ttl_multiplier())
+
+    assert len(multipliers) == 10
+    assert multipliers[0] == 1 and multipliers[-1] == 12
+    assert sorted(multipliers) == multipliers
+
+    budget._day -= timedelta(days=1)
+    assert budget.remaining == 10
+
+    await budget.exhaust()
+    assert not budget.can_fetch()
@@ -0,0 +1,25 @@
+import base64
+
+import pytest
+
+from app.core.pagination import decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip_is_url_safe_without_padding():
+    values = {"p": "2026-01-01T00:00:00", "id": "a/b+c?", "s": 0.5}
+
+    cursor = encode_cursor(values)
+
+    assert "=" not in cursor and "+" not in cursor and "/" not in cursor
+    assert decode_cursor(cursor) == values
+
+
+@pytest.mark.parametrize("cursor", [
+    "",
+    "not base64!",
+    base64.urlsafe_b64encode(b"{truncated").decode(),
+    base64.urlsafe_b64encode(b"[1, 2]").decode(),
+])
+def test_invalid_cursor_raises_value_error(cursor):
+    with pytest.raises(ValueError, match="Cursor de paginação inválido"):
+        decode_cursor(cursor)
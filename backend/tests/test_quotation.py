@@ -0,0 +1,140 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from pymongo.errors import ServerSelectionTimeoutError
+
+from app.services import quotation
+from app.services.quotation import InMemoryQuotationCache, PersistentQuotationCache, QuotationService
+
+
+def registro(day):
+    return {
+        "data": f"2026-01-{day:02d}T00:00:00",
+        "data_formatada": f"{day:02d}/01/2026",
+        "valor_campo": 150.0 + day,
+        "valor_esteira": 160.0 + day,
+    }
+
+
+PAGE = [registro(day) for day in range(20, 0, -1)]
+
+
+class FakeScraper:
+    def __init__(self):
+        self.calls = []
+
+    async def scrape(self, known_dates=None):
+        self.calls.append(known_dates)
+        novos = []
+        for r in PAGE:
+            if known_dates and r["data"] in known_dates:
+                break
+            novos.append(r)
+        return novos
+
+
+class FakeHistory:
+    """Histórico com as 19 cotações mais antigas; `fail_on` simula o MongoDB fora"""
+
+    available = True
+
+    def __init__(self, fail_on=()):
+        self.fail_on = fail_on
+
+    def _check(self, name):
+        if name in self.fail_on:
+            raise ServerSelectionTimeoutError("mongodb:27017: timed out")
+
+    async def known_dates(self):
+        self._check("known_dates")
+        return {r["data"] for r in PAGE[1:]}
+
+    async def save(self, registros):
+        self._check("save")
+        return len(registros)
+
+    async def latest(self, limit=10):
+        self._check("latest")
+        return PAGE[:limit]
+
+
+def make_service(history):
+    service = QuotationService(cache=InMemoryQuotationCache())
+    service.scraper = FakeScraper()
+    service.history = history
+    return service
+
+
+@pytest.mark.asyncio
+async def test_scrape_is_served_when_history_cannot_be_read():
+    service = make_service(FakeHistory(fail_on=("known_dates",)))
+
+    data = await service._scrape_and_store()
+
+    assert data == PAGE[:10]
+    assert service.scraper.calls == [None]
+    assert await service.cache.get() == PAGE[:10]
+
+
+@pytest.mark.asyncio
+async def test_scrape_is_served_when_history_cannot_be_written():
+    service = make_service(FakeHistory(fail_on=("save",)))
+
+    data = await service._scrape_and_store()
+
+    # O scraping incremental trouxe só a cotação nova; a página é refeita inteira
+    assert data == PAGE[:10]
+    assert len(service.scraper.calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_incremental_scrape_with_history():
+    service = make_service(FakeHistory())
+
+    data = await service._scrape_and_store()
+
+    assert data == PAGE[:10]
+    assert len(service.scraper.calls) == 1
+
+
+class FlakyCacheCollection:
+    """find_one que falha nas primeiras `failures` chamadas"""
+
+    def __init__(self, doc, failures):
+        self.doc = doc
+        self.failures = failures
+        self.calls = 0
+
+    async def find_one(self, query):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise ServerSelectionTimeoutError("mongodb:27017: timed out")
+        return self.doc
+
+
+@pytest.mark.asyncio
+async def test_persisted_quotation_loaded_after_failed_read(monkeypatch):
+    collection = FlakyCacheCollection({"data": PAGE[:10], "timestamp": datetime.utcnow()}, failures=1)
+    monkeypatch.setattr(quotation, "get_database", lambda: SimpleNamespace(quotation_cache=collection))
+    cache = PersistentQuotationCache()
+    cache.LOAD_RETRY_SECONDS = 0
+
+    assert await cache.get_stale() is None
+    stale = await cache.get_stale()
+    await cache.get_stale()
+
+    assert stale[0] == PAGE[:10]
+    assert collection.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_persisted_quotation_read_retry_is_throttled(monkeypatch):
+    collection = FlakyCacheCollection(None, failures=5)
+    monkeypatch.setattr(quotation, "get_database", lambda: SimpleNamespace(quotation_cache=collection))
+    cache = PersistentQuotationCache()
+
+    for _ in range(3):
+        await cache.get()
+
+    assert collection.calls == 1
@@ -0,0 +1,137 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+from pymongo.errors import ServerSelectionTimeoutError
+
+from app import dependencies
+from app.api.middlewares.request_context import RequestContextMiddleware
+from app.core.rate_limit import MemoryTokenBuckets, MongoTokenBuckets
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def test_bucket_allows_burst_then_refills(clock):
+    buckets = MemoryTokenBuckets(clock=clock)
+
+    results = [buckets.take_sync("ip:1", capacity=3, rate=1.0) for _ in range(4)]
+
+    assert [allowed for allowed, _, _ in results] == [True, True, True, False]
+    assert results[-1][2] == pytest.approx(1.0)
+    clock.now += 1.5
+    allowed, tokens, _ = buckets.take_sync("ip:1", capacity=3, rate=1.0)
+    assert allowed and tokens == pytest.approx(0.5)
+
+
+def test_bucket_cost_and_keys_are_independent(clock):
+    buckets = MemoryTokenBuckets(clock=clock)
+
+    assert buckets.take_sync("ip:1", capacity=10, rate=1.0, cost=10)[0]
+    assert not buckets.take_sync("ip:1", capacity=10, rate=1.0, cost=5)[0]
+    assert buckets.take_sync("ip:2", capacity=10, rate=1.0, cost=5)[0]
+
+
+def test_idle_full_buckets_are_removed(clock):
+    buckets = MemoryTokenBuckets(cleanup_interval=60, clock=clock)
+    buckets.take_sync("ip:1", capacity=10, rate=1.0)
+    buckets.take_sync("ip:2", capacity=10, rate=0.01, cost=10)
+
+    clock.now += 61
+    buckets.take_sync("ip:3", capacity=10, rate=1.0)
+
+    # ip:1 já estaria cheio de novo; ip:2 ainda está reabastecendo
+    assert len(buckets) == 2
+
+
+class DownCollection:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = 0
+
+    async def find_one_and_update(self, *args, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        raise ServerSelectionTimeoutError("mongodb:27017: timed out")
+
+
+@pytest.mark.asyncio
+async def test_mongo_buckets_fall_back_and_pause_after_failure(clock):
+    collection = DownCollection()
+    buckets = MongoTokenBuckets(
+        lambda: {"rate_limits": collection}, MemoryTokenBuckets(clock=clock), retry_after_failure=10, clock=clock
+    )
+
+    results = [await buckets.take("ip:1", capacity=2, rate=1.0) for _ in range(3)]
+
+    assert [allowed for allowed, _, _ in results] == [True, True, False]
+    assert collection.calls == 1
+    clock.now += 11
+    await buckets.take("ip:1", capacity=2, rate=1.0)
+    assert collection.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_mongo_buckets_do_not_wait_for_slow_server(clock):
+    buckets = MongoTokenBuckets(
+        lambda: {"rate_limits": DownCollection(delay=5)}, MemoryTokenBuckets(clock=clock), timeout=0.05
+    )
+
+    allowed, _, _ = await asyncio.wait_for(buckets.take("ip:1", capacity=2, rate=1.0), timeout=1)
+
+    assert allowed
+
+
+def request(peer, real_ip=None):
+    headers = {"x-real-ip": real_ip} if real_ip else {}
+    return SimpleNamespace(headers=headers, client=SimpleNamespace(host=peer))
+
+
+def test_real_ip_header_ignored_unless_proxy_is_trusted(monkeypatch):
+    monkeypatch.setattr(dependencies.settings, "RATE_LIMIT_TRUST_PROXY", False)
+
+    assert dependencies.client_identity(request("10.0.0.5", "1.2.3.4")) == "ip:10.0.0.5"
+
+
+def test_real_ip_header_only_from_configured_proxies(monkeypatch):
+    monkeypatch.setattr(dependencies.settings, "RATE_LIMIT_TRUST_PROXY", True)
+    monkeypatch.setattr(dependencies, "_trusted_proxies", [dependencies.ipaddress.ip_network("172.28.0.10")])
+
+    assert dependencies.client_identity(request("172.28.0.10", "1.2.3.4")) == "ip:1.2.3.4"
+    assert dependencies.client_identity(request("172.28.0.1", "1.2.3.4")) == "ip:172.28.0.1"
+
+
+def test_rate_limit_headers_on_routes_returning_their_own_response(monkeypatch):
+    monkeypatch.setattr(dependencies, "rate_limit_buckets", MemoryTokenBuckets())
+    monkeypatch.setattr(dependencies.settings, "RATE_LIMIT_ENABLED", True)
+    app = FastAPI()
+    app.add_middleware(RequestContextMiddleware)
+
+    @app.get("/stream", dependencies=[Depends(dependencies.RateLimit("test", per_minute=2))])
+    async def stream():
+        return StreamingResponse(iter([b"a", b"b"]))
+
+    client = TestClient(app)
+    first = client.get("/stream")
+    client.get("/stream")
+    blocked = client.get("/stream")
+
+    assert first.status_code == 200
+    assert first.headers["X-RateLimit-Limit"] == "2"
+    assert first.headers["X-RateLimit-Remaining"] == "1"
+    assert blocked.status_code == 429
+    assert blocked.headers.get_list("X-RateLimit-Remaining") == ["0"]
+    assert "Retry-After" in blocked.headers
@@ -0,0 +1,189 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.core.resilience import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    CircuitOpenError,
+    DeadlineExceeded,
+    RetryBudget,
+    Upstream,
+    UpstreamUnavailable,
+    reset_deadline,
+    set_deadline,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FlakyCall:
+    """fn de Upstream.call que falha nas primeiras `failures` tentativas"""
+
+    def __init__(self, failures, error=None, status=503):
+        self.failures = failures
+        self.error = error
+        self.status = status
+        self.timeouts = []
+
+    async def __call__(self, timeout):
+        self.timeouts.append(timeout)
+        if len(self.timeouts) <= self.failures:
+            if self.error is not None:
+                raise self.error
+            return httpx.Response(self.status)
+        return httpx.Response(200)
+
+
+def make_upstream(clock=None, **options):
+    options.setdefault("backoff_base", 0)
+    return Upstream("test", timeout=5.0, clock=clock or FakeClock(), **options)
+
+
+def test_breaker_opens_half_opens_and_closes():
+    clock = FakeClock()
+    breaker = CircuitBreaker("test", failure_threshold=2, recovery_timeout=30, clock=clock)
+
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    clock.now += 30
+    breaker.before_call()  # probe
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()  # só um probe por vez
+
+    breaker.record_success()
+    assert breaker.state == CLOSED and breaker.failures == 0
+    breaker.before_call()
+
+
+def test_failed_probe_reopens_circuit():
+    clock = FakeClock()
+    breaker = CircuitBreaker("test", failure_threshold=1, recovery_timeout=30, clock=clock)
+    breaker.record_failure()
+    clock.now += 30
+    breaker.before_call()
+
+    breaker.record_failure()
+
+    assert breaker.state == OPEN
+    clock.now += 29
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_retry_budget_limits_retries():
+    budget = RetryBudget(ratio=0.5, max_tokens=1)
+
+    assert budget.withdraw()
+    assert not budget.withdraw()
+    budget.deposit()
+    budget.deposit()
+    assert budget.withdraw()
+
+
+@pytest.mark.asyncio
+async def test_one_breaker_failure_per_logical_call():
+    upstream = make_upstream(max_retries=2, failure_threshold=3)
+
+    for _ in range(2):
+        response = await upstream.call(FlakyCall(failures=3))
+        assert response.status_code == 503
+
+    assert upstream.breaker.failures == 2
+    assert upstream.breaker.state == CLOSED
+
+
+@pytest.mark.asyncio
+async def test_retry_then_success_resets_failures():
+    upstream = make_upstream(max_retries=2)
+    fn = FlakyCall(failures=2)
+
+    response = await upstream.call(fn)
+
+    assert response.status_code == 200
+    assert len(fn.timeouts) == 3
+    assert upstream.breaker.failures == 0
+
+
+@pytest.mark.asyncio
+async def test_retry_exceptions_become_upstream_unavailable():
+    upstream = make_upstream(max_retries=1)
+
+    with pytest.raises(UpstreamUnavailable) as info:
+        await upstream.call(FlakyCall(failures=5, error=httpx.ConnectError("sem rede")))
+
+    assert info.value.reason == "ConnectError"
+    assert isinstance(info.value.__cause__, httpx.ConnectError)
+
+
+@pytest.mark.asyncio
+async def test_exhausted_retry_budget_stops_retries():
+    upstream = make_upstream(max_retries=2, retry_budget_ratio=0)
+    upstream.budget.tokens = 1
+    fn = FlakyCall(failures=10)
+
+    await upstream.call(fn)
+    assert len(fn.timeouts) == 2  # uma tentativa + o único retry do orçamento
+    fn.timeouts.clear()
+    await upstream.call(fn)
+    assert len(fn.timeouts) == 1
+
+
+@pytest.mark.asyncio
+async def test_attempt_timeout_clamped_to_deadline():
+    upstream = make_upstream()
+    fn = FlakyCall(failures=0)
+    token = set_deadline(1.0)
+    try:
+        await upstream.call(fn)
+    finally:
+        reset_deadline(token)
+
+    assert fn.timeouts[0] <= 1.0
+
+
+@pytest.mark.asyncio
+async def test_no_attempt_without_time_left():
+    upstream = make_upstream()
+    fn = FlakyCall(failures=0)
+    token = set_deadline(0.1)
+    try:
+        with pytest.raises(DeadlineExceeded):
+            await upstream.call(fn)
+    finally:
+        reset_deadline(token)
+
+    assert fn.timeouts == []
+
+
+@pytest.mark.asyncio
+async def test_attempt_cut_short_by_deadline_is_not_a_breaker_failure():
+    upstream = make_upstream(failure_threshold=1)
+
+    async def slow(timeout):
+        await asyncio.sleep(10)
+
+    token = set_deadline(0.3)
+    try:
+        with pytest.raises(DeadlineExceeded):
+            await upstream.call(slow)
+    finally:
+        reset_deadline(token)
+
+    assert upstream.breaker.failures == 0
+    assert upstream.breaker.state == CLOSED
@@ -0,0 +1,148 @@
+import multiprocessing
+import struct
+import time
+
+import pytest
+
+from app.core import shm
+from app.core.shm import SLOT_HEADER, SLOT_HEADER_SIZE, SharedMemoryTable
+
+fork = multiprocessing.get_context("fork")
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "cache.shm")
+
+
+def _slot_of(table, key):
+    key_hash = shm._hash(key.encode())
+    for index in table._probe(key_hash):
+        if SLOT_HEADER.unpack_from(table._mm, table._offset(index))[1] == key_hash:
+            return index
+    raise AssertionError(f"{key} não está na tabela")
+
+
+def _writer(path, worker, count):
+    table = SharedMemoryTable(path, slots=256, slot_size=256)
+    for i in range(count):
+        assert table.set(f"w{worker}:{i}", f"valor {worker}-{i}".encode(), ttl_seconds=60)
+
+
+def test_values_written_by_other_processes_are_visible(path):
+    table = SharedMemoryTable(path, slots=256, slot_size=256)
+    workers = [fork.Process(target=_writer, args=(path, w, 20)) for w in range(3)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(timeout=30)
+        assert worker.exitcode == 0
+
+    for w in range(3):
+        for i in range(20):
+            assert table.get(f"w{w}:{i}") == f"valor {w}-{i}".encode()
+
+
+def test_ttl_and_stale_window(path):
+    table = SharedMemoryTable(path, slots=16, slot_size=256)
+    table.set("k", b"v", ttl_seconds=-1, stale_seconds=60)
+
+    assert table.get("k") is None
+    assert table.get("k", allow_stale=True) == b"v"
+
+
+def test_corrupted_slot_is_rejected(path):
+    table = SharedMemoryTable(path, slots=16, slot_size=256)
+    table.set("k", b"valor", ttl_seconds=60)
+    value_at = table._offset(_slot_of(table, "k")) + SLOT_HEADER_SIZE + len(b"k")
+
+    table._mm[value_at] ^= 0xFF
+
+    assert table.get("k") is None
+
+
+def test_slot_being_written_is_not_read(path):
+    table = SharedMemoryTable(path, slots=16, slot_size=256)
+    table.set("k", b"valor", ttl_seconds=60)
+    offset = table._offset(_slot_of(table, "k"))
+    seq = struct.unpack_from("<Q", table._mm, offset)[0]
+
+    struct.pack_into("<Q", table._mm, offset, seq + 1)  # writer no meio da escrita
+    assert table.get("k") is None
+    struct.pack_into("<Q", table._mm, offset, seq + 2)
+    assert table.get("k") == b"valor"
+
+
+def test_entry_expiring_first_is_evicted(path, monkeypatch):
+    # Hashes distintos, todos com o mesmo slot inicial (múltiplos de 4)
+    hashes = {b"k0": 4, b"k1": 8, b"k2": 12, b"k3": 16, b"novo": 20}
+    monkeypatch.setattr(shm, "_hash", hashes.__getitem__)
+    table = SharedMemoryTable(path, slots=4, slot_size=256)
+    for i, ttl in enumerate((60, 10, 90, 120)):
+        assert table.set(f"k{i}", b"v", ttl_seconds=ttl)
+
+    assert table.set("novo", b"v", ttl_seconds=60)
+
+    assert table.get("k1") is None
+    assert all(table.get(key) == b"v" for key in ("k0", "k2", "k3", "novo"))
+
+
+def test_values_larger_than_slot_are_not_cached(path):
+    table = SharedMemoryTable(path, slots=4, slot_size=128)
+
+    assert not table.set("k", b"x" * 200, ttl_seconds=60)
+    assert table.get("k") is None
+
+
+def _hold_slot_lock(path, key, locked, release):
+    table = SharedMemoryTable(path, slots=16, slot_size=256)
+    offset = table._offset(_slot_of(table, key))
+    table._lock(offset, table.slot_size)
+    locked.set()
+    release.wait(10)
+
+
+def test_set_fails_instead_of_duplicating_a_locked_key(path):
+    table = SharedMemoryTable(path, slots=16, slot_size=256)
+    table.set("k", b"antigo", ttl_seconds=60)
+    locked, release = fork.Event(), fork.Event()
+    holder = fork.Process(target=_hold_slot_lock, args=(path, "k", locked, release))
+    holder.start()
+    try:
+        assert locked.wait(10)
+        assert not table.set("k", b"novo", ttl_seconds=60)
+    finally:
+        release.set()
+        holder.join(timeout=10)
+
+    assert sum(1 for key, *_ in table.items() if key == "k") == 1
+    assert table.set("k", b"novo", ttl_seconds=60)
+    assert table.get("k") == b"novo"
+
+
+def test_load_entries_keeps_existing_keys(path):
+    table = SharedMemoryTable(path, slots=16, slot_size=256)
+    table.set("a", b"atual", ttl_seconds=60)
+    now = time.time()
+
+    loaded = table.load_entries([
+        ("a", now + 60, now + 120, b"snapshot"),
+        ("b", now + 60, now + 120, b"snapshot"),
+    ])
+
+    assert loaded == 1
+    assert table.get("a") == b"atual"
+    assert table.get("b") == b"snapshot"
+
+
+def test_new_geometry_replaces_file_without_truncating_live_mapping(path):
+    old = SharedMemoryTable(path, slots=4, slot_size=256)
+    old.set("k", b"v", ttl_seconds=60)
+
+    new = SharedMemoryTable(path, slots=8, slot_size=256)
+
+    # O mapeamento antigo continua válido (sem SIGBUS) e a tabela nova é vazia
+    assert old.get("k") == b"v"
+    assert new.get("k") is None
+    assert new.set("k", b"novo", ttl_seconds=60)
+    assert SharedMemoryTable(path, slots=8, slot_size=256).get("k") == b"novo"
@@ -0,0 +1,101 @@
+import time
+
+import pytest
+
+from app.core.shm import decode_value
+from app.core.snapshot import HEADER_SIZE, read_snapshot, write_snapshot
+from app.services.cache_snapshots import CacheSnapshotter
+
+
+class FakeCache:
+    def __init__(self, entries=None):
+        self.entries = dict(entries or {})
+
+    def snapshot_entries(self):
+        return [(key, *entry) for key, entry in self.entries.items()]
+
+    def restore_entries(self, entries):
+        for key, expires_at, stale_until, value in entries:
+            self.entries[key] = (expires_at, stale_until, decode_value(value))
+        return len(entries)
+
+
+def test_round_trip_keeps_values_and_skips_expired(tmp_path):
+    path = str(tmp_path / "weather.snap")
+    now = time.time()
+    entries = [
+        ("obj", now + 60, now + 120, {"temperature": 25.5, "city": "Ribeirão Preto"}),
+        ("raw", now - 10, now + 50, b'{"stale": true}'),
+        ("gone", now - 100, now - 1, {"x": 1}),
+    ]
+
+    assert write_snapshot(path, entries) == 2
+    restored = {key: (exp, stale, decode_value(value)) for key, exp, stale, value in read_snapshot(path)}
+
+    assert restored["obj"] == (now + 60, now + 120, {"temperature": 25.5, "city": "Ribeirão Preto"})
+    assert restored["raw"][2] == {"stale": True}
+    assert "gone" not in restored
+    # Lido mais tarde, o que saiu da janela stale é pulado
+    assert [e[0] for e in read_snapshot(path, now=now + 100)] == ["obj"]
+
+
+def test_missing_file_is_empty(tmp_path):
+    assert read_snapshot(str(tmp_path / "nada.snap")) == []
+
+
+@pytest.mark.parametrize("corrupt", [
+    lambda data: data[:HEADER_SIZE + 5] + bytes([data[HEADER_SIZE + 5] ^ 0xFF]) + data[HEADER_SIZE + 6:],
+    lambda data: data[:10],
+    lambda data: b"OUTROFMT" + data[8:],
+])
+def test_corrupt_snapshot_is_ignored(tmp_path, corrupt):
+    path = tmp_path / "news.snap"
+    now = time.time()
+    write_snapshot(str(path), [("k", now + 60, now + 120, {"v": 1})])
+    path.write_bytes(corrupt(path.read_bytes()))
+
+    assert read_snapshot(str(path)) == []
+
+
+@pytest.mark.asyncio
+async def test_snapshotter_restores_saved_entries(tmp_path):
+    now = time.time()
+    cache = FakeCache({"a": (now + 60, now + 120, {"v": 1})})
+    snapshotter = CacheSnapshotter(str(tmp_path))
+    snapshotter.register("weather", cache)
+
+    assert await snapshotter.save() == {"weather": 1}
+
+    restored = FakeCache()
+    snapshotter.register("weather", restored)
+    assert snapshotter.restore() == {"weather": 1}
+    assert restored.entries["a"][2] == {"v": 1}
+
+
+@pytest.mark.asyncio
+async def test_removed_entries_are_not_resurrected(tmp_path):
+    now = time.time()
+    cache = FakeCache({"a": (now + 60, now + 120, {"v": 1}), "b": (now + 60, now + 120, {"v": 2})})
+    snapshotter = CacheSnapshotter(str(tmp_path))
+    snapshotter.register("weather", cache)
+    await snapshotter.save()
+
+    del cache.entries["b"]  # invalidada
+    await snapshotter.save()
+
+    restored = FakeCache()
+    snapshotter.register("weather", restored)
+    snapshotter.restore()
+    assert set(restored.entries) == {"a"}
+
+
+def test_entries_serialized_before_leaving_the_event_loop():
+    now = time.time()
+    value = {"v": [1, 2]}
+    cache = FakeCache({"a": (now + 60, now + 120, value)})
+
+    collected = CacheSnapshotter._collect(cache)
+    value["v"].append(3)  # requisição alterando o cache durante a gravação
+
+    assert isinstance(collected[0][3], bytes)
+    assert decode_value(collected[0][3]) == {"v": [1, 2]}
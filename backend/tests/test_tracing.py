@@ -0,0 +1,23 @@
+from app.core.tracing import Trace
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+SAMPLED = f"00-{TRACE_ID}-00f067aa0ba902b7-01"
+
+
+def test_sampled_flag_from_client_does_not_force_export():
+    trace = Trace.from_traceparent(SAMPLED, sample_rate=0.0)
+
+    assert trace.trace_id == TRACE_ID
+    assert trace.parent_span_id == "00f067aa0ba902b7"
+    assert not trace.sampled
+
+
+def test_sampled_flag_honored_from_trusted_source():
+    assert Trace.from_traceparent(SAMPLED, sample_rate=0.0, trust_sampled=True).sampled
+    assert not Trace.from_traceparent(SAMPLED[:-2] + "00", sample_rate=0.0, trust_sampled=True).sampled
+
+
+def test_sample_rate_applies_with_or_without_traceparent():
+    assert Trace.from_traceparent(SAMPLED, sample_rate=1.0).sampled
+    assert Trace.from_traceparent(None, sample_rate=1.0).sampled
+    assert Trace.from_traceparent("invalido", sample_rate=1.0).trace_id != TRACE_ID
@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.routes.weather import _history_range
+from app.database import mongodb
+from app.services import weather_history
+from app.services.weather_history import WeatherObservationRecorder
+
+
+def test_history_range_accepts_aware_datetimes():
+    date_from = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    date_to = datetime(2024, 1, 2, 3, 0, tzinfo=timezone(timedelta(hours=-3)))
+
+    start, end = _history_range(date_from, date_to, default_days=7)
+
+    assert start == datetime(2024, 1, 1)
+    assert end == datetime(2024, 1, 2, 6, 0)
+    assert start.tzinfo is None and end.tzinfo is None
+
+
+def test_history_range_mixes_aware_and_naive():
+    start, end = _history_range(datetime(2024, 1, 1, tzinfo=timezone.utc), datetime(2024, 1, 5), default_days=7)
+    assert (start, end) == (datetime(2024, 1, 1), datetime(2024, 1, 5))
+
+
+def test_history_range_defaults_to_naive_utc_window():
+    start, end = _history_range(None, None, default_days=30)
+    assert end.tzinfo is None
+    assert end - start == timedelta(days=30)
+    assert abs(end - datetime.utcnow()) < timedelta(seconds=5)
+
+    start, _ = _history_range(None, datetime(2024, 3, 1, tzinfo=timezone.utc), default_days=7)
+    assert start == datetime(2024, 2, 23)
+
+
+def test_history_range_rejects_inverted_interval():
+    with pytest.raises(HTTPException) as exc:
+        _history_range(
+            datetime(2024, 1, 2, tzinfo=timezone.utc),
+            datetime(2024, 1, 1, 20, 0, tzinfo=timezone(timedelta(hours=-3))),
+            default_days=7,
+        )
+    assert exc.value.status_code == 400
+
+
+class FakeObservations:
+    def __init__(self):
+        self.inserted = []
+
+    async def insert_many(self, docs, ordered=True):
+        self.inserted.extend(docs)
+
+
+@pytest.mark.asyncio
+async def test_recorder_does_not_rewrite_observations_across_flushes(monkeypatch):
+    collection = FakeObservations()
+    monkeypatch.setattr(weather_history, "get_database", lambda: {weather_history.COLLECTION: collection})
+    recorder = WeatherObservationRecorder(batch_size=100)
+    raw = {"utc_offset_seconds": -10800, "current": {"time": "2024-01-01T12:00", "precipitation": 2.5}}
+
+    recorder.record(-21.17, -47.81, raw)
+    assert await recorder.flush() == 1
+    recorder.record(-21.171, -47.812, raw)  # mesma célula e horário
+    assert await recorder.flush() == 0
+
+    assert len(collection.inserted) == 1
+    assert collection.inserted[0]["timestamp"] == datetime(2024, 1, 1, 15, 0)
+
+
+class FakeDatabase:
+    def __init__(self, existing=()):
+        self.collections = {name: {} for name in existing}
+
+    async def list_collection_names(self):
+        return list(self.collections)
+
+    async def create_collection(self, name, **options):
+        self.collections[name] = options
+
+
+async def noop():
+    pass
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("ensure_indexes", [False, True])
+async def test_timeseries_collection_created_regardless_of_index_flag(monkeypatch, ensure_indexes):
+    db = FakeDatabase()
+    monkeypatch.setattr(mongodb.mongodb, "db", db)
+    monkeypatch.setattr(mongodb.settings, "MONGODB_ENSURE_INDEXES", ensure_indexes)
+    monkeypatch.setattr(mongodb, "ensure_indexes", noop)
+
+    await mongodb.prepare_database()
+
+    options = db.collections[weather_history.COLLECTION]
+    assert options["timeseries"]["timeField"] == "timestamp"
+    assert options["expireAfterSeconds"] > 0
+